@@ -0,0 +1,208 @@
+"""Offline benchmark of the four short-term memory condensation strategies.
+
+Drives the ``manual_triming``, ``selective_deletition``, ``summarization`` and
+``Tokenaware_truncation`` graphs through scripted conversations with a
+deterministic fake chat model (no API key, no network) and reports, per
+strategy and conversation length:
+
+* per-turn latency (p50 / p95 / max),
+* peak traced memory,
+* prompt tokens sent to the model (agent calls and summarizer calls), and
+  how many agent prompt tokens a provider prompt cache could reuse,
+* condensation events (turns where history was dropped, summarized or the
+  prompt was truncated) and summarizer calls,
+* the size of the retained history at the end.
+
+Usage::
+
+    PYTHONPATH=src python benchmarks/condensers.py --turns 10 100 1000
+    PYTHONPATH=src python benchmarks/condensers.py --turns 10000 --strategies manual_triming --json out.json
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from condenser_core.fakes import FakeChatModel
+
+STRATEGIES = [
+    "manual_triming",
+    "selective_deletition",
+    "summarization",
+    "Tokenaware_truncation",
+]
+
+_WORDS = (
+    "context window budget token summary message history tool city forecast "
+    "latency memory thread turn reply question answer detail plan cache"
+).split()
+
+
+def scripted_turns(turns: int, seed: int = 0, tool_every: int = 5) -> List[str]:
+    """Return deterministic user inputs; every ``tool_every``-th one asks for the weather."""
+    rng = random.Random(seed)
+    inputs = []
+    for i in range(turns):
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(5, 40)))
+        if tool_every and i % tool_every == tool_every - 1:
+            inputs.append(f"What is the weather in San Francisco? {words}")
+        else:
+            inputs.append(f"Turn {i}: {words}")
+    return inputs
+
+
+@contextlib.contextmanager
+def load_graph(strategy: str, model: FakeChatModel) -> Iterator[Any]:
+    """Compile a fresh graph of a strategy's module pointed at ``model``.
+
+    The nodes read the module's models when they run, so the module is patched
+    for as long as the context is open and restored when it closes.
+    """
+    module = importlib.import_module(f"{strategy}.graph")
+    patched = {
+        "llm_with_tools": model.bind_tools(module.tool_executor.tools_by_name.values())
+    }
+    if hasattr(module, "llm"):
+        patched["llm"] = model
+    originals = {name: getattr(module, name) for name in patched}
+    try:
+        for name, value in patched.items():
+            setattr(module, name, value)
+        yield module.workflow.compile()
+    finally:
+        for name, value in originals.items():
+            setattr(module, name, value)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def _prompt_truncated(model: FakeChatModel, history: List[Any]) -> bool:
+    """Whether the last agent prompt left out the oldest retained message."""
+    prompt = [
+        m
+        for m in model.stats.get("last_prompt", [])
+        if not isinstance(m, SystemMessage)
+    ]
+    return bool(prompt and history and prompt[0].id != history[0].id)
+
+
+def run_strategy(strategy: str, turns: int, seed: int = 0) -> Dict[str, Any]:
+    """Run one scripted conversation of ``turns`` turns and return its metrics."""
+    model = FakeChatModel()
+    state: Dict[str, Any] = {"messages": []}
+    latencies = []
+    condensations = 0
+
+    with load_graph(strategy, model) as graph:
+        tracemalloc.start()
+        for text in scripted_turns(turns, seed=seed):
+            before_ids = {m.id for m in state["messages"]}
+            # State is carried between turns by the caller (no checkpointer), so memory
+            # reflects what each strategy retains rather than checkpoint history.
+            turn_input = {
+                **state,
+                "messages": list(state["messages"]) + [HumanMessage(text)],
+            }
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                state = graph.invoke(turn_input)
+            latencies.append((time.perf_counter() - started) * 1000)
+            after_ids = {m.id for m in state["messages"]}
+            if before_ids - after_ids or _prompt_truncated(
+                model, list(state["messages"])
+            ):
+                condensations += 1
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    stats = model.stats
+    return {
+        "strategy": strategy,
+        "turns": turns,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": _percentile(latencies, 95),
+        "max_ms": max(latencies),
+        "peak_mib": peak / (1024 * 1024),
+        "agent_calls": stats.get("agent_calls", 0),
+        "agent_prompt_tokens": stats.get("agent_prompt_tokens", 0),
+        "cached_prompt_tokens": stats.get("cached_prompt_tokens", 0),
+        "summary_calls": stats.get("summary_calls", 0),
+        "summary_prompt_tokens": stats.get("summary_prompt_tokens", 0),
+        "condensations": condensations,
+        "final_messages": len(state["messages"]),
+    }
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    """Render results as a fixed-width table."""
+    # (result key, header, width, format spec)
+    columns = [
+        ("strategy", "strategy", 22, "<"),
+        ("turns", "turns", 6, ">"),
+        ("p50_ms", "p50 ms", 8, ">.2f"),
+        ("p95_ms", "p95 ms", 8, ">.2f"),
+        ("max_ms", "max ms", 8, ">.2f"),
+        ("peak_mib", "peak MiB", 9, ">.2f"),
+        ("agent_prompt_tokens", "agent tok", 12, ">"),
+        ("cached_prompt_tokens", "cached tok", 12, ">"),
+        ("summary_calls", "sum calls", 9, ">"),
+        ("summary_prompt_tokens", "sum tok", 10, ">"),
+        ("condensations", "condense", 8, ">"),
+        ("final_messages", "history", 8, ">"),
+    ]
+    lines = [
+        " ".join(
+            format(header, ("<" if spec == "<" else ">") + str(width))
+            for _, header, width, spec in columns
+        )
+    ]
+    for result in results:
+        lines.append(
+            " ".join(
+                format(result[key], spec[0] + str(width) + spec[1:])
+                for key, _, width, spec in columns
+            )
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument(
+        "--strategies", nargs="+", default=STRATEGIES, choices=STRATEGIES
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--json", dest="json_path", help="Also write the results to this JSON file"
+    )
+    args = parser.parse_args(argv)
+
+    results = []
+    for turns in args.turns:
+        for strategy in args.strategies:
+            results.append(run_strategy(strategy, turns, seed=args.seed))
+            sys.stderr.write(format_table(results[-1:]).splitlines()[-1] + "\n")
+    sys.stdout.write(format_table(results) + "\n")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
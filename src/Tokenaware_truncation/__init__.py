@@ -4,6 +4,6 @@ This module defines a custom reasoning and action agent graph.
 It invokes tools in a simple loop.
 """
 
-from manual_triming.graph import graph
+from Tokenaware_truncation.graph import graph
 
 __all__ = ["graph"]
@@ -1,8 +1,38 @@
-from langchain.chat_models import init_chat_model
+from condenser_core.blob_store import BlobStore
+from condenser_core.models import LazyChatModel, get_rate_limiter
+from condenser_core.settings import (
+    MODEL_REQUESTS_PER_SECOND,
+    TOOL_BLOB_DIR,
+    TOOL_BLOB_MIN_CHARS,
+)
+from condenser_core.token_counter import FastTokenCounter
 from Tokenaware_truncation.tools import tools
 
-llm = init_chat_model("google_genai:gemini-2.0-flash")
-llm_with_tools = llm.bind_tools(tools)
-
 # Maximum tokens to keep in the message history before truncation
-MAX_TOKENS_FOR_HISTORY = 500
\ No newline at end of file
+MAX_TOKENS_FOR_HISTORY = 500
+
+# "sliding": trim_messages(strategy="last") on every call; the window moves by a message per turn.
+# "block":   keep the window start fixed until the prompt crosses MAX_TOKENS_FOR_HISTORY, then drop the
+#            oldest turns in one chunk down to BLOCK_LOW_WATERMARK_TOKENS. The system prompt and the
+#            retained prefix stay byte-identical between truncations, so provider prompt caches hit.
+TRUNCATION_MODE = "sliding"
+BLOCK_LOW_WATERMARK_TOKENS = 250
+
+# Local token counter used for trimming. It is offline by default; pass
+# exact_counter=llm.get_num_tokens_from_messages to calibrate against the model
+# (only consulted near MAX_TOKENS_FOR_HISTORY).
+token_counter = FastTokenCounter()
+
+# Tool execution, streaming, checkpointing and the model request rate are shared by all
+# packages (see condenser_core.settings); large tool outputs go to the blob store when configured there.
+blob_store = (
+    BlobStore(TOOL_BLOB_DIR, min_chars=TOOL_BLOB_MIN_CHARS) if TOOL_BLOB_DIR else None
+)
+agent_tools = tools + [blob_store.read_tool()] if blob_store else tools
+
+# Built on first use and shared with the other packages using the same model (see condenser_core.models)
+MODEL_NAME = "google_genai:gemini-2.0-flash"
+llm = LazyChatModel(
+    MODEL_NAME, rate_limiter=get_rate_limiter(MODEL_NAME, MODEL_REQUESTS_PER_SECOND)
+)
+llm_with_tools = llm.bind_tools(agent_tools)
@@ -1,84 +1,239 @@
-from typing import Annotated, Sequence, TypedDict, Literal
-from langchain_core.messages import BaseMessage, ToolMessage, SystemMessage, AIMessage, HumanMessage, trim_messages
-from langgraph.graph import StateGraph, END
-from langchain_core.runnables import RunnableConfig
+import logging
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
 
-from Tokenaware_truncation.configuration import llm_with_tools, llm, MAX_TOKENS_FOR_HISTORY
-from Tokenaware_truncation.tools import tools
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.graph import END, StateGraph
+
+from condenser_core.checkpoint import get_saver
+from condenser_core.instrumentation import instrumentation
+from condenser_core.prompt import PromptAssembler
+from condenser_core.settings import (
+    CHECKPOINT_DB_PATH,
+    EARLY_TOOL_DISPATCH,
+    HOT_SESSIONS_FLUSH_EVERY,
+    HOT_SESSIONS_MAX,
+    HOT_SESSIONS_MAX_BYTES,
+    STREAM_MODEL_OUTPUT,
+    TOOL_CACHE_ENABLED,
+    TOOL_CACHE_MAXSIZE,
+    TOOL_CACHE_TTL_SECONDS,
+    TOOL_MAX_CONCURRENCY,
+    TOOL_TIMEOUT_SECONDS,
+    TOOL_TIMEOUTS,
+)
+from condenser_core.streaming import ainvoke_model, invoke_model
+from condenser_core.tool_cache import ToolResultCache
+from condenser_core.tool_executor import ToolExecutor
+from Tokenaware_truncation.configuration import (
+    BLOCK_LOW_WATERMARK_TOKENS,
+    MAX_TOKENS_FOR_HISTORY,
+    TRUNCATION_MODE,
+    agent_tools,
+    blob_store,
+    llm_with_tools,
+    token_counter,
+)
 from Tokenaware_truncation.state import AgentState
+from Tokenaware_truncation.token_cache import TokenCountCache
+from Tokenaware_truncation.windowing import block_window_start, find_window_start
+
+# Node timings and condensation stats are reported to condenser_core.instrumentation
+GRAPH_NAME = "Tokenaware_truncation"
+logger = logging.getLogger(__name__)
+
+# tool lookup and concurrent execution
+tool_cache = (
+    ToolResultCache(maxsize=TOOL_CACHE_MAXSIZE, ttl=TOOL_CACHE_TTL_SECONDS)
+    if TOOL_CACHE_ENABLED
+    else None
+)
+tool_executor = ToolExecutor(
+    agent_tools,
+    max_concurrency=TOOL_MAX_CONCURRENCY,
+    timeout=TOOL_TIMEOUT_SECONDS,
+    timeouts=TOOL_TIMEOUTS,
+    cache=tool_cache,
+    blob_store=blob_store,
+)
+
 
-import json
+def _model_call_options() -> Dict[str, Any]:
+    # Streaming and early tool dispatch settings for the agent node (see condenser_core.streaming)
+    return {
+        "stream": STREAM_MODEL_OUTPUT,
+        "executor": tool_executor if EARLY_TOOL_DISPATCH else None,
+        "graph": GRAPH_NAME,
+    }
 
-# tool lookup
-tools_by_name = {tool.name: tool for tool in tools}
 
 # Tool node
-def tool_node(state: AgentState) -> dict:
-    outputs = []
+@instrumentation.node(GRAPH_NAME, "tools")
+def tool_node(state: AgentState) -> Dict[str, Any]:
     last_message = state["messages"][-1]
     if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
-        print("Tool node: Last message is not an AIMessage with tool calls. Skipping.")
+        logger.debug(
+            "Tool node: last message is not an AIMessage with tool calls; skipping."
+        )
         return {}
 
-    for tool_call in last_message.tool_calls:
-        tool_result = tools_by_name[tool_call["name"]].invoke(tool_call["args"])
-        outputs.append(
-            ToolMessage(
-                content=json.dumps(tool_result),
-                name=tool_call["name"],
-                tool_call_id=tool_call["id"],
-            )
+    # Independent calls run concurrently; results come back in call order
+    outputs = tool_executor.run(last_message.tool_calls)
+    return {"messages": outputs}
+
+
+@instrumentation.node(GRAPH_NAME, "tools")
+async def atool_node(state: AgentState) -> Dict[str, Any]:
+    last_message = state["messages"][-1]
+    if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
+        logger.debug(
+            "Tool node: last message is not an AIMessage with tool calls; skipping."
         )
+        return {}
+    outputs = await tool_executor.arun(last_message.tool_calls)
     return {"messages": outputs}
 
-# llm_with_tools node
-def call_llm_with_tools(state: AgentState, config: RunnableConfig) -> dict:
-    print(f"--- Node: Agent (LLM Call) ---")
+
+# Token counts per message id, kept in the process (not the checkpoint); see token_cache
+token_cache = TokenCountCache(token_counter.count_batch)
+
+
+def _sliding_window(
+    messages: Sequence[BaseMessage], counts: Sequence[int]
+) -> List[BaseMessage]:
+    """Keep the newest messages within MAX_TOKENS_FOR_HISTORY.
+
+    Same result as trim_messages(strategy="last", include_system=True, start_on="human",
+    end_on=("human", "tool")), but counts are summed from the newest message back and stop
+    at the budget, so only the kept messages (and the first one that does not fit) are counted.
+    """
+    end = len(messages)
+    while end > 0 and not isinstance(messages[end - 1], (HumanMessage, ToolMessage)):
+        end -= 1
+    first = 1 if end and isinstance(messages[0], SystemMessage) else 0
+    budget = MAX_TOKENS_FOR_HISTORY - (counts[0] if first else 0)
+    start, total = end, 0
+    while start > first and total + counts[start - 1] <= budget:
+        start -= 1
+        total += counts[start]
+    if token_counter.exact_counter is not None and token_counter.near_boundary(
+        total, budget
+    ):
+        while start < end and token_counter.exact(list(messages[start:end])) > budget:
+            start += 1
+    while start < end and not isinstance(messages[start], HumanMessage):
+        start += 1
+    return list(messages[:first]) + list(messages[start:end])
+
+
+def _block_window(
+    history: Sequence[BaseMessage], window_start_id: Optional[str]
+) -> Tuple[Sequence[BaseMessage], Optional[str]]:
+    """Return (window, new window start id) for block mode; history excludes the system prompt."""
+    history_counts = token_cache.counts(history)
+    budget = MAX_TOKENS_FOR_HISTORY - token_cache.count(prompt_assembler.system_message)
+    start = find_window_start(history, window_start_id)
+    start = block_window_start(
+        history, history_counts, start, budget, min(BLOCK_LOW_WATERMARK_TOKENS, budget)
+    )
+    window: Sequence[BaseMessage] = prompt_assembler.assemble(history[start:])
+    if sum(history_counts[start:]) > budget:
+        # A single turn larger than the budget: fall back to trimming inside it for this call
+        window = _sliding_window(window, token_cache.counts(window))
+    return window, history[start].id if start < len(history) else None
+
+
+# System prompt built once; the history is presented behind it as a view instead of a new list
+prompt_assembler = PromptAssembler(
+    "You are a helpful AI assistant, please respond to the users query to the best of your ability!"
+)
+
+
+# Trimming shared by the sync and async agent nodes
+def prepare_messages(state: AgentState) -> Tuple[Sequence[BaseMessage], Dict[str, Any]]:
+    """Return the messages to send to the model and the state update (window start, in block mode)."""
     current_messages = state["messages"]
-    
-    system_prompt_content = "You are a helpful AI assistant, please respond to the users query to the best of your ability!"
-    
-    processed_messages = []
-    if not current_messages or not (isinstance(current_messages[0], SystemMessage) and current_messages[0].content == system_prompt_content):
-        processed_messages.append(SystemMessage(content=system_prompt_content))
-    
-    processed_messages.extend(current_messages)
-
-    print(f"Original message count for trimming: {len(processed_messages)}")
-
-    trimmed_messages = trim_messages(
-        processed_messages,
-        max_tokens=MAX_TOKENS_FOR_HISTORY,
-        strategy="last",
-        token_counter=llm,
-        include_system=True,
-        start_on="human",
-        end_on=("human", "tool"),
+    has_system_prompt = bool(current_messages) and (
+        isinstance(current_messages[0], SystemMessage)
+        and current_messages[0].content == prompt_assembler.system_message.content
+    )
+    processed_messages = prompt_assembler.assemble(
+        current_messages, include_system=not has_system_prompt
+    )
+
+    update: Dict[str, Any] = {}
+    if TRUNCATION_MODE == "block" and not has_system_prompt:
+        trimmed_messages, window_start = _block_window(
+            current_messages, state.get("window_start")
+        )
+        if window_start is not None and window_start != state.get("window_start"):
+            update["window_start"] = window_start
+    else:
+        trimmed_messages = _sliding_window(
+            processed_messages, token_cache.counts(processed_messages)
+        )
+    if instrumentation.enabled:
+        # Only for the report: counts every message (cache hits apart from new messages)
+        counts = token_cache.counts(processed_messages)
+        instrumentation.emit(
+            "condense",
+            graph=GRAPH_NAME,
+            name=TRUNCATION_MODE,
+            messages_before=len(processed_messages),
+            messages_after=len(trimmed_messages),
+            dropped=len(processed_messages) - len(trimmed_messages),
+            tokens_before=sum(counts),
+            tokens_after=sum(token_cache.counts(trimmed_messages)),
+        )
+    return trimmed_messages, update
+
+
+# llm_with_tools node
+@instrumentation.node(GRAPH_NAME, "agent")
+def call_llm_with_tools(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    trimmed_messages, update = prepare_messages(state)
+    response = invoke_model(
+        llm_with_tools, trimmed_messages, config, **_model_call_options()
     )
-    print(f"Trimmed message count: {len(trimmed_messages)}")
-    print(f"Content of trimmed_messages: {trimmed_messages}")
+    return {"messages": [response], **update}
+
 
-    response = llm_with_tools.invoke(trimmed_messages, config)
-    print(f"LLM Response: {response.content[:80]}...")
-    return {"messages": [response]}
+@instrumentation.node(GRAPH_NAME, "agent")
+async def acall_llm_with_tools(
+    state: AgentState, config: RunnableConfig
+) -> Dict[str, Any]:
+    trimmed_messages, update = prepare_messages(state)
+    response = await ainvoke_model(
+        llm_with_tools, trimmed_messages, config, **_model_call_options()
+    )
+    return {"messages": [response], **update}
 
-def should_continue(state: AgentState) -> Literal["tools", END]:
-    print(f"--- Condition: Should Continue? ---")
+
+def should_continue(state: AgentState) -> Literal["tools", "__end__"]:
     messages = state["messages"]
     if not messages:
-        print("No messages in state. Ending.")
-        return END
+        return "__end__"
     last_message = messages[-1]
-    if isinstance(last_message, AIMessage) and getattr(last_message, "tool_calls", None):
-        print("Decision: AI Message with tool calls. Routing to tools.")
+    if isinstance(last_message, AIMessage) and getattr(
+        last_message, "tool_calls", None
+    ):
         return "tools"
-    print("Decision: No tool calls or not AI message. Ending.")
-    return END
+    return "__end__"
+
 
 # Build the graph
 workflow = StateGraph(AgentState)
-workflow.add_node("agent", call_llm_with_tools)
-workflow.add_node("tools", tool_node)
+# Each node has a native async implementation used by ainvoke/astream
+workflow.add_node(
+    "agent", RunnableLambda(call_llm_with_tools, afunc=acall_llm_with_tools)
+)
+workflow.add_node("tools", RunnableLambda(tool_node, afunc=atool_node))
 workflow.set_entry_point("agent")
 workflow.add_conditional_edges(
     "agent",
@@ -89,5 +244,18 @@ workflow.add_conditional_edges(
     },
 )
 workflow.add_edge("tools", "agent")
-graph = workflow.compile()
-print("Graph compiled with token-aware truncation.")
\ No newline at end of file
+# Compiled at import: the chat models are LazyChatModel placeholders, so compiling builds no model
+# and imports no provider SDK; the checkpointer opens its database on first use. The package
+# re-exports `graph`, as langgraph.json does.
+checkpointer = (
+    get_saver(
+        CHECKPOINT_DB_PATH,
+        HOT_SESSIONS_MAX,
+        HOT_SESSIONS_MAX_BYTES,
+        HOT_SESSIONS_FLUSH_EVERY,
+    )
+    if CHECKPOINT_DB_PATH
+    else None
+)
+graph = workflow.compile(checkpointer=checkpointer)
+logger.debug("Graph compiled with token-aware truncation.")
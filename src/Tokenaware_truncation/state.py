@@ -3,11 +3,14 @@ from typing import (
     Sequence,
     TypedDict,
 )
+
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 
 
-class AgentState(TypedDict):
+class AgentState(TypedDict, total=False):
     """The state of the agent."""
 
-    messages: Annotated[Sequence[BaseMessage], add_messages]
\ No newline at end of file
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+    # Id of the first history message sent to the model in block truncation mode.
+    window_start: str
@@ -0,0 +1,121 @@
+"""Per-message token counts for token-aware truncation.
+
+Counting the whole history with ``token_counter=llm`` on every agent step is
+O(history) per turn, and so is hashing every message to look its count up.
+``TokenCountCache`` keys counts by message id and remembers (weakly) the
+message object each count belongs to: the same object again is a dict hit,
+and only a message that is new, or that arrives as another object under a
+known id (restored from a checkpoint, or replaced by ``add_messages``), has
+its content hashed. ``CachedCounts`` presents a history's counts as a
+sequence computed on access, so trimming from the newest message back to the
+budget only counts the messages it looks at.
+
+The cache lives in the process, not in the graph state, so checkpoints do not
+carry it.
+"""
+
+import hashlib
+import json
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple, Union, overload
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+# Counts each message of a batch, e.g. ``condenser_core.FastTokenCounter.count_batch``.
+BatchTokenCounter = Callable[[List[BaseMessage]], List[int]]
+
+
+def message_digest(message: BaseMessage) -> str:
+    """Return a hash of what a message contributes to a prompt: type, content and tool calls."""
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(message.type.encode())
+    if isinstance(message.content, str):
+        digest.update(message.content.encode())
+    else:
+        digest.update(json.dumps(message.content, sort_keys=True, default=str).encode())
+    if isinstance(message, AIMessage) and message.tool_calls:
+        digest.update(
+            json.dumps(message.tool_calls, sort_keys=True, default=str).encode()
+        )
+    return digest.hexdigest()
+
+
+class TokenCountCache:
+    """Token count per message id, bounded to the ``maxsize`` most recently used ids.
+
+    Args:
+        count_batch: Counts the messages that are not cached.
+        maxsize: Number of message ids kept.
+    """
+
+    def __init__(self, count_batch: BatchTokenCounter, maxsize: int = 100_000) -> None:
+        self.count_batch = count_batch
+        self.maxsize = maxsize
+        # message id -> (weak reference to the counted message, content digest, count)
+        self._entries: OrderedDict[str, Tuple[weakref.ref[BaseMessage], str, int]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.misses = 0
+
+    def count(self, message: BaseMessage) -> int:
+        """Return the token count of ``message``, counting it only if it is new or changed."""
+        if message.id is None:
+            # Nothing to key it by (e.g. the system prompt); a single message is cheap to count
+            return self.count_batch([message])[0]
+        with self._lock:
+            entry = self._entries.get(message.id)
+            if entry is not None and entry[0]() is message:
+                self._entries.move_to_end(message.id)
+                return entry[2]
+        digest = message_digest(message)
+        if entry is not None and entry[1] == digest:
+            tokens = entry[2]
+        else:
+            self.misses += 1
+            tokens = self.count_batch([message])[0]
+        with self._lock:
+            self._entries[message.id] = (weakref.ref(message), digest, tokens)
+            self._entries.move_to_end(message.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return tokens
+
+    def counts(self, messages: Sequence[BaseMessage]) -> "CachedCounts":
+        """Return the counts of ``messages`` as a sequence computed on access."""
+        return CachedCounts(messages, self)
+
+    def clear(self) -> None:
+        """Drop every cached count."""
+        with self._lock:
+            self._entries.clear()
+
+
+class CachedCounts(Sequence[int]):
+    """Token counts aligned with a message sequence, each looked up when first read."""
+
+    __slots__ = ("_messages", "_cache", "_counts")
+
+    def __init__(self, messages: Sequence[BaseMessage], cache: TokenCountCache) -> None:
+        self._messages = messages
+        self._cache = cache
+        self._counts: List[Optional[int]] = [None] * len(messages)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    @overload
+    def __getitem__(self, index: int) -> int: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[int]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[int, List[int]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        tokens = self._counts[index]
+        if tokens is None:
+            tokens = self._counts[index] = self._cache.count(self._messages[index])
+        return tokens
@@ -0,0 +1,67 @@
+"""Block-wise, prefix-stable truncation.
+
+``trim_messages(strategy="last")`` moves the window forward by a message on
+almost every turn, so the prompt prefix changes on every call and provider
+prompt caches never hit. In block mode the window start stays fixed while the
+prompt grows. Once the prompt crosses the high watermark, the oldest turns
+are dropped in one chunk, down to the low watermark, and the new window
+starts on a human message. Between truncations each prompt is the previous
+one plus the new messages, so the system prompt and the retained prefix are
+byte-identical.
+"""
+
+from typing import Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+
+def find_window_start(messages: Sequence[BaseMessage], start_id: Optional[str]) -> int:
+    """Return the index of the message with id ``start_id``, or 0 if it is gone or unset."""
+    if start_id is None:
+        return 0
+    # The window start is usually recent: search from the newest message back
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].id == start_id:
+            return index
+    return 0
+
+
+def block_window_start(
+    messages: Sequence[BaseMessage],
+    counts: Sequence[int],
+    start: int,
+    high_watermark: int,
+    low_watermark: int,
+) -> int:
+    """Return the window start index, advancing it only when the window exceeds ``high_watermark``.
+
+    Args:
+        messages: The history (without the system prompt).
+        counts: Token counts aligned with ``messages``.
+        start: The current window start.
+        high_watermark: Token budget for the window; exceeding it triggers a truncation.
+        low_watermark: Target size of the window right after a truncation.
+
+    Returns:
+        ``start`` if the window still fits, otherwise the earliest human message whose
+        suffix fits ``low_watermark``. If even the last turn alone is larger than that,
+        the window starts at the last human message.
+    """
+    if sum(counts[start:]) <= high_watermark:
+        return start
+    new_start: Optional[int] = None
+    suffix = 0
+    for index in range(len(messages) - 1, start - 1, -1):
+        suffix += counts[index]
+        if suffix > low_watermark:
+            break
+        if isinstance(messages[index], HumanMessage):
+            new_start = index
+    if new_start is None:
+        humans = [
+            i
+            for i in range(start, len(messages))
+            if isinstance(messages[i], HumanMessage)
+        ]
+        new_start = humans[-1] if humans else start
+    return new_start
@@ -0,0 +1,22 @@
+"""Shared building blocks for the short-term memory condensers.
+
+Components in this package are used by ``manual_triming``,
+``selective_deletition``, ``summarization`` and ``Tokenaware_truncation``.
+"""
+
+from condenser_core.instrumentation import (
+    EventRecorder,
+    Instrumentation,
+    instrumentation,
+    log_event,
+)
+from condenser_core.token_counter import FastTokenCounter, keep_last_within_budget
+
+__all__ = [
+    "EventRecorder",
+    "FastTokenCounter",
+    "Instrumentation",
+    "instrumentation",
+    "keep_last_within_budget",
+    "log_event",
+]
@@ -0,0 +1,299 @@
+"""Run many conversations through a compiled graph with bounded concurrency.
+
+Replaying or evaluating thousands of threads one ``invoke`` at a time leaves
+the process idle for the whole model latency of every turn. ``BatchRunner``
+keeps up to ``max_concurrency`` threads in flight (turns of one thread run
+one after another, in order), pulls items from the input
+lazily (so the input can be a generator or an async stream), yields results
+as they complete and turns a failing item into an error result instead of
+aborting the batch.
+
+The request rate to the model is limited on the model itself: set
+``MODEL_REQUESTS_PER_SECOND`` in ``condenser_core.settings`` (see
+``condenser_core.models.get_rate_limiter``).
+
+Each item reports a ``batch_item`` event and each finished batch a ``batch``
+event with throughput figures to ``condenser_core.instrumentation``; the same
+figures are available as ``BatchRunner.stats``.
+"""
+
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from condenser_core.instrumentation import instrumentation
+
+BatchItem = Tuple[str, Any]
+
+
+class BatchResult(NamedTuple):
+    """Outcome of one item: the graph output, or the exception that ended it."""
+
+    thread_id: str
+    output: Any
+    error: Optional[BaseException]
+    duration_s: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class _ThreadQueue:
+    """Items waiting behind an in-flight item of the same thread.
+
+    Turns of one thread share its checkpoint, so they must run one at a time
+    and in input order.
+    """
+
+    def __init__(self) -> None:
+        self._waiting: Dict[str, Deque[Any]] = {}
+        self.size = 0
+
+    def admit(self, thread_id: str, graph_input: Any) -> bool:
+        """Return True if the item can start now; otherwise queue it behind its thread."""
+        waiting = self._waiting.get(thread_id)
+        if waiting is None:
+            self._waiting[thread_id] = deque()
+            return True
+        waiting.append(graph_input)
+        self.size += 1
+        return False
+
+    def release(self, thread_id: str) -> Any:
+        """Record that the thread's item finished; return its next input to start, or None."""
+        waiting = self._waiting[thread_id]
+        if not waiting:
+            del self._waiting[thread_id]
+            return None
+        self.size -= 1
+        return waiting.popleft()
+
+
+class BatchRunner:
+    """Bounded-concurrency runner for (thread_id, input) items.
+
+    Args:
+        graph: A compiled graph (any ``Runnable``). Use one compiled with a
+            checkpointer when items continue existing threads.
+        max_concurrency: Maximum number of items in flight. Items of the same
+            thread run one at a time, in input order.
+        config: Base config merged into every item's config; the item's
+            ``thread_id`` is set in ``configurable``.
+        name: Reported as ``name`` on the instrumentation events.
+    """
+
+    def __init__(
+        self,
+        graph: Runnable[Any, Any],
+        max_concurrency: int = 16,
+        config: Optional[RunnableConfig] = None,
+        name: str = "batch",
+    ) -> None:
+        self.graph = graph
+        self.max_concurrency = max_concurrency
+        self.config = config or {}
+        self.name = name
+        self.stats: Dict[str, float] = {}
+
+    def _config(self, thread_id: str) -> RunnableConfig:
+        config = dict(self.config)
+        config["configurable"] = {
+            **self.config.get("configurable", {}),
+            "thread_id": thread_id,
+        }
+        return config  # type: ignore[return-value]
+
+    def _finish_item(
+        self,
+        thread_id: str,
+        output: Any,
+        error: Optional[BaseException],
+        started: float,
+        durations: List[float],
+    ) -> BatchResult:
+        duration = time.monotonic() - started
+        durations.append(duration)
+        if instrumentation.enabled:
+            instrumentation.emit(
+                "batch_item",
+                name=self.name,
+                thread_id=thread_id,
+                duration_ms=duration * 1000,
+                failed=error is not None,
+            )
+        return BatchResult(thread_id, output, error, duration)
+
+    def _finish_batch(
+        self, started: float, durations: List[float], failed: int
+    ) -> None:
+        elapsed = time.monotonic() - started
+        ordered = sorted(durations)
+        self.stats = {
+            "items": len(durations),
+            "failed": failed,
+            "elapsed_s": elapsed,
+            "items_per_second": len(durations) / elapsed if elapsed > 0 else 0.0,
+            "p50_s": _percentile(ordered, 50),
+            "p95_s": _percentile(ordered, 95),
+        }
+        if instrumentation.enabled:
+            instrumentation.emit(
+                "batch",
+                name=self.name,
+                items=len(durations),
+                failed=failed,
+                duration_ms=elapsed * 1000,
+                items_per_second=self.stats["items_per_second"],
+            )
+
+    async def astream(
+        self, items: Union[Iterable[BatchItem], AsyncIterable[BatchItem]]
+    ) -> AsyncIterator[BatchResult]:
+        """Run ``items`` on the event loop and yield results in completion order."""
+        started = time.monotonic()
+        durations: List[float] = []
+        failed = 0
+
+        async def run_one(thread_id: str, graph_input: Any) -> BatchResult:
+            item_started = time.monotonic()
+            try:
+                output = await self.graph.ainvoke(graph_input, self._config(thread_id))
+            except Exception as e:
+                return self._finish_item(thread_id, None, e, item_started, durations)
+            return self._finish_item(thread_id, output, None, item_started, durations)
+
+        if isinstance(items, AsyncIterable):
+            source = items.__aiter__()
+
+            async def next_item() -> BatchItem:
+                return await source.__anext__()
+        else:
+            sync_source = iter(items)
+
+            async def next_item() -> BatchItem:
+                try:
+                    return next(sync_source)
+                except StopIteration:
+                    raise StopAsyncIteration from None
+
+        pending: Set[asyncio.Future[BatchResult]] = set()
+        queue = _ThreadQueue()
+        exhausted = False
+        try:
+            while True:
+                while (
+                    not exhausted
+                    and len(pending) < self.max_concurrency
+                    and queue.size < self.max_concurrency
+                ):
+                    try:
+                        thread_id, graph_input = await next_item()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    if queue.admit(thread_id, graph_input):
+                        pending.add(
+                            asyncio.ensure_future(run_one(thread_id, graph_input))
+                        )
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    result = task.result()
+                    following = queue.release(result.thread_id)
+                    if following is not None:
+                        pending.add(
+                            asyncio.ensure_future(run_one(result.thread_id, following))
+                        )
+                    failed += not result.ok
+                    yield result
+        finally:
+            for task in pending:
+                task.cancel()
+            self._finish_batch(started, durations, failed)
+
+    def stream(self, items: Iterable[BatchItem]) -> Iterator[BatchResult]:
+        """Run ``items`` on a thread pool and yield results in completion order."""
+        started = time.monotonic()
+        durations: List[float] = []
+        failed = 0
+
+        def run_one(thread_id: str, graph_input: Any) -> BatchResult:
+            item_started = time.monotonic()
+            try:
+                output = self.graph.invoke(graph_input, self._config(thread_id))
+            except Exception as e:
+                return self._finish_item(thread_id, None, e, item_started, durations)
+            return self._finish_item(thread_id, output, None, item_started, durations)
+
+        source = iter(items)
+        pending: Set[Future[BatchResult]] = set()
+        queue = _ThreadQueue()
+        with ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="batch"
+        ) as pool:
+            try:
+                while True:
+                    while (
+                        len(pending) < self.max_concurrency
+                        and queue.size < self.max_concurrency
+                    ):
+                        item = next(source, None)
+                        if item is None:
+                            break
+                        thread_id, graph_input = item
+                        if queue.admit(thread_id, graph_input):
+                            pending.add(pool.submit(run_one, thread_id, graph_input))
+                    if not pending:
+                        break
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = future.result()
+                        following = queue.release(result.thread_id)
+                        if following is not None:
+                            pending.add(
+                                pool.submit(run_one, result.thread_id, following)
+                            )
+                        failed += not result.ok
+                        yield result
+            finally:
+                for future in pending:
+                    future.cancel()
+                self._finish_batch(started, durations, failed)
+
+    def run(self, items: Iterable[BatchItem]) -> List[BatchResult]:
+        """Run every item and return the results in completion order."""
+        return list(self.stream(items))
+
+    async def arun(
+        self, items: Union[Iterable[BatchItem], AsyncIterable[BatchItem]]
+    ) -> List[BatchResult]:
+        """Async version of ``run``."""
+        return [result async for result in self.astream(items)]
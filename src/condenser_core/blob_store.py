@@ -0,0 +1,150 @@
+"""Out-of-band storage for large tool outputs.
+
+A tool result is serialized into ``ToolMessage.content`` and then lives in
+the graph state, so a large payload is re-sent to the model, re-counted and
+re-checkpointed on every later turn. ``BlobStore`` writes outputs over a size
+threshold to a content-addressed directory (one file per SHA-256 digest,
+written once) and leaves a compact reference with a short preview in the
+message. The model reads the full output on demand through the tool from
+``BlobStore.read_tool()``, which pages through the file with ``mmap``.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+READ_TOOL_NAME = "read_tool_output"
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobStore:
+    """Content-addressed file store for tool outputs.
+
+    Args:
+        root: Directory holding the blobs; created on first write.
+        min_chars: Outputs shorter than this stay inline in the message.
+        preview_chars: Characters of the output kept in the reference.
+        page_bytes: Default page size of the read tool.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, "os.PathLike[str]"],
+        min_chars: int = 2000,
+        preview_chars: int = 200,
+        page_bytes: int = 4000,
+    ) -> None:
+        self.root = Path(root)
+        self.min_chars = min_chars
+        self.preview_chars = preview_chars
+        self.page_bytes = page_bytes
+
+    def _path(self, digest: str) -> Path:
+        if not _DIGEST_RE.match(digest):
+            raise KeyError(f"Invalid blob id: {digest!r}")
+        return self.root / digest[:2] / digest[2:]
+
+    def put(self, text: str) -> str:
+        """Store ``text`` and return its digest; storing the same text again is a no-op."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        return digest
+
+    def size(self, digest: str) -> int:
+        """Return the size in bytes of a stored blob."""
+        try:
+            return self._path(digest).stat().st_size
+        except FileNotFoundError:
+            raise KeyError(f"Unknown blob id: {digest}") from None
+
+    def read(
+        self, digest: str, offset: int = 0, limit: Optional[int] = None
+    ) -> Tuple[str, int]:
+        """Return ``(text, next_offset)`` for ``limit`` bytes of a blob starting at byte ``offset``.
+
+        ``next_offset`` is the byte offset to continue from, or -1 at the end.
+        A multi-byte character cut by the page boundary is carried to the next page.
+        """
+        try:
+            f = open(self._path(digest), "rb")
+        except FileNotFoundError:
+            raise KeyError(f"Unknown blob id: {digest}") from None
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            offset = min(max(offset, 0), size)
+            end = size if limit is None else min(offset + max(limit, 1), size)
+            if offset == end:
+                return "", -1
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                # Continuation bytes (0b10xxxxxx) cannot start a page: back off to the
+                # character start, or extend past it when the page holds a single character
+                stop = end
+                while offset < stop < size and view[stop] & 0xC0 == 0x80:
+                    stop -= 1
+                if stop == offset:
+                    stop = end
+                    while stop < size and view[stop] & 0xC0 == 0x80:
+                        stop += 1
+                end = stop
+                chunk = view[offset:end]
+        return chunk.decode("utf-8", errors="ignore"), (end if end < size else -1)
+
+    def get(self, digest: str) -> str:
+        """Return the whole blob."""
+        return self.read(digest)[0]
+
+    def offload(self, content: str) -> str:
+        """Return ``content`` unchanged if it is small, else store it and return a reference."""
+        if len(content) < self.min_chars:
+            return content
+        digest = self.put(content)
+        return json.dumps(
+            {
+                "blob": digest,
+                "chars": len(content),
+                "preview": content[: self.preview_chars],
+                "note": f"Output stored out of band; call {READ_TOOL_NAME} with this blob id to read it.",
+            }
+        )
+
+    def read_tool(self) -> BaseTool:
+        """Return the tool the model uses to read offloaded outputs page by page."""
+
+        def read_tool_output(blob: str, offset: int = 0) -> str:
+            text, next_offset = self.read(blob, offset, self.page_bytes)
+            return json.dumps(
+                {
+                    "blob": blob,
+                    "offset": offset,
+                    "next_offset": next_offset,
+                    "content": text,
+                }
+            )
+
+        return StructuredTool.from_function(
+            read_tool_output,
+            name=READ_TOOL_NAME,
+            description=(
+                "Read a tool output that was stored out of band. Pass the blob id from the "
+                "reference and a byte offset (start at 0; continue from next_offset until it is -1)."
+            ),
+        )
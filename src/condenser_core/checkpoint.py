@@ -0,0 +1,716 @@
+"""SQLite checkpointer that stores message histories as deltas.
+
+The stock savers write every changed channel in full, so a thread whose
+history holds N messages pays O(N) serialization and disk I/O on every step,
+even when the step only appended a reply or removed the two oldest messages.
+``DeltaSqliteSaver`` stores a message-list channel as a chain of deltas
+instead. Each version records the ids that were removed since its base
+version and the messages that were appended. A version whose chain would
+grow past ``snapshot_every`` deltas is stored in full, which bounds the
+replay when a thread is resumed. ``compact()`` drops old checkpoints and
+folds the surviving versions into snapshots. It runs automatically every
+``compact_every`` checkpoints of a thread.
+
+Changes that are not "drop some, append some", such as a summary message
+replacing the history or an edit in place, are stored as a snapshot.
+Channels that do not hold messages are stored whole, as they are by the
+stock savers.
+"""
+
+import asyncio
+import atexit
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeGuard,
+)
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+from condenser_core.session_cache import HotSessionSaver
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS message_deltas (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    base_version TEXT,
+    depth INTEGER NOT NULL,
+    removed TEXT NOT NULL,
+    added_type TEXT NOT NULL,
+    added BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# (thread_id, checkpoint_ns, channel)
+_ChannelKey = Tuple[str, str, str]
+
+
+def _is_message_list(value: Any) -> TypeGuard[List[BaseMessage]]:
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(m, BaseMessage) for m in value)
+    )
+
+
+def _message_key(message: BaseMessage) -> str:
+    """Return the message id, or a content hash for messages without one (custom reducers)."""
+    if message.id:
+        return message.id
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(message.type.encode())
+    digest.update(json.dumps(message.content, sort_keys=True, default=str).encode())
+    digest.update(str(getattr(message, "tool_call_id", "")).encode())
+    return f"~{digest.hexdigest()}"
+
+
+def _delta(
+    old: List[BaseMessage], new: List[BaseMessage]
+) -> Optional[Tuple[List[str], List[BaseMessage]]]:
+    """Express ``new`` as ``old`` minus some messages plus appended ones, or None if it is not."""
+    new_keys = [_message_key(m) for m in new]
+    new_key_set = set(new_keys)
+    if len(new_key_set) != len(new_keys):
+        return None
+    old_keys = [_message_key(m) for m in old]
+    if len(set(old_keys)) != len(old_keys):
+        # Id-less messages with equal content share a key; removal by key would be ambiguous
+        return None
+    removed = [key for key in old_keys if key not in new_key_set]
+    kept = len(old) - len(removed)
+    if kept > len(new):
+        return None
+    old_kept = (m for m, key in zip(old, old_keys) if key in new_key_set)
+    for new_message, old_message in zip(new[:kept], old_kept):
+        # Identity is the common case: the channel hands back the objects it was given
+        if new_message is not old_message and new_message != old_message:
+            return None
+    return removed, new[kept:]
+
+
+class DeltaSqliteSaver(BaseCheckpointSaver[str]):
+    """File-backed checkpointer that writes message histories as deltas.
+
+    Args:
+        path: SQLite database file (``":memory:"`` for a private in-memory database).
+        serde: Serializer for checkpoints and values; defaults to the LangGraph serializer.
+        snapshot_every: Maximum length of a delta chain before a version is stored in full.
+        compact_every: Compact a thread after this many checkpoints of it; ``None`` disables.
+        keep_last: Checkpoints per thread kept by automatic compaction.
+        cache_size: Number of (thread, channel) message lists kept in memory as diff bases.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        *,
+        serde: Optional[SerializerProtocol] = None,
+        snapshot_every: int = 64,
+        compact_every: Optional[int] = 200,
+        keep_last: int = 10,
+        cache_size: int = 128,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.compact_every = compact_every
+        self.keep_last = keep_last
+        self.cache_size = cache_size
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._latest: OrderedDict[_ChannelKey, Tuple[str, List[BaseMessage]]] = (
+            OrderedDict()
+        )
+        self._puts_since_compaction: Dict[Tuple[str, str], int] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The database connection, opened (and the schema created) on first use."""
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    conn = sqlite3.connect(
+                        self.path, check_same_thread=False, isolation_level=None
+                    )
+                    if self.path != ":memory:":
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.execute("PRAGMA synchronous=NORMAL")
+                    conn.executescript(_SCHEMA)
+                    self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        """Close the database connection, if it was opened."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+
+    # --- message channel storage ---
+
+    def _remember(
+        self, key: _ChannelKey, version: str, messages: List[BaseMessage]
+    ) -> None:
+        self._latest[key] = (version, messages)
+        self._latest.move_to_end(key)
+        while len(self._latest) > self.cache_size:
+            self._latest.popitem(last=False)
+
+    def _write_messages(
+        self, key: _ChannelKey, version: str, messages: List[BaseMessage]
+    ) -> None:
+        base = self._latest.get(key)
+        delta = None
+        depth = 0
+        if base is not None:
+            row = self.conn.execute(
+                "SELECT depth FROM message_deltas WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+                (*key, base[0]),
+            ).fetchone()
+            if row is not None and row[0] + 1 < self.snapshot_every:
+                delta = _delta(base[1], messages)
+                depth = row[0] + 1
+        removed: List[str]
+        if delta is None:
+            base_version, removed, added, depth = None, [], messages, 0
+        else:
+            base_version, (removed, added) = base[0], delta  # type: ignore[index]
+        added_type, added_blob = self.serde.dumps_typed(list(added))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO message_deltas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                *key,
+                version,
+                base_version,
+                depth,
+                json.dumps(removed),
+                added_type,
+                added_blob,
+            ),
+        )
+        self._remember(key, version, list(messages))
+
+    def _load_messages(
+        self, key: _ChannelKey, version: str
+    ) -> Optional[List[BaseMessage]]:
+        cached = self._latest.get(key)
+        if cached is not None and cached[0] == version:
+            self._latest.move_to_end(key)
+            return list(cached[1])
+        chain = []
+        current: Optional[str] = version
+        while current is not None:
+            row = self.conn.execute(
+                "SELECT base_version, removed, added_type, added FROM message_deltas "
+                "WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+                (*key, current),
+            ).fetchone()
+            if row is None:
+                # Unknown version, or its base was compacted away
+                return None
+            chain.append(row)
+            current = row[0]
+        messages: List[BaseMessage] = []
+        for _, removed, added_type, added in reversed(chain):
+            removed_keys = set(json.loads(removed))
+            if removed_keys:
+                messages = [m for m in messages if _message_key(m) not in removed_keys]
+            messages.extend(self.serde.loads_typed((added_type, added)))
+        self._remember(key, version, messages)
+        return list(messages)
+
+    # --- BaseCheckpointSaver ---
+
+    def _load_values(
+        self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions
+    ) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        for channel, version in versions.items():
+            row = self.conn.execute(
+                "SELECT type, value FROM blobs WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is not None:
+                if row[0] != "empty":
+                    values[channel] = self.serde.loads_typed((row[0], row[1]))
+                continue
+            messages = self._load_messages(
+                (thread_id, checkpoint_ns, channel), str(version)
+            )
+            if messages is not None:
+                values[channel] = messages
+        return values
+
+    def _tuple(
+        self, thread_id: str, checkpoint_ns: str, row: Sequence[Any]
+    ) -> CheckpointTuple:
+        (
+            checkpoint_id,
+            parent_id,
+            type_,
+            checkpoint_blob,
+            metadata_type,
+            metadata_blob,
+        ) = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, checkpoint_blob))
+        writes = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_values(
+                    thread_id, checkpoint_ns, checkpoint["channel_versions"]
+                ),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((t, v)))
+                for task_id, channel, t, v in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Return the requested checkpoint, or the thread's latest one if no id is given."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints, newest first, filtered like the stock savers."""
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints"
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id=?")
+            params.append(config["configurable"]["thread_id"])
+            if (
+                checkpoint_ns := config["configurable"].get("checkpoint_ns")
+            ) is not None:
+                clauses.append("checkpoint_ns=?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id=?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id<?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                item = self._tuple(thread_id, checkpoint_ns, row)
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint, writing message channels as deltas against their last version."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        saved = checkpoint.copy()
+        values: Dict[str, Any] = saved.pop("channel_values")  # type: ignore[misc]
+        type_, checkpoint_blob = self.serde.dumps_typed(saved)
+        metadata_type, metadata_blob = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                for channel, version in new_versions.items():
+                    value = values.get(channel)
+                    if _is_message_list(value):
+                        self._write_messages(
+                            (thread_id, checkpoint_ns, channel), str(version), value
+                        )
+                        continue
+                    blob = (
+                        self.serde.dumps_typed(value)
+                        if channel in values
+                        else ("empty", b"")
+                    )
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                        (thread_id, checkpoint_ns, channel, str(version), *blob),
+                    )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        config["configurable"].get("checkpoint_id"),
+                        type_,
+                        checkpoint_blob,
+                        metadata_type,
+                        metadata_blob,
+                    ),
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                # The cached diff bases may now be ahead of the database
+                self._latest.clear()
+                raise
+            key = (thread_id, checkpoint_ns)
+            self._puts_since_compaction[key] = (
+                self._puts_since_compaction.get(key, 0) + 1
+            )
+            if (
+                self.compact_every is not None
+                and self._puts_since_compaction[key] >= self.compact_every
+            ):
+                self.compact(thread_id, keep_last=self.keep_last)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store the pending writes of a task."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            rows.append(
+                (
+                    write_idx >= 0,
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint_id,
+                        task_id,
+                        write_idx,
+                        channel,
+                        *self.serde.dumps_typed(value),
+                        task_path,
+                    ),
+                )
+            )
+        with self._lock:
+            for keep_existing, row in rows:
+                verb = "INSERT OR IGNORE" if keep_existing else "INSERT OR REPLACE"
+                self.conn.execute(
+                    f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint, write and stored value of a thread."""
+        with self._lock:
+            for table in ("checkpoints", "blobs", "message_deltas", "writes"):
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id=?", (thread_id,)
+                )
+            for key in [k for k in self._latest if k[0] == thread_id]:
+                del self._latest[key]
+            for thread_key in [
+                k for k in self._puts_since_compaction if k[0] == thread_id
+            ]:
+                del self._puts_since_compaction[thread_key]
+
+    def compact(self, thread_id: Optional[str] = None, keep_last: int = 1) -> None:
+        """Drop all but the ``keep_last`` newest checkpoints and fold deltas into snapshots.
+
+        Args:
+            thread_id: Thread to compact; ``None`` compacts every thread.
+            keep_last: Number of newest checkpoints kept per thread and namespace.
+        """
+        with self._lock:
+            if thread_id is None:
+                targets = self.conn.execute(
+                    "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints"
+                ).fetchall()
+            else:
+                targets = self.conn.execute(
+                    "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints WHERE thread_id=?",
+                    (thread_id,),
+                ).fetchall()
+            for tid, ns in targets:
+                self._compact_one(tid, ns, max(keep_last, 1))
+                self._puts_since_compaction.pop((tid, ns), None)
+
+    def _compact_one(self, thread_id: str, checkpoint_ns: str, keep_last: int) -> None:
+        rows = self.conn.execute(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? "
+            "ORDER BY checkpoint_id DESC",
+            (thread_id, checkpoint_ns),
+        ).fetchall()
+        kept, dropped = rows[:keep_last], [r[0] for r in rows[keep_last:]]
+        referenced = set()
+        for _, type_, blob in kept:
+            for channel, version in self.serde.loads_typed((type_, blob))[
+                "channel_versions"
+            ].items():
+                referenced.add((channel, str(version)))
+        # Materialize the surviving message versions before their bases are deleted
+        snapshots = []
+        for channel, version in referenced:
+            row = self.conn.execute(
+                "SELECT depth FROM message_deltas WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+                (thread_id, checkpoint_ns, channel, version),
+            ).fetchone()
+            if row is not None and row[0] > 0:
+                messages = self._load_messages(
+                    (thread_id, checkpoint_ns, channel), version
+                )
+                snapshots.append(
+                    (channel, version, self.serde.dumps_typed(messages or []))
+                )
+        self.conn.execute("BEGIN")
+        try:
+            for channel, version, (added_type, added) in snapshots:
+                self.conn.execute(
+                    "UPDATE message_deltas SET base_version=NULL, depth=0, removed='[]', added_type=?, added=? "
+                    "WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+                    (added_type, added, thread_id, checkpoint_ns, channel, version),
+                )
+            for checkpoint_id in dropped:
+                for table in ("checkpoints", "writes"):
+                    self.conn.execute(
+                        f"DELETE FROM {table} WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?",
+                        (thread_id, checkpoint_ns, checkpoint_id),
+                    )
+            if kept:
+                self.conn.execute(
+                    "UPDATE checkpoints SET parent_checkpoint_id=NULL WHERE thread_id=? AND checkpoint_ns=? "
+                    "AND checkpoint_id=?",
+                    (thread_id, checkpoint_ns, kept[-1][0]),
+                )
+            for table in ("blobs", "message_deltas"):
+                stored = self.conn.execute(
+                    f"SELECT channel, version FROM {table} WHERE thread_id=? AND checkpoint_ns=?",
+                    (thread_id, checkpoint_ns),
+                ).fetchall()
+                for channel, version in stored:
+                    if (channel, version) not in referenced:
+                        self.conn.execute(
+                            f"DELETE FROM {table} WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+                            (thread_id, checkpoint_ns, channel, version),
+                        )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        # Cached diff bases may point at versions that no longer exist
+        for key in [k for k in self._latest if k[:2] == (thread_id, checkpoint_ns)]:
+            if (key[2], self._latest[key][0]) not in referenced:
+                del self._latest[key]
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Async version of ``get_tuple``."""
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Async version of ``list``."""
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Async version of ``put``."""
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Async version of ``put_writes``."""
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Async version of ``delete_thread``."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+_savers: Dict[
+    Tuple[str, Optional[int], Optional[int], Optional[int]], BaseCheckpointSaver[str]
+] = {}
+_savers_lock = threading.Lock()
+
+
+def get_saver(
+    path: str,
+    hot_sessions: Optional[int] = None,
+    hot_session_bytes: Optional[int] = None,
+    hot_session_flush_every: Optional[int] = None,
+) -> BaseCheckpointSaver[str]:
+    """Return the process-wide saver for ``path`` so graphs using the same file share one connection.
+
+    With ``hot_sessions`` the ``DeltaSqliteSaver`` is wrapped in a
+    ``HotSessionSaver`` that keeps up to that many recently active threads
+    (and at most ``hot_session_bytes`` of them) in memory and writes each
+    back after ``hot_session_flush_every`` of its checkpoints (see
+    ``HotSessionSaver``). Hot sessions are flushed to the file when the
+    process exits.
+    """
+    with _savers_lock:
+        saver = _savers.get((path, None, None, None))
+        if saver is None:
+            saver = _savers[(path, None, None, None)] = DeltaSqliteSaver(path)
+        if hot_sessions is None:
+            return saver
+        key = (path, hot_sessions, hot_session_bytes, hot_session_flush_every)
+        hot = _savers.get(key)
+        if hot is None:
+            hot = _savers[key] = HotSessionSaver(
+                saver,
+                max_sessions=hot_sessions,
+                max_bytes=hot_session_bytes,
+                flush_every=hot_session_flush_every,
+            )
+            atexit.register(hot.flush)
+        return hot
@@ -0,0 +1,176 @@
+"""Deterministic, offline stand-ins for the chat model.
+
+``FakeChatModel`` lets the graphs run without provider credentials, e.g. in
+benchmarks and unit tests. It answers tool-worthy questions with a tool call,
+answers everything else with a fixed-size reply, and records what it was sent.
+"""
+
+import json
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+from condenser_core.token_counter import FastTokenCounter
+
+
+def _cache_key(message: BaseMessage) -> Tuple[Any, ...]:
+    # What a provider would serialize for the prompt; ids and metadata do not count.
+    return (
+        message.type,
+        str(message.content),
+        repr(getattr(message, "tool_calls", None)),
+        getattr(message, "tool_call_id", None),
+    )
+
+
+class FakeChatModel(BaseChatModel):
+    """Scripted chat model that counts calls and prompt tokens.
+
+    * If the last message is a human message containing ``tool_keyword`` and
+      tools are bound, it calls the first bound tool with ``tool_args``.
+    * Otherwise it replies with ``reply_chars`` characters of text.
+
+    Calls made with tools bound are counted as agent calls; calls without
+    tools (the summarizer) are counted as summary calls. ``bind_tools``
+    returns a copy that shares the same ``stats`` dict.
+
+    Agent calls also simulate a provider prompt cache: the tokens of the
+    longest message prefix shared with the previous agent prompt are added to
+    ``cached_prompt_tokens`` (and the call to ``cache_hits``) when that prefix
+    is at least ``cache_min_tokens`` long.
+
+    Streaming splits the reply into ``stream_chunk_chars``-character chunks
+    and each tool call's arguments into two chunks, with ``stream_delay``
+    seconds before every chunk.
+    """
+
+    reply_chars: int = 80
+    tool_keyword: str = "weather"
+    tool_args: Dict[str, Any] = Field(default_factory=lambda: {"location": "sf"})
+    bound_tools: List[str] = Field(default_factory=list)
+    stats: Dict[str, Any] = Field(default_factory=dict)
+    cache_min_tokens: int = 0
+    stream_chunk_chars: int = 16
+    stream_delay: float = 0.0
+    token_counter: Any = Field(default_factory=FastTokenCounter, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-condenser-chat"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "FakeChatModel":
+        names = [getattr(t, "name", None) or t.__name__ for t in tools]
+        return self.model_copy(update={"bound_tools": names})
+
+    def _record(self, messages: List[BaseMessage]) -> None:
+        stats = self.stats
+        kind = "agent" if self.bound_tools else "summary"
+        stats[f"{kind}_calls"] = stats.get(f"{kind}_calls", 0) + 1
+        stats[f"{kind}_prompt_tokens"] = stats.get(
+            f"{kind}_prompt_tokens", 0
+        ) + self.token_counter(messages)
+        if self.bound_tools:
+            previous = stats.get("last_prompt") or []
+            shared = 0
+            for old, new in zip(previous, messages):
+                if _cache_key(old) != _cache_key(new):
+                    break
+                shared += 1
+            cached = self.token_counter(messages[:shared]) if shared else 0
+            if shared and cached >= self.cache_min_tokens:
+                stats["cached_prompt_tokens"] = (
+                    stats.get("cached_prompt_tokens", 0) + cached
+                )
+                stats["cache_hits"] = stats.get("cache_hits", 0) + 1
+            stats["last_prompt"] = messages
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        calls = self.stats.get("agent_calls", 0) + self.stats.get("summary_calls", 0)
+        last = messages[-1] if messages else None
+        if (
+            self.bound_tools
+            and isinstance(last, HumanMessage)
+            and self.tool_keyword in str(last.content).lower()
+        ):
+            return AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": self.bound_tools[0],
+                        "args": dict(self.tool_args),
+                        "id": f"call_{calls}",
+                    }
+                ],
+            )
+        prefix = (
+            "Summary"
+            if not self.bound_tools
+            else ("Tool answer" if isinstance(last, ToolMessage) else "Reply")
+        )
+        text = f"{prefix} #{calls}. "
+        return AIMessage(
+            content=(text * (self.reply_chars // len(text) + 1))[: self.reply_chars]
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._record(messages)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        self._record(messages)
+        reply = self._respond(messages)
+        content = reply.content
+        pieces: List[AIMessageChunk] = [
+            AIMessageChunk(content=content[i : i + self.stream_chunk_chars])
+            for i in range(0, len(content), self.stream_chunk_chars)
+        ]
+        for index, call in enumerate(reply.tool_calls):
+            args = json.dumps(call["args"])
+            half = len(args) // 2
+            pieces.append(
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": call["name"],
+                            "args": args[:half],
+                            "id": call["id"],
+                            "index": index,
+                        }
+                    ],
+                )
+            )
+            pieces.append(
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {"name": None, "args": args[half:], "id": None, "index": index}
+                    ],
+                )
+            )
+        for piece in pieces:
+            if self.stream_delay:
+                time.sleep(self.stream_delay)
+            yield ChatGenerationChunk(message=piece)
@@ -0,0 +1,175 @@
+"""Structured, low-overhead instrumentation for the condenser graphs.
+
+The graphs used to trace every step with ``print``, which is slow under load
+and cannot be aggregated. Instead they report events to ``instrumentation``:
+
+* ``node``: wall time of a graph node (``graph``, ``name``, ``duration_ms``).
+* ``condense``: one condensation step (``messages_before``, ``messages_after``,
+  ``dropped`` and, where known, ``tokens_before`` / ``tokens_after``).
+* ``summarize``: one summarizer run (``duration_ms``, ``messages``).
+* ``tool``: one tool execution (``name``, ``duration_ms``, ``cached``) and
+  ``tool_error`` for failed calls.
+* ``first_token``: time from a streamed model call to its first chunk
+  (``duration_ms``, see ``condenser_core.streaming``).
+
+Instrumentation is off until a listener is added or ``enable()`` is called;
+while it is off every hook returns after a single attribute check, and callers
+guard any extra work (such as counting tokens) with ``instrumentation.enabled``.
+Enabled, each event updates in-process counters and is passed to listeners as
+a plain dict, e.g. ``EventRecorder`` or ``log_event``.
+"""
+
+import functools
+import inspect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar, cast
+
+Event = Dict[str, Any]
+Listener = Callable[[Event], None]
+F = TypeVar("F", bound=Callable[..., Any])
+
+logger = logging.getLogger(__name__)
+
+
+class Instrumentation:
+    """Dispatches events to listeners and keeps per-event counters.
+
+    Counters are keyed by ``event`` plus the ``graph`` and ``name`` fields, e.g.
+    ``"node:summarization/conversation"``, and hold the number of events and
+    the sum of every numeric field.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._listeners: List[Listener] = []
+        self._counters: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        """Start recording counters, even without listeners."""
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop recording; listeners are kept and resume on ``enable()``."""
+        self.enabled = False
+
+    def add_listener(self, listener: Listener) -> None:
+        """Register ``listener`` for every event and enable instrumentation."""
+        with self._lock:
+            self._listeners.append(listener)
+        self.enabled = True
+
+    def remove_listener(self, listener: Listener) -> None:
+        """Unregister ``listener``; instrumentation is disabled when none are left."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+            if not self._listeners:
+                self.enabled = False
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """Record one event; a no-op while disabled."""
+        if not self.enabled:
+            return
+        record: Event = {"event": event, "ts": time.time(), **fields}
+        key = "/".join(str(fields[k]) for k in ("graph", "name") if k in fields)
+        key = f"{event}:{key}" if key else event
+        with self._lock:
+            counter = self._counters.setdefault(key, {"count": 0})
+            counter["count"] += 1
+            for field, value in fields.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    counter[field] = counter.get(field, 0) + value
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(record)
+            except Exception:
+                logger.exception("Instrumentation listener failed")
+
+    @contextmanager
+    def timed(self, event: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """Time the ``with`` block and emit ``event`` with ``duration_ms``.
+
+        Yields a dict; fields added to it inside the block are included in the event.
+        """
+        if not self.enabled:
+            yield {}
+            return
+        extra: Dict[str, Any] = {}
+        started = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self.emit(event, **{**fields, **extra, "duration_ms": duration_ms})
+
+    def node(self, graph: str, name: str) -> Callable[[F], F]:
+        """Decorate a sync or async node function to emit a ``node`` timing event.
+
+        The wrapper keeps the wrapped signature, so ``RunnableLambda`` still
+        passes ``config`` to nodes that accept it.
+        """
+
+        def decorator(func: F) -> F:
+            if inspect.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    with self.timed("node", graph=graph, name=name):
+                        return await func(*args, **kwargs)
+
+                return cast(F, async_wrapper)
+
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.timed("node", graph=graph, name=name):
+                    return func(*args, **kwargs)
+
+            return cast(F, wrapper)
+
+        return decorator
+
+    def counters(self) -> Dict[str, Dict[str, float]]:
+        """Return a snapshot of the counters."""
+        with self._lock:
+            return {key: dict(values) for key, values in self._counters.items()}
+
+    def reset(self) -> None:
+        """Clear the counters."""
+        with self._lock:
+            self._counters.clear()
+
+
+class EventRecorder:
+    """Listener that keeps events in memory, optionally only the last ``maxlen``."""
+
+    def __init__(self, maxlen: Optional[int] = None) -> None:
+        self.maxlen = maxlen
+        self.events: List[Event] = []
+
+    def __call__(self, event: Event) -> None:
+        """Record ``event``, dropping the oldest events beyond ``maxlen``."""
+        self.events.append(event)
+        if self.maxlen is not None and len(self.events) > self.maxlen:
+            del self.events[: len(self.events) - self.maxlen]
+
+    def of_type(self, event: str) -> List[Event]:
+        """Return the recorded events named ``event``."""
+        return [e for e in self.events if e["event"] == event]
+
+
+def log_event(event: Event) -> None:
+    """Log each event at DEBUG level on the ``condenser_core.instrumentation`` logger (a listener)."""
+    logger.debug("%s", event)
+
+
+# Process-wide instance used by all four graphs and the tool executor.
+instrumentation = Instrumentation()
@@ -0,0 +1,229 @@
+"""Lazily constructed, shared chat models.
+
+Each package's ``configuration.py`` used to call ``init_chat_model`` and
+``bind_tools`` at import time, so loading the four graphs built four provider
+clients (and imported the provider SDK) before any request arrived. The
+configurations now declare ``LazyChatModel`` placeholders instead; the real
+model is built on first use and cached in a process-wide registry, so packages
+configured with the same model and parameters share one client.
+"""
+
+import json
+import threading
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+# A chat model, or one with tools bound
+ChatRunnable = Runnable[LanguageModelInput, BaseMessage]
+
+_models: Dict[Hashable, ChatRunnable] = {}
+_rate_limiters: Dict[Hashable, Any] = {}
+_lock = threading.Lock()
+# Bumped by clear_models() so LazyChatModel instances drop their resolved model
+_generation = 0
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return cast(Hashable, value)
+
+
+def _tool_name(tool: Any) -> str:
+    return getattr(tool, "name", None) or getattr(tool, "__name__", None) or repr(tool)
+
+
+def _tool_key(tool: Any) -> str:
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+
+    try:
+        return json.dumps(convert_to_openai_tool(tool), sort_keys=True, default=str)
+    except Exception:
+        return _tool_name(tool)
+
+
+def get_chat_model(model: str, **kwargs: Any) -> BaseChatModel:
+    """Return the shared chat model for ``model`` and ``kwargs``, building it on first use.
+
+    Args:
+        model: Model identifier for ``init_chat_model``, e.g. ``"google_genai:gemini-2.0-flash"``.
+        **kwargs: Extra ``init_chat_model`` arguments; they are part of the cache key.
+    """
+    key = (model, _freeze(kwargs))
+    chat_model = _models.get(key)
+    if chat_model is None:
+        with _lock:
+            chat_model = _models.get(key)
+            if chat_model is None:
+                # Imported here so importing a configuration does not load langchain or the provider SDK
+                from langchain.chat_models import init_chat_model
+
+                chat_model = _models[key] = init_chat_model(model, **kwargs)
+    return chat_model  # type: ignore[return-value]
+
+
+def get_chat_model_with_tools(
+    model: str, tools: Sequence[Any], **kwargs: Any
+) -> ChatRunnable:
+    """Return the shared ``get_chat_model(model, **kwargs).bind_tools(tools)``.
+
+    Bindings are cached by the tools' schemas, so packages exposing the same
+    tools share one bound model.
+    """
+    key = (model, _freeze(kwargs), tuple(_tool_key(t) for t in tools))
+    bound = _models.get(key)
+    if bound is None:
+        base = get_chat_model(model, **kwargs)
+        with _lock:
+            bound = _models.get(key)
+            if bound is None:
+                bound = _models[key] = base.bind_tools(tools)
+    return bound
+
+
+def get_rate_limiter(model: str, requests_per_second: Optional[float]) -> Optional[Any]:
+    """Return the shared ``InMemoryRateLimiter`` for ``model``, or None without a limit.
+
+    Every package configured with the same model and rate gets the same limiter,
+    so the limit applies to the model as a whole rather than to each graph.
+    """
+    if not requests_per_second:
+        return None
+    key = ("rate_limiter", model, requests_per_second)
+    limiter = _rate_limiters.get(key)
+    if limiter is None:
+        from langchain_core.rate_limiters import InMemoryRateLimiter
+
+        with _lock:
+            limiter = _rate_limiters.get(key)
+            if limiter is None:
+                limiter = _rate_limiters[key] = InMemoryRateLimiter(
+                    requests_per_second=requests_per_second,
+                    check_every_n_seconds=min(0.1, 1 / requests_per_second),
+                    max_bucket_size=max(1, requests_per_second),
+                )
+    return limiter
+
+
+def clear_models() -> None:
+    """Drop every cached model (e.g. after changing credentials, or in tests)."""
+    global _generation
+    with _lock:
+        _models.clear()
+        _rate_limiters.clear()
+        _generation += 1
+
+
+class LazyChatModel(Runnable[LanguageModelInput, BaseMessage]):
+    """Placeholder for a chat model that is built from the registry on first use.
+
+    It is a ``Runnable``, so nodes can call ``invoke``/``ainvoke``/``stream``
+    on it and chains can be composed with ``|`` without building the model.
+    Other attributes (e.g. ``get_num_tokens_from_messages``) are forwarded to
+    the resolved model.
+
+    Args:
+        model: Model identifier for ``init_chat_model``.
+        tools: Tools to bind; ``None`` for the plain model.
+        **kwargs: Extra ``init_chat_model`` arguments.
+    """
+
+    def __init__(
+        self, model: str, tools: Optional[Sequence[Any]] = None, **kwargs: Any
+    ) -> None:
+        self.model = model
+        self.tools = list(tools) if tools is not None else None
+        self.kwargs = kwargs
+        self._resolved: Optional[Tuple[int, ChatRunnable]] = None
+
+    @property
+    def resolved(self) -> ChatRunnable:
+        """The underlying (shared) model, built on first access."""
+        cached = self._resolved
+        if cached is not None and cached[0] == _generation:
+            return cached[1]
+        generation = _generation
+        if self.tools is None:
+            resolved: ChatRunnable = get_chat_model(self.model, **self.kwargs)
+        else:
+            resolved = get_chat_model_with_tools(self.model, self.tools, **self.kwargs)
+        self._resolved = (generation, resolved)
+        return resolved
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> ChatRunnable:
+        """Return a lazy model with ``tools`` bound (still built on first use).
+
+        Extra binding arguments (e.g. ``tool_choice``) are passed to the
+        resolved model's ``bind_tools``, which builds the model now.
+        """
+        if kwargs:
+            model: Any = self.resolved
+            return cast(ChatRunnable, model.bind_tools(tools, **kwargs))
+        return LazyChatModel(self.model, tools=tools, **self.kwargs)
+
+    def invoke(
+        self,
+        input: LanguageModelInput,
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any,
+    ) -> BaseMessage:
+        return self.resolved.invoke(input, config, **kwargs)
+
+    async def ainvoke(
+        self,
+        input: LanguageModelInput,
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any,
+    ) -> BaseMessage:
+        return await self.resolved.ainvoke(input, config, **kwargs)
+
+    def batch(
+        self, inputs: List[LanguageModelInput], config: Any = None, **kwargs: Any
+    ) -> List[BaseMessage]:
+        return self.resolved.batch(inputs, config, **kwargs)
+
+    async def abatch(
+        self, inputs: List[LanguageModelInput], config: Any = None, **kwargs: Any
+    ) -> List[BaseMessage]:
+        return await self.resolved.abatch(inputs, config, **kwargs)
+
+    def stream(
+        self,
+        input: LanguageModelInput,
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any,
+    ) -> Iterator[BaseMessage]:
+        return self.resolved.stream(input, config, **kwargs)
+
+    def astream(
+        self,
+        input: LanguageModelInput,
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[BaseMessage]:
+        return self.resolved.astream(input, config, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_") or name in ("model", "tools", "kwargs"):
+            raise AttributeError(name)
+        return getattr(self.resolved, name)
+
+    def __repr__(self) -> str:
+        tools: Tuple[str, ...] = tuple(_tool_name(t) for t in self.tools or ())
+        return f"LazyChatModel({self.model!r}, tools={list(tools) if self.tools is not None else None})"
@@ -0,0 +1,122 @@
+"""Prompt assembly for the agent nodes without copying the history.
+
+Each agent call used to build a new ``SystemMessage`` and a new list,
+``[system_prompt] + state["messages"]``, so every turn copied the whole
+history once more before the model client converted it again.
+``PromptAssembler`` builds the system message once and returns a
+``PromptView``: a read-only sequence over the system prefix, the optional
+summary message and the history, indexed and iterated in place. Summary
+messages are cached by text, so a thread's summary is wrapped once per
+change, not once per call.
+"""
+
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate, chain
+from typing import Iterator, List, Optional, Sequence, Tuple, Union, overload
+
+from langchain_core.messages import BaseMessage, SystemMessage
+
+
+class PromptView(Sequence[BaseMessage]):
+    """Read-only concatenation of message sequences.
+
+    Args:
+        parts: The sequences, in prompt order. They are referenced, not
+            copied; a view is built per model call and the parts must not
+            change while it is in use.
+    """
+
+    __slots__ = ("_parts", "_ends")
+
+    def __init__(self, *parts: Sequence[BaseMessage]) -> None:
+        self._parts: Tuple[Sequence[BaseMessage], ...] = tuple(
+            p for p in parts if len(p)
+        )
+        self._ends: List[int] = list(accumulate(len(p) for p in self._parts))
+
+    def __len__(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    @overload
+    def __getitem__(self, index: int) -> BaseMessage: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[BaseMessage]: ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[BaseMessage, List[BaseMessage]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("prompt index out of range")
+        part = bisect_right(self._ends, index)
+        return self._parts[part][index - (self._ends[part - 1] if part else 0)]
+
+    def __iter__(self) -> Iterator[BaseMessage]:
+        return chain.from_iterable(self._parts)
+
+    def __reversed__(self) -> Iterator[BaseMessage]:
+        return chain.from_iterable(reversed(p) for p in reversed(self._parts))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (PromptView, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PromptView({list(self)!r})"
+
+
+class PromptAssembler:
+    """Prebuilt system prefix plus summary and history, presented as a ``PromptView``.
+
+    Args:
+        system_prompt: Text of the system message that starts every prompt.
+        summary_prefix: Prepended to a summary to form its system message.
+        summary_cache_size: Number of distinct summary messages kept.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        summary_prefix: str = "",
+        summary_cache_size: int = 256,
+    ) -> None:
+        self.system_message = SystemMessage(content=system_prompt)
+        self.prefix: Tuple[BaseMessage, ...] = (self.system_message,)
+        self.summary_prefix = summary_prefix
+        self.summary_cache_size = summary_cache_size
+        self._summaries: OrderedDict[str, SystemMessage] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def summary_message(self, summary: str) -> SystemMessage:
+        """Return the system message carrying ``summary``, built once per distinct text."""
+        with self._lock:
+            message = self._summaries.get(summary)
+            if message is None:
+                message = self._summaries[summary] = SystemMessage(
+                    content=f"{self.summary_prefix}{summary}"
+                )
+                while len(self._summaries) > self.summary_cache_size:
+                    self._summaries.popitem(last=False)
+            else:
+                self._summaries.move_to_end(summary)
+            return message
+
+    def assemble(
+        self,
+        messages: Sequence[BaseMessage],
+        summary: Optional[str] = None,
+        include_system: bool = True,
+    ) -> PromptView:
+        """Return the prompt: system message, summary message (if any), then ``messages``."""
+        prefix = self.prefix if include_system else ()
+        if summary:
+            return PromptView(prefix, (self.summary_message(summary),), messages)
+        return PromptView(prefix, messages)
@@ -0,0 +1,196 @@
+"""Relevance-scored retention for message histories.
+
+Dropping the oldest messages throws away whatever was said first, even when
+the current question is about it. ``RelevanceScorer`` embeds every message
+with a hashed bag-of-words (no model, no network), scores the whole history
+against the current user turn with one matrix-vector product and keeps the
+highest-value messages that fit a token budget.
+
+Message vectors are cached per message id and content hash, so each message
+is embedded once, however many turns it survives, and a message replaced
+under the same id is embedded again.
+"""
+
+import hashlib
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def message_text(message: BaseMessage) -> str:
+    """Return the text used to embed ``message``, including tool call names and arguments."""
+    content = message.content
+    if not isinstance(content, str):
+        content = " ".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for part in content
+        )
+    for call in getattr(message, "tool_calls", None) or ():
+        content += f" {call['name']} {call.get('args', '')}"
+    return content
+
+
+def retention_units(messages: Sequence[BaseMessage]) -> List[List[int]]:
+    """Group message indices into units that must be kept or dropped together.
+
+    An AI message with tool calls and the tool messages answering it form one
+    unit; every other message is a unit of its own.
+    """
+    units: List[List[int]] = []
+    for index, message in enumerate(messages):
+        if (
+            isinstance(message, ToolMessage)
+            and units
+            and _opens_tool_unit(messages[units[-1][0]])
+        ):
+            units[-1].append(index)
+        else:
+            units.append([index])
+    return units
+
+
+def _opens_tool_unit(message: BaseMessage) -> bool:
+    return isinstance(message, AIMessage) and bool(message.tool_calls)
+
+
+class HashedEmbedder:
+    """Signed feature hashing of lowercased word tokens into ``dim`` dimensions.
+
+    Rows are L2-normalized, so a dot product is the cosine similarity.
+    """
+
+    def __init__(self, dim: int = 1024) -> None:
+        self.dim = dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a ``(len(texts), dim)`` float32 matrix, one normalized row per text."""
+        rows: List[int] = []
+        cols: List[int] = []
+        signs: List[float] = []
+        for row, text in enumerate(texts):
+            for token in _TOKEN_RE.findall(text.lower()):
+                h = zlib.crc32(token.encode())
+                rows.append(row)
+                cols.append(h % self.dim)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if rows:
+            np.add.at(
+                matrix,
+                (np.asarray(rows), np.asarray(cols)),
+                np.asarray(signs, dtype=np.float32),
+            )
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+class RelevanceScorer:
+    """Score messages against a query and pick the ones worth keeping.
+
+    Args:
+        dim: Embedding dimensions of the hashed bag-of-words.
+        recency_weight: Bonus added to a message's similarity, growing linearly
+            from 0 for the oldest message to ``recency_weight`` for the newest, so
+            equally relevant messages are kept newest first.
+        maxsize: Number of message vectors kept in the LRU cache.
+    """
+
+    def __init__(
+        self, dim: int = 1024, recency_weight: float = 0.1, maxsize: int = 4096
+    ) -> None:
+        self.embedder = HashedEmbedder(dim)
+        self.recency_weight = recency_weight
+        self.maxsize = maxsize
+        self._vectors: OrderedDict[Tuple[Optional[str], bytes], np.ndarray] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def vectors(self, messages: Sequence[BaseMessage]) -> np.ndarray:
+        """Return the embedding matrix for ``messages``, embedding only uncached ones."""
+        texts = [message_text(m) for m in messages]
+        keys = [
+            (m.id, hashlib.blake2b(text.encode(), digest_size=12).digest())
+            for m, text in zip(messages, texts)
+        ]
+        matrix = np.empty((len(messages), self.embedder.dim), dtype=np.float32)
+        missing: Dict[Tuple[Optional[str], bytes], List[int]] = {}
+        with self._lock:
+            for index, key in enumerate(keys):
+                vector = self._vectors.get(key)
+                if vector is None:
+                    missing.setdefault(key, []).append(index)
+                else:
+                    self._vectors.move_to_end(key)
+                    matrix[index] = vector
+        if missing:
+            fresh = self.embedder.embed([texts[ix[0]] for ix in missing.values()])
+            with self._lock:
+                for (key, indices), vector in zip(missing.items(), fresh):
+                    matrix[indices] = vector
+                    self._vectors[key] = vector
+                while len(self._vectors) > self.maxsize:
+                    self._vectors.popitem(last=False)
+        return matrix
+
+    def scores(self, messages: Sequence[BaseMessage], query: str) -> np.ndarray:
+        """Return the cosine similarity of every message to ``query`` plus the recency bonus."""
+        if not messages:
+            return np.zeros(0, dtype=np.float32)
+        similarity: np.ndarray = (
+            self.vectors(messages) @ self.embedder.embed([query])[0]
+        )
+        return similarity + np.linspace(
+            0.0, self.recency_weight, len(messages), dtype=np.float32
+        )
+
+    def select(
+        self,
+        messages: Sequence[BaseMessage],
+        counts: Sequence[int],
+        max_tokens: int,
+    ) -> Set[int]:
+        """Return the indices of the messages to keep within ``max_tokens``.
+
+        The current turn (the last human message and everything after it) is
+        always kept. Earlier units (see ``retention_units``) are added in order of
+        their best message score while they fit the remaining budget.
+        """
+        current = next(
+            (
+                i
+                for i in range(len(messages) - 1, -1, -1)
+                if isinstance(messages[i], HumanMessage)
+            ),
+            len(messages),
+        )
+        keep = set(range(current, len(messages)))
+        budget = max_tokens - sum(counts[current:])
+        if current == 0 or budget <= 0:
+            return keep
+        query = message_text(messages[current]) if current < len(messages) else ""
+        scores = self.scores(messages[:current], query)
+        units = retention_units(messages[:current])
+        unit_scores = [float(scores[unit].max()) for unit in units]
+        for order in sorted(
+            range(len(units)), key=unit_scores.__getitem__, reverse=True
+        ):
+            unit = units[order]
+            cost = sum(counts[i] for i in unit)
+            if cost <= budget:
+                keep.update(unit)
+                budget -= cost
+        return keep
+
+    def clear(self) -> None:
+        """Drop all cached message vectors."""
+        with self._lock:
+            self._vectors.clear()
@@ -0,0 +1,465 @@
+"""Hot-session cache in front of a checkpointer.
+
+With a file-backed checkpointer every turn reloads the thread's latest
+checkpoint from disk and deserializes the whole condensed state (messages,
+summary, token count cache) before the first node runs, even when the same
+process served the previous turn a moment ago. ``HotSessionSaver`` keeps the
+latest checkpoint of recently active threads in memory as live objects:
+
+* Reads of a hot thread's latest checkpoint skip the database and
+  deserialization entirely.
+* Writes stay in memory (write-back). Channels changed since the last spill
+  are tracked, so a spill writes only those.
+* When the number of hot sessions or their estimated size exceeds the caps,
+  the least recently used sessions are spilled to the backing saver and
+  dropped; their next turn loads them lazily from disk.
+
+Only a hot thread's latest checkpoint and its pending writes are kept. The
+intermediate checkpoints of steps taken while a thread was hot are not
+persisted, so time travel to those ids is not available. Call ``flush()``
+(``get_saver`` registers it at exit) to persist every hot session.
+
+Durability: with write-back, a crash loses every step a hot thread took since
+it was last written. ``flush_every=N`` writes a session back after N of its
+checkpoints, bounding that loss to fewer than N steps per thread;
+``flush_every=1`` is write-through (every checkpoint reaches the backing
+saver, reads are still served from memory).
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    copy_checkpoint,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+_SessionKey = Tuple[str, str]
+
+# Rough per-object overheads for the size estimate
+_MESSAGE_OVERHEAD = 400
+_VALUE_OVERHEAD = 64
+
+
+def estimate_size(checkpoint: Checkpoint) -> int:
+    """Return a rough estimate in bytes of the memory held by ``checkpoint``'s values."""
+    size = 0
+    for value in checkpoint["channel_values"].values():
+        if isinstance(value, (list, tuple)):
+            size += sum(
+                _MESSAGE_OVERHEAD + len(str(v.content))
+                if isinstance(v, BaseMessage)
+                else _VALUE_OVERHEAD
+                for v in value
+            )
+        elif isinstance(value, (str, bytes)):
+            size += _VALUE_OVERHEAD + len(value)
+        elif isinstance(value, dict):
+            size += _VALUE_OVERHEAD * (1 + len(value))
+        else:
+            size += _VALUE_OVERHEAD
+    return size
+
+
+def _copy(checkpoint: Checkpoint) -> Checkpoint:
+    # Channel values are handed to the graph as live objects; copy the lists so
+    # a reducer that updates one in place cannot change the cached checkpoint
+    copied = copy_checkpoint(checkpoint)
+    copied["channel_values"] = {
+        k: list(v) if isinstance(v, list) else v
+        for k, v in copied["channel_values"].items()
+    }
+    return copied
+
+
+class _Session:
+    __slots__ = (
+        "config",
+        "checkpoint",
+        "metadata",
+        "writes",
+        "versions",
+        "saved",
+        "dirty",
+        "size",
+        "unsaved_puts",
+    )
+
+    def __init__(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        versions: ChannelVersions,
+        saved: bool,
+    ) -> None:
+        # Thread config whose checkpoint_id is the last checkpoint persisted before
+        # this one: intermediate hot checkpoints are never written, so a spilled
+        # checkpoint is chained to the one that is actually on disk
+        self.config = config
+        self.checkpoint = checkpoint
+        self.metadata = metadata
+        # (task_id, idx) -> (channel, value, task_path)
+        self.writes: Dict[Tuple[str, int], Tuple[str, Any, str]] = {}
+        # Channels changed since the last spill and their latest versions
+        self.versions = versions
+        # Whether the checkpoint row is in the backing saver, and whether anything
+        # (the checkpoint or its pending writes) still has to be written there
+        self.saved = saved
+        self.dirty = not saved
+        self.size = estimate_size(checkpoint)
+        # Checkpoints put for the thread since it was last written to the backing saver
+        self.unsaved_puts = 0
+
+    def tuple(self) -> CheckpointTuple:
+        configurable = self.config["configurable"]
+        thread = {
+            "thread_id": configurable["thread_id"],
+            "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+        }
+        parent_id = configurable.get("checkpoint_id")
+        return CheckpointTuple(
+            config={"configurable": {**thread, "checkpoint_id": self.checkpoint["id"]}},
+            checkpoint=_copy(self.checkpoint),
+            metadata=self.metadata,
+            parent_config={"configurable": {**thread, "checkpoint_id": parent_id}}
+            if parent_id
+            else None,
+            pending_writes=[
+                (task_id, channel, value)
+                for (task_id, _), (channel, value, _) in self.writes.items()
+            ],
+        )
+
+
+class HotSessionSaver(BaseCheckpointSaver[str]):
+    """Write-back LRU cache of threads' latest checkpoints over a backing saver.
+
+    Args:
+        backing: The saver sessions spill to and load from, e.g. ``DeltaSqliteSaver``.
+        max_sessions: Maximum number of hot threads (per checkpoint namespace).
+        max_bytes: Cap on the estimated size of all hot sessions (see ``estimate_size``).
+        flush_every: Write a hot session back after this many of its checkpoints
+            (1 for write-through); ``None`` writes back only on eviction and ``flush()``.
+    """
+
+    def __init__(
+        self,
+        backing: BaseCheckpointSaver[str],
+        max_sessions: int = 256,
+        max_bytes: Optional[int] = 64 * 1024 * 1024,
+        flush_every: Optional[int] = None,
+    ) -> None:
+        super().__init__(serde=backing.serde)
+        self.backing = backing
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self._sessions: OrderedDict[_SessionKey, _Session] = OrderedDict()
+        # Evicted sessions whose spill has not finished yet; reads must still see them
+        self._spilling: Dict[_SessionKey, _Session] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.spills = 0
+
+    @staticmethod
+    def _key(config: RunnableConfig) -> _SessionKey:
+        return config["configurable"]["thread_id"], config["configurable"].get(
+            "checkpoint_ns", ""
+        )
+
+    def _lookup(self, config: RunnableConfig) -> Optional[_Session]:
+        key = self._key(config)
+        with self._lock:
+            session = self._sessions.get(key) or self._spilling.get(key)
+            checkpoint_id = get_checkpoint_id(config)
+            if session is None or (
+                checkpoint_id and checkpoint_id != session.checkpoint["id"]
+            ):
+                return None
+            if key in self._sessions:
+                self._sessions.move_to_end(key)
+            self.hits += 1
+            return session
+
+    def _store(
+        self, key: _SessionKey, session: _Session
+    ) -> List[Tuple[_SessionKey, _Session]]:
+        """Make ``session`` hot and return the sessions evicted to make room (to be spilled)."""
+        previous = self._sessions.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        self._sessions[key] = session
+        self._bytes += session.size
+        evicted = []
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            old_key, old = self._sessions.popitem(last=False)
+            self._bytes -= old.size
+            if old.dirty:
+                self._spilling[old_key] = old
+                evicted.append((old_key, old))
+        return evicted
+
+    def _put(
+        self,
+        key: _SessionKey,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> List[Tuple[_SessionKey, _Session]]:
+        with self._lock:
+            previous = self._sessions.get(key) or self._spilling.get(key)
+            if previous is None:
+                parent_id, versions = (
+                    config["configurable"].get("checkpoint_id"),
+                    dict(new_versions),
+                )
+            elif previous.saved:
+                parent_id, versions = previous.checkpoint["id"], dict(new_versions)
+            else:
+                parent_id = previous.config["configurable"].get("checkpoint_id")
+                versions = {**previous.versions, **new_versions}
+            put_config: RunnableConfig = {
+                "configurable": {
+                    "thread_id": key[0],
+                    "checkpoint_ns": key[1],
+                    "checkpoint_id": parent_id,
+                }
+            }
+            session = _Session(
+                put_config,
+                _copy(checkpoint),
+                get_checkpoint_metadata(config, metadata),
+                versions,
+                saved=False,
+            )
+            session.unsaved_puts = (
+                1 if previous is None or previous.saved else previous.unsaved_puts + 1
+            )
+            return self._store(key, session)
+
+    def _spill(self, evicted: Sequence[Tuple[_SessionKey, _Session]]) -> None:
+        for key, session in evicted:
+            try:
+                self._write_back(session)
+            finally:
+                with self._lock:
+                    if self._spilling.get(key) is session:
+                        del self._spilling[key]
+
+    def _write_back(self, session: _Session) -> None:
+        with self._lock:
+            pending = sorted(session.writes.items(), key=lambda w: w[0][1])
+        config = self.backing.put(
+            session.config, session.checkpoint, session.metadata, session.versions
+        )
+        by_task: Dict[Tuple[str, str], List[Tuple[str, Any]]] = {}
+        for (task_id, _), (channel, value, task_path) in pending:
+            by_task.setdefault((task_id, task_path), []).append((channel, value))
+        for (task_id, task_path), writes in by_task.items():
+            self.backing.put_writes(config, writes, task_id, task_path)
+        self.spills += 1
+
+    def _flush_session(self, session: _Session) -> None:
+        # Called with the lock held; the session stays hot
+        self._write_back(session)
+        session.saved, session.dirty = True, False
+        session.versions = {}
+        session.unsaved_puts = 0
+
+    def _flush_if_due(self, key: _SessionKey) -> None:
+        if self.flush_every is None:
+            return
+        with self._lock:
+            session = self._sessions.get(key)
+            if (
+                session is not None
+                and session.dirty
+                and session.unsaved_puts >= self.flush_every
+            ):
+                self._flush_session(session)
+
+    def flush(self, thread_id: Optional[str] = None) -> None:
+        """Write dirty hot sessions (all, or one thread's) to the backing saver; they stay hot."""
+        with self._lock:
+            for (tid, _), session in list(self._sessions.items()):
+                if session.dirty and (thread_id is None or tid == thread_id):
+                    self._flush_session(session)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Return the hot checkpoint when it is the one requested, else load from the backing saver."""
+        session = self._lookup(config)
+        if session is not None:
+            return session.tuple()
+        self.misses += 1
+        loaded = self.backing.get_tuple(config)
+        if loaded is None or get_checkpoint_id(config):
+            return loaded
+        put_config: RunnableConfig = {"configurable": {**loaded.config["configurable"]}}
+        put_config["configurable"]["checkpoint_id"] = (
+            loaded.parent_config["configurable"]["checkpoint_id"]
+            if loaded.parent_config
+            else None
+        )
+        session = _Session(
+            put_config, loaded.checkpoint, loaded.metadata, {}, saved=True
+        )
+        for idx, (task_id, channel, value) in enumerate(loaded.pending_writes or ()):
+            session.writes[(task_id, WRITES_IDX_MAP.get(channel, idx))] = (
+                channel,
+                value,
+                "",
+            )
+        key = self._key(config)
+        with self._lock:
+            if key in self._sessions or key in self._spilling:
+                # Another caller made the thread hot while this one was loading it
+                return self.get_tuple(config)
+            evicted = self._store(key, session)
+        self._spill(evicted)
+        return session.tuple()
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints from the backing saver after flushing the hot sessions involved."""
+        self.flush(config["configurable"]["thread_id"] if config else None)
+        return self.backing.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Keep the checkpoint in memory; evicted (or, with ``flush_every``, due) sessions are written back."""
+        key = self._key(config)
+        self._spill(self._put(key, config, checkpoint, metadata, new_versions))
+        self._flush_if_due(key)
+        thread_id, checkpoint_ns = key
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Record pending writes for the hot checkpoint, or pass them to the backing saver."""
+        session = self._lookup(config)
+        if session is None:
+            self.backing.put_writes(config, writes, task_id, task_path)
+            return
+        with self._lock:
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                if write_idx < 0 or (task_id, write_idx) not in session.writes:
+                    session.writes[(task_id, write_idx)] = (channel, value, task_path)
+            session.dirty = True
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Drop a thread from memory and from the backing saver."""
+        with self._lock:
+            for key in [k for k in self._sessions if k[0] == thread_id]:
+                self._bytes -= self._sessions.pop(key).size
+            for key in [k for k in self._spilling if k[0] == thread_id]:
+                del self._spilling[key]
+            self.backing.delete_thread(thread_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Async version of ``get_tuple``."""
+        session = self._lookup(config)
+        if session is not None:
+            return session.tuple()
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Async version of ``list``."""
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Async version of ``put``."""
+        key = self._key(config)
+        evicted = self._put(key, config, checkpoint, metadata, new_versions)
+        if evicted:
+            # Spilling touches the disk; keep it off the event loop
+            await asyncio.to_thread(self._spill, evicted)
+        if self.flush_every is not None:
+            await asyncio.to_thread(self._flush_if_due, key)
+        thread_id, checkpoint_ns = key
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Async version of ``put_writes``."""
+        if self._lookup(config) is None:
+            await asyncio.to_thread(
+                self.backing.put_writes, config, writes, task_id, task_path
+            )
+        else:
+            self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Async version of ``delete_thread``."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return self.backing.get_next_version(current, channel)
@@ -0,0 +1,54 @@
+"""Settings shared by the four condenser packages.
+
+Tool execution, streaming, checkpointing and the model request rate are
+configured once here for ``manual_triming``, ``selective_deletition``,
+``summarization`` and ``Tokenaware_truncation``. Each package's
+``configuration.py`` keeps only what is specific to its strategy (history
+budgets, modes, its token counter and model).
+"""
+
+# --- Tools ---
+# Tool calls from one model turn run concurrently, at most TOOL_MAX_CONCURRENCY at a time.
+# TOOL_TIMEOUT_SECONDS applies to each call; TOOL_TIMEOUTS overrides it per tool name.
+TOOL_MAX_CONCURRENCY = 8
+TOOL_TIMEOUT_SECONDS = 30
+TOOL_TIMEOUTS: dict[str, float] = {}
+
+# Opt-in cache of tool results keyed by tool name and normalized args (TTL + LRU eviction).
+TOOL_CACHE_ENABLED = False
+TOOL_CACHE_TTL_SECONDS = 300
+TOOL_CACHE_MAXSIZE = 256
+
+# Optional out-of-band store for large tool outputs (condenser_core.blob_store), e.g. ".tool_blobs".
+# Results of at least TOOL_BLOB_MIN_CHARS characters are written there and the ToolMessage keeps only a
+# reference with a short preview; the model gets a read_tool_output tool to page through the full output.
+TOOL_BLOB_DIR = None
+TOOL_BLOB_MIN_CHARS = 2000
+
+# --- Streaming ---
+# Stream model replies from the agent node (chunks reach graph.stream(..., stream_mode="messages")
+# as they are generated) instead of waiting for the complete response. With EARLY_TOOL_DISPATCH,
+# each tool call starts running as soon as its arguments are complete, while the model is still
+# generating (see condenser_core.streaming).
+STREAM_MODEL_OUTPUT = False
+EARLY_TOOL_DISPATCH = True
+
+# --- Checkpointing ---
+# Optional file-backed checkpointer (condenser_core.checkpoint.DeltaSqliteSaver), e.g. "checkpoints.sqlite".
+# Message histories are stored as deltas, so checkpointing a turn costs O(change), not O(history).
+# Leave as None when the platform provides the checkpointer (e.g. LangGraph server).
+CHECKPOINT_DB_PATH = None
+# Keep the latest state of up to HOT_SESSIONS_MAX recently active threads in memory
+# (condenser_core.session_cache.HotSessionSaver) so their next turn skips the load from
+# the file; the least recently used ones are written back once either cap is exceeded.
+# Durability trade-off: hot sessions are write-back, so a crash loses every turn a hot thread
+# took since it was last written. HOT_SESSIONS_FLUSH_EVERY = N writes a thread back after N of
+# its checkpoints (fewer than N steps lost); 1 is write-through, keeping the cache for reads only.
+HOT_SESSIONS_MAX = None
+HOT_SESSIONS_MAX_BYTES = 64 * 1024 * 1024
+HOT_SESSIONS_FLUSH_EVERY = None
+
+# --- Model ---
+# Optional client-side limit on model requests per second (e.g. for batch replays, see
+# condenser_core.batch). It is shared by every package configured with the same model.
+MODEL_REQUESTS_PER_SECOND = None
@@ -0,0 +1,203 @@
+"""Streaming model calls for the agent nodes.
+
+The agent nodes used to wait for the complete ``invoke`` response, so a user
+saw nothing until the whole reply was generated. ``stream_model`` streams the
+reply instead: each chunk goes through the model's callbacks, which is what
+``graph.stream(..., stream_mode="messages")`` forwards to the caller, and
+the chunks are merged into the final ``AIMessage`` the node returns.
+
+Tool-call chunks are assembled as they arrive. As soon as a call is complete
+(its arguments parse as a JSON object, or the stream has ended) it is
+handed to ``on_tool_call``; the graphs pass
+``ToolExecutor.prefetch`` so a tool runs while the model is still generating
+and the tool node only collects the result. If the stream fails, the calls
+already handed over are passed to ``on_abort`` (``ToolExecutor.discard``) so
+they are not left waiting for a tool node that never runs. A dispatched call
+may still have run by then, so ``EARLY_TOOL_DISPATCH`` is only for tools
+without side effects.
+"""
+
+import json
+import time
+from typing import Any, Callable, Collection, Dict, Optional, Sequence, Set, cast
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolCall
+from langchain_core.messages.utils import message_chunk_to_message
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from condenser_core.instrumentation import instrumentation
+
+ToolCallHandler = Callable[[ToolCall], Any]
+AbortHandler = Callable[[Collection[str]], Any]
+
+
+class ToolCallAssembler:
+    """Merge streamed message chunks and report each tool call once it is complete.
+
+    Args:
+        on_tool_call: Called with every completed tool call, in completion order.
+    """
+
+    def __init__(self, on_tool_call: Optional[ToolCallHandler] = None) -> None:
+        self.on_tool_call = on_tool_call
+        self.message: Optional[AIMessageChunk] = None
+        self._dispatched: Set[str] = set()
+
+    def add(self, chunk: AIMessageChunk) -> None:
+        """Merge ``chunk`` and dispatch the tool calls it completes."""
+        self.message = (
+            chunk
+            if self.message is None
+            else cast(AIMessageChunk, self.message + chunk)
+        )
+        if not chunk.tool_call_chunks or self.on_tool_call is None:
+            return
+        touched = {c.get("index") for c in chunk.tool_call_chunks}
+        for call_chunk in self.message.tool_call_chunks:
+            call_id, name = call_chunk.get("id"), call_chunk.get("name")
+            if (
+                call_chunk.get("index") not in touched
+                or not call_id
+                or not name
+                or call_id in self._dispatched
+            ):
+                continue
+            args = _parse_args(call_chunk.get("args"))
+            if args is not None:
+                self._dispatch(
+                    ToolCall(name=name, args=args, id=call_id, type="tool_call")
+                )
+
+    def finish(self) -> AIMessage:
+        """Dispatch the remaining tool calls and return the complete message."""
+        if self.message is None:
+            return AIMessage(content="")
+        message = message_chunk_to_message(self.message)
+        if self.on_tool_call is not None:
+            for call in getattr(message, "tool_calls", None) or ():
+                if call.get("id") and call["id"] not in self._dispatched:
+                    self._dispatch(call)
+        return message  # type: ignore[return-value]
+
+    def _dispatch(self, call: ToolCall) -> None:
+        # Only calls with an id are dispatched, and only when on_tool_call is set
+        self._dispatched.add(call["id"] or "")
+        if self.on_tool_call is not None:
+            self.on_tool_call(call)
+
+
+def _parse_args(raw: Optional[str]) -> Optional[Dict[str, Any]]:
+    # A top-level JSON object is complete once it parses: its closing brace ends it
+    if not raw:
+        return None
+    try:
+        args = json.loads(raw)
+    except ValueError:
+        return None
+    return args if isinstance(args, dict) else None
+
+
+def _report_first_token(graph: str, started: float) -> None:
+    if instrumentation.enabled:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        instrumentation.emit(
+            "first_token", graph=graph, name="agent", duration_ms=elapsed_ms
+        )
+
+
+def _abort(assembler: ToolCallAssembler, on_abort: Optional[AbortHandler]) -> None:
+    if on_abort is not None and assembler._dispatched:
+        on_abort(assembler._dispatched)
+
+
+def stream_model(
+    model: Runnable[Any, Any],
+    messages: Sequence[BaseMessage],
+    config: Optional[RunnableConfig] = None,
+    on_tool_call: Optional[ToolCallHandler] = None,
+    graph: str = "",
+    on_abort: Optional[AbortHandler] = None,
+) -> AIMessage:
+    """Stream ``model`` on ``messages`` and return the assembled reply.
+
+    Emits a ``first_token`` event (time to the first chunk) when
+    instrumentation is on. If the stream raises (or is cancelled),
+    ``on_abort`` gets the ids of the tool calls already dispatched.
+    """
+    assembler = ToolCallAssembler(on_tool_call)
+    started = time.perf_counter()
+    try:
+        for chunk in model.stream(messages, config):
+            if assembler.message is None:
+                _report_first_token(graph, started)
+            assembler.add(chunk)
+        return assembler.finish()
+    except BaseException:
+        _abort(assembler, on_abort)
+        raise
+
+
+async def astream_model(
+    model: Runnable[Any, Any],
+    messages: Sequence[BaseMessage],
+    config: Optional[RunnableConfig] = None,
+    on_tool_call: Optional[ToolCallHandler] = None,
+    graph: str = "",
+    on_abort: Optional[AbortHandler] = None,
+) -> AIMessage:
+    """Async version of ``stream_model``."""
+    assembler = ToolCallAssembler(on_tool_call)
+    started = time.perf_counter()
+    try:
+        async for chunk in model.astream(messages, config):
+            if assembler.message is None:
+                _report_first_token(graph, started)
+            assembler.add(chunk)
+        return assembler.finish()
+    except BaseException:
+        _abort(assembler, on_abort)
+        raise
+
+
+def invoke_model(
+    model: Runnable[Any, Any],
+    messages: Sequence[BaseMessage],
+    config: Optional[RunnableConfig] = None,
+    *,
+    stream: bool = False,
+    executor: Any = None,
+    graph: str = "",
+) -> AIMessage:
+    """Call ``model`` the way an agent node is configured to.
+
+    With ``stream`` the reply is streamed (see ``stream_model``) and, when an
+    ``executor`` (a ``ToolExecutor``) is given, completed tool calls are
+    prefetched on it and discarded again if the stream fails; otherwise this
+    is ``model.invoke``.
+    """
+    if not stream:
+        return cast(AIMessage, model.invoke(messages, config))
+    if executor is None:
+        return stream_model(model, messages, config, graph=graph)
+    return stream_model(
+        model, messages, config, executor.prefetch, graph, executor.discard
+    )
+
+
+async def ainvoke_model(
+    model: Runnable[Any, Any],
+    messages: Sequence[BaseMessage],
+    config: Optional[RunnableConfig] = None,
+    *,
+    stream: bool = False,
+    executor: Any = None,
+    graph: str = "",
+) -> AIMessage:
+    """Async version of ``invoke_model``; tool calls are prefetched as event-loop tasks."""
+    if not stream:
+        return cast(AIMessage, await model.ainvoke(messages, config))
+    if executor is None:
+        return await astream_model(model, messages, config, graph=graph)
+    return await astream_model(
+        model, messages, config, executor.aprefetch, graph, executor.discard
+    )
@@ -0,0 +1,166 @@
+"""Local, batched token counting for the condensers.
+
+``FastTokenCounter`` estimates tokens from character counts, which needs no
+model and no network access. When an exact counter is supplied (for example
+``llm.get_num_tokens_from_messages`` or a local tokenizer) it is only consulted
+when an estimate lands close to a budget, and every exact count is used to
+re-calibrate the characters-per-token ratio.
+"""
+
+import json
+from typing import Callable, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+# Counts a list of messages as one total, e.g. ``llm.get_num_tokens_from_messages``.
+ListTokenCounter = Callable[[List[BaseMessage]], int]
+# Counts a single message.
+MessageTokenCounter = Callable[[BaseMessage], int]
+
+
+def _message_chars(message: BaseMessage) -> int:
+    """Return the number of characters a message contributes to a prompt."""
+    content = message.content
+    if isinstance(content, str):
+        chars = len(content)
+    else:
+        chars = 0
+        for block in content:
+            if isinstance(block, str):
+                chars += len(block)
+            elif block.get("type") == "text":
+                chars += len(block.get("text", ""))
+            else:
+                chars += len(json.dumps(block, default=str))
+    if isinstance(message, AIMessage) and message.tool_calls:
+        chars += len(json.dumps(message.tool_calls, default=str))
+    return chars
+
+
+class FastTokenCounter:
+    """Approximate chars-per-token counter with an optional exact fallback.
+
+    The instance is a drop-in ``token_counter`` for ``trim_messages``: calling
+    it with a list of messages returns the estimated total.
+
+    Args:
+        exact_counter: Optional exact counter used near budget boundaries and
+            for calibration. Leave unset to stay fully offline.
+        chars_per_token: Initial characters-per-token ratio.
+        tokens_per_message: Fixed per-message overhead (role markers etc.).
+        boundary_margin: Fraction of a budget within which an estimate is
+            considered too close to call and the exact counter is used.
+    """
+
+    def __init__(
+        self,
+        exact_counter: Optional[ListTokenCounter] = None,
+        chars_per_token: float = 4.0,
+        tokens_per_message: int = 3,
+        boundary_margin: float = 0.1,
+    ) -> None:
+        self.exact_counter = exact_counter
+        self.chars_per_token = chars_per_token
+        self.tokens_per_message = tokens_per_message
+        self.boundary_margin = boundary_margin
+        self._calibration_chars = 0
+        self._calibration_tokens = 0
+
+    def approximate(self, message: BaseMessage) -> int:
+        """Estimate the tokens of a single message."""
+        return self.tokens_per_message + int(
+            _message_chars(message) / self.chars_per_token + 0.5
+        )
+
+    def approximate_text(self, text: str) -> int:
+        """Estimate the tokens of a plain string."""
+        return int(len(text) / self.chars_per_token + 0.5)
+
+    def count_batch(self, messages: Sequence[BaseMessage]) -> List[int]:
+        """Estimate per-message token counts for many messages in one pass."""
+        ratio = self.chars_per_token
+        overhead = self.tokens_per_message
+        return [overhead + int(_message_chars(m) / ratio + 0.5) for m in messages]
+
+    def __call__(self, messages: Sequence[BaseMessage]) -> int:
+        """Estimate the total tokens of ``messages``."""
+        return sum(self.count_batch(messages))
+
+    def exact(self, messages: Sequence[BaseMessage]) -> int:
+        """Count ``messages`` with the exact counter and re-calibrate the ratio.
+
+        Falls back to the estimate when no exact counter is configured.
+        """
+        if self.exact_counter is None:
+            return self(messages)
+        messages = list(messages)
+        tokens = self.exact_counter(messages)
+        content_tokens = tokens - self.tokens_per_message * len(messages)
+        if content_tokens > 0:
+            self._calibration_chars += sum(_message_chars(m) for m in messages)
+            self._calibration_tokens += content_tokens
+            self.chars_per_token = self._calibration_chars / self._calibration_tokens
+        return tokens
+
+    def calibrate(self, sample: Sequence[BaseMessage]) -> float:
+        """Calibrate the ratio against the exact counter and return the new ratio."""
+        if sample:
+            self.exact(sample)
+        return self.chars_per_token
+
+    def near_boundary(self, estimate: int, max_tokens: int) -> bool:
+        """Return whether ``estimate`` is too close to ``max_tokens`` to trust."""
+        return abs(estimate - max_tokens) <= max_tokens * self.boundary_margin
+
+    def for_budget(
+        self,
+        max_tokens: int,
+        per_message: Optional[MessageTokenCounter] = None,
+    ) -> ListTokenCounter:
+        """Return a list counter that only counts exactly near ``max_tokens``.
+
+        Args:
+            max_tokens: The budget the caller compares counts against.
+            per_message: Optional per-message counter, e.g. one backed by a
+                cache of earlier estimates. Defaults to ``approximate``.
+        """
+        count_one = per_message or self.approximate
+
+        def counter(messages: List[BaseMessage]) -> int:
+            estimate = sum(count_one(m) for m in messages)
+            if self.exact_counter is not None and self.near_boundary(
+                estimate, max_tokens
+            ):
+                return self.exact(messages)
+            return estimate
+
+        return counter
+
+
+def keep_last_within_budget(
+    messages: Sequence[BaseMessage],
+    max_tokens: int,
+    token_counter: FastTokenCounter,
+    counts: Optional[Sequence[int]] = None,
+) -> int:
+    """Return the start index of the longest suffix of ``messages`` within ``max_tokens``.
+
+    Per-message counts are computed in one batch (or taken from ``counts``) and
+    summed from the end. If the resulting suffix is close to the budget it is
+    verified with the exact counter and shortened until it fits.
+    """
+    if counts is None:
+        counts = token_counter.count_batch(messages)
+    total = 0
+    start = len(messages)
+    while start > 0 and total + counts[start - 1] <= max_tokens:
+        start -= 1
+        total += counts[start]
+    if token_counter.exact_counter is not None and token_counter.near_boundary(
+        total, max_tokens
+    ):
+        while (
+            start < len(messages) and token_counter.exact(messages[start:]) > max_tokens
+        ):
+            start += 1
+    return start
@@ -0,0 +1,85 @@
+"""Opt-in TTL/LRU cache for tool results.
+
+Tools such as ``get_weather`` are called again with identical arguments,
+often within the same thread. ``ToolResultCache`` remembers results keyed by
+tool name and normalized arguments so ``ToolExecutor`` can skip the call.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+
+def normalize_args(args: Any) -> str:
+    """Return a canonical string for tool arguments (key order does not matter)."""
+    return json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolResultCache:
+    """Thread-safe LRU cache of tool results with a time-to-live.
+
+    Args:
+        maxsize: Maximum number of entries; the least recently used is evicted first.
+        ttl: Seconds an entry stays valid; ``None`` keeps entries until evicted.
+        clock: Monotonic time source, overridable for tests.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttl: Optional[float] = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Tuple[str, str], Tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, name: str, args: Mapping[str, Any]) -> Tuple[bool, Any]:
+        """Return ``(found, result)`` and update the hit/miss counters."""
+        key = (name, normalize_args(args))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, name: str, args: Mapping[str, Any], value: Any) -> None:
+        """Store a result, evicting the least recently used entries beyond ``maxsize``."""
+        key = (name, normalize_args(args))
+        expires_at = float("inf") if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit/miss/eviction counters and the current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
@@ -0,0 +1,293 @@
+"""Concurrent execution of the tool calls in one model turn.
+
+All four graphs used to run ``last_message.tool_calls`` one after another, so
+the latencies of independent lookups added up. ``ToolExecutor`` runs them
+concurrently, with a thread pool for sync callers and asyncio for async ones,
+and always returns the ``ToolMessage`` results in the original call order.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from langchain_core.messages import ToolCall, ToolMessage
+from langchain_core.tools import BaseTool
+
+from condenser_core.blob_store import READ_TOOL_NAME, BlobStore
+from condenser_core.instrumentation import instrumentation
+from condenser_core.tool_cache import ToolResultCache
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledCall:
+    """A tool call submitted to the thread pool, timed from when a worker starts it."""
+
+    __slots__ = ("future", "started_at", "_started")
+
+    def __init__(
+        self,
+        pool: ThreadPoolExecutor,
+        fn: Callable[[ToolCall], Any],
+        tool_call: ToolCall,
+    ) -> None:
+        self._started = threading.Event()
+        self.started_at: Optional[float] = None
+        self.future = pool.submit(self._run, fn, tool_call)
+        # A call cancelled before it started must not leave result() waiting for the start
+        self.future.add_done_callback(lambda _: self._started.set())
+
+    def _run(self, fn: Callable[[ToolCall], Any], tool_call: ToolCall) -> Any:
+        self.started_at = time.monotonic()
+        self._started.set()
+        return fn(tool_call)
+
+    def result(self, timeout: Optional[float]) -> Any:
+        """Return the call's result, allowing ``timeout`` seconds from its start.
+
+        Raises:
+            TimeoutError: If the call ran longer than ``timeout``.
+        """
+        if timeout is None:
+            return self.future.result()
+        # Time spent queued behind other calls does not count against the call
+        self._started.wait()
+        if self.started_at is None:
+            return self.future.result()
+        return self.future.result(
+            timeout=max(self.started_at + timeout - time.monotonic(), 0)
+        )
+
+
+class ToolExecutor:
+    """Run tool calls concurrently with a concurrency limit and per-tool timeouts.
+
+    Failures (unknown tool, exception, timeout) become error ``ToolMessage``s
+    instead of aborting the turn, so the model always gets one result per call.
+
+    Args:
+        tools: The tools the model can call.
+        max_concurrency: Maximum number of tool calls running at once.
+        timeout: Default timeout in seconds for a single call; ``None`` waits forever.
+        timeouts: Per-tool overrides of ``timeout``, keyed by tool name.
+        cache: Optional result cache; when set, calls with the same tool name
+            and normalized arguments are answered from it.
+        blob_store: Optional store for large results; results over its size
+            threshold are replaced by a reference (see ``BlobStore.offload``).
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool],
+        max_concurrency: int = 8,
+        timeout: Optional[float] = None,
+        timeouts: Optional[Mapping[str, float]] = None,
+        cache: Optional[ToolResultCache] = None,
+        blob_store: Optional[BlobStore] = None,
+    ) -> None:
+        self.tools_by_name: Dict[str, BaseTool] = {tool.name: tool for tool in tools}
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+        self.cache = cache
+        self.blob_store = blob_store
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        # Calls started early by prefetch()/aprefetch(), keyed by tool call id
+        self._prefetched: Dict[str, Any] = {}
+
+    def timeout_for(self, name: str) -> Optional[float]:
+        """Return the timeout that applies to tool ``name``."""
+        return self.timeouts.get(name, self.timeout)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_concurrency, thread_name_prefix="tool"
+                    )
+        return self._pool
+
+    def _result_message(self, tool_call: ToolCall, result: Any) -> ToolMessage:
+        content = json.dumps(result)
+        if self.blob_store is not None and tool_call["name"] != READ_TOOL_NAME:
+            content = self.blob_store.offload(content)
+        return ToolMessage(
+            content=content,
+            name=tool_call["name"],
+            tool_call_id=tool_call["id"],
+        )
+
+    @staticmethod
+    def _error_message(tool_call: ToolCall, error: str) -> ToolMessage:
+        logger.warning("Tool %r error: %s", tool_call.get("name"), error)
+        instrumentation.emit(
+            "tool_error", name=tool_call.get("name") or "", error=error
+        )
+        return ToolMessage(
+            content=json.dumps({"error": error}),
+            name=tool_call.get("name") or "",
+            tool_call_id=tool_call["id"],
+        )
+
+    def _invoke(self, tool_call: ToolCall) -> Any:
+        name, args = tool_call["name"], tool_call["args"]
+        with instrumentation.timed("tool", name=name) as event:
+            if self.cache is not None:
+                found, result = self.cache.lookup(name, args)
+                event["cached"] = found
+                if found:
+                    return result
+            tool = self.tools_by_name[name]
+            if (
+                getattr(tool, "func", True) is None
+                and getattr(tool, "coroutine", None) is not None
+            ):
+                # Async-only tool called from the sync path: run it on this worker thread
+                result = asyncio.run(tool.ainvoke(args))
+            else:
+                result = tool.invoke(args)
+        if self.cache is not None:
+            self.cache.set(name, args, result)
+        return result
+
+    async def _ainvoke(self, tool_call: ToolCall) -> Any:
+        name, args = tool_call["name"], tool_call["args"]
+        with instrumentation.timed("tool", name=name) as event:
+            if self.cache is not None:
+                found, result = self.cache.lookup(name, args)
+                event["cached"] = found
+                if found:
+                    return result
+            result = await self.tools_by_name[name].ainvoke(args)
+        if self.cache is not None:
+            self.cache.set(name, args, result)
+        return result
+
+    def _check(self, tool_call: ToolCall) -> Optional[str]:
+        if tool_call.get("name") not in self.tools_by_name:
+            return f"Unknown tool: {tool_call.get('name')}"
+        return None
+
+    def prefetch(self, tool_call: ToolCall) -> None:
+        """Start ``tool_call`` on the thread pool now; the next ``run`` collects its result.
+
+        Used while the model is still streaming, so the tool overlaps the rest of the
+        generation. Unknown tools are left for ``run`` to report. A prefetched call may
+        already be running when the turn fails or stops before its tool node, so early
+        dispatch is only safe for tools without side effects; see ``discard``.
+        """
+        call_id = tool_call.get("id")
+        if call_id and self._check(tool_call) is None:
+            self._prefetched[call_id] = _PooledCall(
+                self._get_pool(), self._invoke, tool_call
+            )
+
+    def aprefetch(self, tool_call: ToolCall) -> None:
+        """Start ``tool_call`` as a task on the running event loop; the next ``arun`` awaits it."""
+        call_id = tool_call.get("id")
+        if call_id and self._check(tool_call) is None:
+            self._prefetched[call_id] = asyncio.ensure_future(self._ainvoke(tool_call))
+
+    def discard(self, tool_call_ids: Iterable[str]) -> None:
+        """Drop prefetched calls that no ``run`` will collect.
+
+        Calls that have not started are cancelled. A thread-pool call that is already
+        running cannot be stopped; it finishes and its result is dropped.
+        """
+        for tool_call_id in tool_call_ids:
+            call = self._prefetched.pop(tool_call_id, None)
+            if isinstance(call, _PooledCall):
+                call.future.cancel()
+            elif call is not None:
+                call.cancel()
+
+    def run(self, tool_calls: Sequence[ToolCall]) -> List[ToolMessage]:
+        """Execute ``tool_calls`` on the thread pool and return results in call order.
+
+        Each call's timeout runs from when a worker starts it, not from the start of
+        the batch, so calls queued behind ``max_concurrency`` others get their full
+        time. A call that times out is reported as an error, but its thread cannot be
+        stopped: the tool keeps running in the background and holds its pool slot
+        until it returns.
+        """
+        tool_calls = [tc for tc in tool_calls if tc.get("id")]
+        prefetched = [self._prefetched.pop(tc["id"] or "", None) for tc in tool_calls]
+        if (
+            len(tool_calls) == 1
+            and prefetched[0] is None
+            and self.timeout_for(tool_calls[0]["name"]) is None
+        ):
+            # Nothing to overlap and nothing to time out: skip the pool
+            tool_call = tool_calls[0]
+            error = self._check(tool_call)
+            if error:
+                return [self._error_message(tool_call, error)]
+            try:
+                return [self._result_message(tool_call, self._invoke(tool_call))]
+            except Exception as e:
+                return [self._error_message(tool_call, str(e))]
+
+        pool = self._get_pool()
+        calls = [
+            call
+            if call is not None
+            else None
+            if self._check(tc)
+            else _PooledCall(pool, self._invoke, tc)
+            for tc, call in zip(tool_calls, prefetched)
+        ]
+        outputs = []
+        for tool_call, call in zip(tool_calls, calls):
+            if call is None:
+                outputs.append(
+                    self._error_message(tool_call, self._check(tool_call) or "")
+                )
+                continue
+            timeout = self.timeout_for(tool_call["name"])
+            try:
+                outputs.append(self._result_message(tool_call, call.result(timeout)))
+            except TimeoutError:
+                outputs.append(
+                    self._error_message(tool_call, f"Timed out after {timeout}s")
+                )
+            except Exception as e:
+                outputs.append(self._error_message(tool_call, str(e)))
+        return outputs
+
+    async def arun(self, tool_calls: Sequence[ToolCall]) -> List[ToolMessage]:
+        """Execute ``tool_calls`` concurrently on the event loop, results in call order."""
+        tool_calls = [tc for tc in tool_calls if tc.get("id")]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_one(tool_call: ToolCall) -> ToolMessage:
+            error = self._check(tool_call)
+            if error:
+                return self._error_message(tool_call, error)
+            timeout = self.timeout_for(tool_call["name"])
+            task = self._prefetched.pop(tool_call["id"] or "", None)
+            if isinstance(task, _PooledCall):
+                task = asyncio.wrap_future(task.future)
+            async with semaphore:
+                try:
+                    result = await asyncio.wait_for(
+                        task or self._ainvoke(tool_call), timeout
+                    )
+                except TimeoutError:
+                    return self._error_message(tool_call, f"Timed out after {timeout}s")
+                except Exception as e:
+                    return self._error_message(tool_call, str(e))
+            return self._result_message(tool_call, result)
+
+        return list(await asyncio.gather(*(run_one(tc) for tc in tool_calls)))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the thread pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
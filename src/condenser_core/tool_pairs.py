@@ -0,0 +1,237 @@
+"""Pair-safe cut points for message histories.
+
+Providers reject a prompt in which an ``AIMessage`` with ``tool_calls`` is not
+followed by a ``ToolMessage`` for each call, or in which a ``ToolMessage``
+answers a call that is not there. Dropping ``messages[:k]`` is only safe when
+no tool call opened before ``k`` is answered at or after ``k``.
+
+``ToolPairIndex`` groups the history into blocks that start at pair-safe
+boundaries (an AI tool call and its results always share a block) and maps
+each ``tool_call_id`` to the positions of the call and its result. It is
+updated incrementally as messages are appended and dropped from the front, so
+each cut decision is O(1) instead of a rescan of the history.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+
+class ToolPairIndex:
+    """Incrementally maintained index of tool-call/tool-result pairs.
+
+    Positions are relative to the current first message. Internally every
+    message gets a sequence number that never changes, so dropping messages
+    from the front only moves an offset.
+
+    Args:
+        messages: Initial history.
+    """
+
+    __slots__ = (
+        "_base",
+        "_first",
+        "_keys",
+        "_blocks",
+        "_block_end",
+        "_open",
+        "_calls",
+        "_seq",
+    )
+
+    def __init__(self, messages: Iterable[BaseMessage] = ()) -> None:
+        self.clear()
+        self.extend(messages)
+
+    def clear(self) -> None:
+        """Forget all messages."""
+        self._base = 0  # sequence number of _keys[0]
+        self._first = 0  # sequence number of the current first message
+        self._keys: List[Optional[str]] = []
+        self._blocks: List[int] = []  # sequence number of each message's block start
+        self._block_end: Dict[
+            int, int
+        ] = {}  # block start -> start of the next block, once closed
+        self._open: Dict[
+            str, int
+        ] = {}  # unanswered tool_call_id -> sequence number of the call
+        self._calls: Dict[
+            str, Tuple[int, Optional[int]]
+        ] = {}  # tool_call_id -> (call seq, result seq)
+        self._seq: Dict[str, int] = {}  # message id -> sequence number
+
+    def __len__(self) -> int:
+        return self._base + len(self._keys) - self._first
+
+    def append(self, message: BaseMessage) -> None:
+        """Index one message appended to the end of the history."""
+        seq = self._base + len(self._keys)
+        if self._blocks and (self._open or isinstance(message, ToolMessage)):
+            block = self._blocks[-1]
+        else:
+            if self._blocks:
+                self._block_end[self._blocks[-1]] = seq
+            block = seq
+        self._keys.append(message.id)
+        self._blocks.append(block)
+        if message.id is not None:
+            self._seq[message.id] = seq
+        if isinstance(message, AIMessage):
+            for call in message.tool_calls:
+                if call["id"] is not None:
+                    self._open[call["id"]] = seq
+                    self._calls[call["id"]] = (seq, None)
+        elif isinstance(message, ToolMessage):
+            entry = self._calls.get(message.tool_call_id)
+            if entry is not None:
+                self._calls[message.tool_call_id] = (entry[0], seq)
+            self._open.pop(message.tool_call_id, None)
+
+    def extend(self, messages: Iterable[BaseMessage]) -> None:
+        """Index messages appended to the end of the history."""
+        for message in messages:
+            self.append(message)
+
+    def drop_front(self, count: int) -> None:
+        """Record that the first ``count`` messages were removed."""
+        if count <= 0:
+            return
+        self._first = min(self._first + count, self._base + len(self._keys))
+        # Calls whose AI message is gone can no longer be answered validly
+        for call_id in [c for c, seq in self._open.items() if seq < self._first]:
+            del self._open[call_id]
+        if self._first - self._base > max(64, len(self._keys) // 2):
+            self._compact()
+
+    def _compact(self) -> None:
+        dropped = self._first - self._base
+        for key in self._keys[:dropped]:
+            if key is not None and self._seq.get(key, self._first) < self._first:
+                del self._seq[key]
+        keep_block = (
+            self._blocks[dropped] if dropped < len(self._blocks) else self._first
+        )
+        self._block_end = {b: e for b, e in self._block_end.items() if b >= keep_block}
+        self._calls = {
+            c: e
+            for c, e in self._calls.items()
+            if e[0] >= self._first or (e[1] is not None and e[1] >= self._first)
+        }
+        del self._keys[:dropped]
+        del self._blocks[:dropped]
+        self._base = self._first
+
+    def sync(self, messages: Sequence[BaseMessage]) -> "ToolPairIndex":
+        """Bring the index in line with ``messages`` and return it.
+
+        Messages removed from the front and appended at the end are applied
+        incrementally (matched by message id); any other change, or messages
+        without ids, rebuilds the index.
+        """
+        first = (
+            self._seq.get(messages[0].id)
+            if messages and messages[0].id is not None
+            else None
+        )
+        if first is None or first < self._first:
+            return self._rebuild(messages)
+        known = self._base + len(self._keys) - first
+        if known > len(messages) or messages[known - 1].id != self._keys[-1]:
+            return self._rebuild(messages)
+        self.drop_front(first - self._first)
+        self.extend(messages[known:])
+        return self
+
+    def _rebuild(self, messages: Sequence[BaseMessage]) -> "ToolPairIndex":
+        self.clear()
+        self.extend(messages)
+        return self
+
+    def positions(self, tool_call_id: str) -> Optional[Tuple[int, Optional[int]]]:
+        """Return ``(call position, result position or None)``, or None if the call is not in the history."""
+        entry = self._calls.get(tool_call_id)
+        if entry is None or entry[0] < self._first:
+            return None
+        call, result = entry
+        return call - self._first, (
+            result - self._first if result is not None else None
+        )
+
+    def is_safe(self, index: int) -> bool:
+        """Return True if dropping ``messages[:index]`` leaves no tool call or result unpaired."""
+        if index >= len(self):
+            return True
+        seq = self._first + index
+        return self._blocks[seq - self._base] == seq
+
+    def next_safe(self, index: int) -> int:
+        """Return the smallest pair-safe cut ``>= index`` (``len`` if the last block is still open)."""
+        size = len(self)
+        if index >= size:
+            return size
+        index = max(index, 0)
+        seq = self._first + index
+        block = self._blocks[seq - self._base]
+        if block == seq:
+            return index
+        end = self._block_end.get(block)
+        return size if end is None else end - self._first
+
+    def prev_safe(self, index: int) -> int:
+        """Return the largest pair-safe cut ``<= index`` (0 if the first block started before the history)."""
+        size = len(self)
+        if index >= size:
+            return size
+        index = max(index, 0)
+        seq = self._first + index
+        return max(self._blocks[seq - self._base] - self._first, 0)
+
+    def safe_cut(self, index: int) -> int:
+        """Return the pair-safe cut to use instead of ``index``.
+
+        Rounds up (drops the rest of a tool exchange) so a token or message
+        budget still holds, unless that would drop the whole history; then it
+        rounds down and keeps the exchange.
+        """
+        cut = self.next_safe(index)
+        if cut < len(self) or index >= len(self):
+            return cut
+        return self.prev_safe(index)
+
+
+class ToolPairIndexCache:
+    """Per-thread ``ToolPairIndex`` instances, least recently used evicted first.
+
+    Args:
+        maxsize: Number of threads to keep an index for.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self._indexes: OrderedDict[Any, ToolPairIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self, config: Optional[Mapping[str, Any]], messages: Sequence[BaseMessage]
+    ) -> ToolPairIndex:
+        """Return the index for the thread in ``config``, synced with ``messages``.
+
+        Without a thread id there is nothing to share the index with, so a new
+        one is built for ``messages`` and not cached. A cached index is synced
+        under the cache lock, so two calls for the same thread never update it
+        at the same time.
+        """
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        if thread_id is None:
+            return ToolPairIndex(messages)
+        with self._lock:
+            index = self._indexes.get(thread_id)
+            if index is None:
+                index = self._indexes[thread_id] = ToolPairIndex()
+                while len(self._indexes) > self.maxsize:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(thread_id)
+            return index.sync(messages)
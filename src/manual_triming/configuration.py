@@ -1,12 +1,23 @@
+import logging
 import os
+
 from dotenv import load_dotenv
-from langchain.chat_models import init_chat_model
+
+from condenser_core.blob_store import BlobStore
+from condenser_core.models import LazyChatModel, get_rate_limiter
+from condenser_core.settings import (
+    MODEL_REQUESTS_PER_SECOND,
+    TOOL_BLOB_DIR,
+    TOOL_BLOB_MIN_CHARS,
+)
+from condenser_core.token_counter import FastTokenCounter
+
 from .tools import tools
 
 # Load environment variables from a .env file if it exists
 # Construct the path to the .env file, assuming it's in the project root
-project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-dotenv_path = os.path.join(project_root, '.env')
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+dotenv_path = os.path.join(project_root, ".env")
 load_dotenv(dotenv_path=dotenv_path)
 
 # --- General Configuration ---
@@ -14,20 +25,40 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
     # Making this a warning for now, as it might not be strictly needed for all flows
     # or could be configured directly in init_chat_model depending on specific LangChain versions/setups
-    print(f"Warning: GOOGLE_API_KEY environment variable not set. Searched for .env at {dotenv_path}")
+    logging.getLogger(__name__).warning(
+        "GOOGLE_API_KEY environment variable not set. Searched for .env at %s",
+        dotenv_path,
+    )
 
 # --- LLM Configuration ---
 # The user previously had "google_genai:gemini-2.0-flash" directly in init_chat_model
 # For consistency, let's use MODEL_NAME, but we'll ensure the current model is used.
-MODEL_NAME = "google_genai:gemini-2.0-flash" # Matching the existing init_chat_model call
-TEMPERATURE = 0.0 # Default from previous versions
+MODEL_NAME = (
+    "google_genai:gemini-2.0-flash"  # Matching the existing init_chat_model call
+)
+TEMPERATURE = 0.0  # Default from previous versions
 
 # --- Memory Configuration ---
-MAX_MESSAGES =4 # The maximum number of messages to keep in history
+MAX_MESSAGES = 4  # The maximum number of messages to keep in history
+MAX_TOKENS = (
+    None  # Optional token budget for the history, applied on top of MAX_MESSAGES
+)
+
+# Local token counter for MAX_TOKENS. Offline by default; pass an exact_counter
+# (e.g. llm.get_num_tokens_from_messages) to calibrate it near the budget.
+token_counter = FastTokenCounter()
 
 # --- Tool Configuration ---
-# (Add any specific tool configs here if needed)
+# Tool execution, streaming, checkpointing and the model request rate are shared by all
+# packages (see condenser_core.settings); large tool outputs go to the blob store when configured there.
+blob_store = (
+    BlobStore(TOOL_BLOB_DIR, min_chars=TOOL_BLOB_MIN_CHARS) if TOOL_BLOB_DIR else None
+)
+agent_tools = tools + [blob_store.read_tool()] if blob_store else tools
 
-# Existing LLM and tools initialization
-llm = init_chat_model(MODEL_NAME, client_options={"api_key": GOOGLE_API_KEY} if GOOGLE_API_KEY else {})
-llm_with_tools = llm.bind_tools(tools)
+# LLM and tools: built on first use and shared with the other packages using the same
+# model (see condenser_core.models). The provider reads GOOGLE_API_KEY, loaded above from .env.
+llm = LazyChatModel(
+    MODEL_NAME, rate_limiter=get_rate_limiter(MODEL_NAME, MODEL_REQUESTS_PER_SECOND)
+)
+llm_with_tools = llm.bind_tools(agent_tools)
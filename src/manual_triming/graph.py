@@ -1,13 +1,38 @@
-from typing import Annotated, Sequence, TypedDict
-from langchain_core.messages import BaseMessage, ToolMessage, SystemMessage
-from langgraph.graph import StateGraph, END
-from langchain_core.runnables import RunnableConfig
+from typing import Any, Dict, Literal, cast
 
-from manual_triming.configuration import llm_with_tools
-from manual_triming.tools import tools
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.graph import END, StateGraph
+
+from condenser_core.checkpoint import get_saver
+from condenser_core.instrumentation import instrumentation
+from condenser_core.prompt import PromptAssembler
+from condenser_core.settings import (
+    CHECKPOINT_DB_PATH,
+    EARLY_TOOL_DISPATCH,
+    HOT_SESSIONS_FLUSH_EVERY,
+    HOT_SESSIONS_MAX,
+    HOT_SESSIONS_MAX_BYTES,
+    STREAM_MODEL_OUTPUT,
+    TOOL_CACHE_ENABLED,
+    TOOL_CACHE_MAXSIZE,
+    TOOL_CACHE_TTL_SECONDS,
+    TOOL_MAX_CONCURRENCY,
+    TOOL_TIMEOUT_SECONDS,
+    TOOL_TIMEOUTS,
+)
+from condenser_core.streaming import ainvoke_model, invoke_model
+from condenser_core.tool_cache import ToolResultCache
+from condenser_core.tool_executor import ToolExecutor
+from manual_triming.configuration import (
+    agent_tools,
+    blob_store,
+    llm_with_tools,
+)
 from manual_triming.state import AgentState
 
-import json
+# Node timings are reported to condenser_core.instrumentation (condensation stats come from the reducer)
+GRAPH_NAME = "manual_triming"
 
 # State definition is now imported from react_agent.state
 # class AgentState(TypedDict):
@@ -16,32 +41,76 @@ import json
 # from langgraph.graph.message import add_messages
 # AgentState.__annotations__["messages"] = Annotated[Sequence[BaseMessage], add_messages]
 
-# tool lookup
-tools_by_name = {tool.name: tool for tool in tools}
+# tool lookup and concurrent execution
+tool_cache = (
+    ToolResultCache(maxsize=TOOL_CACHE_MAXSIZE, ttl=TOOL_CACHE_TTL_SECONDS)
+    if TOOL_CACHE_ENABLED
+    else None
+)
+tool_executor = ToolExecutor(
+    agent_tools,
+    max_concurrency=TOOL_MAX_CONCURRENCY,
+    timeout=TOOL_TIMEOUT_SECONDS,
+    timeouts=TOOL_TIMEOUTS,
+    cache=tool_cache,
+    blob_store=blob_store,
+)
+
+
+def _model_call_options() -> Dict[str, Any]:
+    # Streaming and early tool dispatch settings for the agent node (see condenser_core.streaming)
+    return {
+        "stream": STREAM_MODEL_OUTPUT,
+        "executor": tool_executor if EARLY_TOOL_DISPATCH else None,
+        "graph": GRAPH_NAME,
+    }
+
 
 # Tool node
-def tool_node(state: AgentState):
-    outputs = []
-    for tool_call in state["messages"][-1].tool_calls:
-        tool_result = tools_by_name[tool_call["name"]].invoke(tool_call["args"])
-        outputs.append(
-            ToolMessage(
-                content=json.dumps(tool_result),
-                name=tool_call["name"],
-                tool_call_id=tool_call["id"],
-            )
-        )
+@instrumentation.node(GRAPH_NAME, "tools")
+def tool_node(state: AgentState) -> Dict[str, Any]:
+    outputs = tool_executor.run(cast(AIMessage, state["messages"][-1]).tool_calls)
+    return {"messages": outputs}
+
+
+@instrumentation.node(GRAPH_NAME, "tools")
+async def atool_node(state: AgentState) -> Dict[str, Any]:
+    outputs = await tool_executor.arun(
+        cast(AIMessage, state["messages"][-1]).tool_calls
+    )
     return {"messages": outputs}
 
+
+# System prompt built once; each call presents it and the window as a view instead of a new list
+prompt_assembler = PromptAssembler(
+    "You are a helpful AI assistant, please respond to the users query to the best of your ability!"
+)
+
+
 # llm_with_tools node
-def call_llm_with_tools(state: AgentState, config: RunnableConfig):
-    system_prompt = SystemMessage(
-        "You are a helpful AI assistant, please respond to the users query to the best of your ability!"
+@instrumentation.node(GRAPH_NAME, "agent")
+def call_llm_with_tools(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    response = invoke_model(
+        llm_with_tools,
+        prompt_assembler.assemble(state["messages"]),
+        config,
+        **_model_call_options(),
+    )
+    return {"messages": [response]}
+
+
+@instrumentation.node(GRAPH_NAME, "agent")
+async def acall_llm_with_tools(
+    state: AgentState, config: RunnableConfig
+) -> Dict[str, Any]:
+    prompt = prompt_assembler.assemble(state["messages"])
+    response = await ainvoke_model(
+        llm_with_tools, prompt, config, **_model_call_options()
     )
-    response = llm_with_tools.invoke([system_prompt] + state["messages"], config)
     return {"messages": [response]}
 
-def should_continue(state: AgentState):
+
+def should_continue(state: AgentState) -> Literal["end", "continue"]:
     messages = state["messages"]
     last_message = messages[-1]
     if not getattr(last_message, "tool_calls", None):
@@ -49,10 +118,14 @@ def should_continue(state: AgentState):
     else:
         return "continue"
 
+
 # Build the graph
 workflow = StateGraph(AgentState)
-workflow.add_node("agent", call_llm_with_tools)
-workflow.add_node("tools", tool_node)
+# Each node has a native async implementation used by ainvoke/astream
+workflow.add_node(
+    "agent", RunnableLambda(call_llm_with_tools, afunc=acall_llm_with_tools)
+)
+workflow.add_node("tools", RunnableLambda(tool_node, afunc=atool_node))
 workflow.set_entry_point("agent")
 workflow.add_conditional_edges(
     "agent",
@@ -63,4 +136,18 @@ workflow.add_conditional_edges(
     },
 )
 workflow.add_edge("tools", "agent")
-graph = workflow.compile()
\ No newline at end of file
+
+# Compiled at import: the chat models are LazyChatModel placeholders, so compiling builds no model
+# and imports no provider SDK; the checkpointer opens its database on first use. The package
+# re-exports `graph`, as langgraph.json does.
+checkpointer = (
+    get_saver(
+        CHECKPOINT_DB_PATH,
+        HOT_SESSIONS_MAX,
+        HOT_SESSIONS_MAX_BYTES,
+        HOT_SESSIONS_FLUSH_EVERY,
+    )
+    if CHECKPOINT_DB_PATH
+    else None
+)
+graph = workflow.compile(checkpointer=checkpointer)
@@ -0,0 +1,182 @@
+from collections import deque
+from itertools import islice
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+    overload,
+)
+
+from langchain_core.messages import BaseMessage
+from langgraph.channels.binop import BinaryOperatorAggregate
+
+from condenser_core.tool_pairs import ToolPairIndex
+
+
+class MessageWindow(Sequence[BaseMessage]):
+    """Bounded message history backed by a ring buffer (collections.deque with maxlen).
+
+    Appending k messages is O(k) and each eviction of the oldest message is O(1), so the
+    reducer no longer copies the whole history on every node return. The window is updated
+    in place; use copy() or list(window) when a snapshot is needed.
+
+    Each message's token count is cached in a parallel ring buffer, so a message is counted
+    once while it stays in the window; reading the window returns the stored messages as is.
+
+    A ToolPairIndex follows every append and eviction, so trimming can snap to a cut that
+    never separates a tool call from its results (see safe_trim()).
+    """
+
+    __slots__ = ("_messages", "_tokens", "_pairs")
+
+    def __init__(
+        self, messages: Iterable[BaseMessage] = (), maxlen: Optional[int] = None
+    ):
+        self._messages: Deque[BaseMessage] = deque(maxlen=maxlen)
+        self._tokens: Deque[Optional[int]] = deque(maxlen=maxlen)
+        self._pairs = ToolPairIndex()
+        self.extend(messages)
+
+    @property
+    def maxlen(self) -> Optional[int]:
+        return self._messages.maxlen
+
+    def extend(self, messages: Iterable[BaseMessage]) -> None:
+        """Append messages, evicting the oldest ones once maxlen is reached."""
+        for message in messages:
+            if len(self._messages) == self.maxlen:
+                self._pairs.drop_front(1)
+            self._messages.append(message)
+            self._tokens.append(None)
+            self._pairs.append(message)
+
+    def trim(self, count: int) -> None:
+        """Keep only the last `count` messages."""
+        count = max(count, 0)
+        if len(self._messages) > count:
+            self._pairs.drop_front(len(self._messages) - count)
+        while len(self._messages) > count:
+            self._messages.popleft()
+            self._tokens.popleft()
+
+    def safe_trim(self, count: Optional[int] = None) -> None:
+        """Keep at most the last `count` messages (all by default), snapping to a pair-safe cut.
+
+        The cut moves forward past the rest of a tool exchange, unless that would empty the
+        window; then the exchange is kept whole.
+        """
+        size = len(self._messages)
+        start = 0 if count is None else max(size - max(count, 0), 0)
+        self.trim(size - self._pairs.safe_cut(start))
+
+    @property
+    def pairs(self) -> ToolPairIndex:
+        return self._pairs
+
+    def token_counts(
+        self, count_batch: Callable[[List[BaseMessage]], List[int]]
+    ) -> List[int]:
+        """Return per-message token counts, counting (in one batch) only messages not counted yet."""
+        missing = [i for i, tokens in enumerate(self._tokens) if tokens is None]
+        if missing:
+            counts = count_batch([self._messages[i] for i in missing])
+            for i, count in zip(missing, counts):
+                self._tokens[i] = count
+        return [tokens or 0 for tokens in self._tokens]
+
+    def copy(self) -> "MessageWindow":
+        copied = MessageWindow(maxlen=self.maxlen)
+        copied._messages.extend(self._messages)
+        copied._tokens.extend(self._tokens)
+        copied._pairs = ToolPairIndex(iter(self))
+        return copied
+
+    @overload
+    def __getitem__(self, index: int) -> BaseMessage: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[BaseMessage]: ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[BaseMessage, List[BaseMessage]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self._messages))
+            if step == 1 and stop == len(self._messages):
+                # Tail slices (the common case) only walk the part that is returned
+                return list(islice(reversed(self._messages), max(stop - start, 0)))[
+                    ::-1
+                ]
+            return list(self._messages)[index]
+        return self._messages[index]
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[BaseMessage]:
+        return iter(self._messages)
+
+    def __reversed__(self) -> Iterator[BaseMessage]:
+        return reversed(self._messages)
+
+    def __radd__(self, other: object) -> List[BaseMessage]:
+        # Supports `[system_prompt] + state["messages"]` in the nodes
+        if isinstance(other, list):
+            return other + list(self._messages)
+        return NotImplemented
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, MessageWindow):
+            return list(self) == list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"MessageWindow({list(self)!r}, maxlen={self.maxlen})"
+
+
+class MessageWindowChannel(BinaryOperatorAggregate[Sequence[BaseMessage]]):
+    """LangGraph channel holding a MessageWindow that checkpoints as a plain message list.
+
+    The reducer updates the window in place; checkpointers only ever see `list[BaseMessage]`,
+    and restoring a checkpoint rebuilds the ring buffer with the configured maxlen.
+    """
+
+    __slots__ = ("maxlen",)
+
+    def __init__(
+        self, typ: Any, operator: Callable[..., Any], maxlen: Optional[int] = None
+    ):
+        super().__init__(typ, operator)
+        self.maxlen = maxlen
+
+    def _empty(self) -> "MessageWindowChannel":
+        empty = self.__class__(self.typ, self.operator, maxlen=self.maxlen)
+        empty.key = self.key
+        return empty
+
+    def copy(self) -> "MessageWindowChannel":
+        # The window is mutated in place, so copies must not share it
+        empty = self._empty()
+        empty.value = (
+            self.value.copy() if isinstance(self.value, MessageWindow) else self.value
+        )
+        return empty
+
+    def from_checkpoint(self, checkpoint: Any) -> "MessageWindowChannel":
+        empty = self._empty()
+        if isinstance(checkpoint, (list, tuple, MessageWindow)):
+            empty.value = MessageWindow(checkpoint, maxlen=self.maxlen)
+        return empty
+
+    def checkpoint(self) -> Any:
+        if isinstance(self.value, MessageWindow):
+            return list(self.value)
+        return super().checkpoint()
@@ -1,24 +1,26 @@
-from typing import (
-    Annotated,
-    Sequence,
-    TypedDict,
-    Union,
-    List
-)
+from typing import Annotated, Sequence, TypedDict, Union
+
 from langchain_core.messages import BaseMessage
+
 # Removed: from langgraph.graph.message import add_messages
 # We will define our own reducer.
-
-from manual_triming.configuration import MAX_MESSAGES
+from condenser_core.instrumentation import instrumentation
+from condenser_core.token_counter import keep_last_within_budget
+from manual_triming.configuration import MAX_MESSAGES, MAX_TOKENS, token_counter
+from manual_triming.history import MessageWindow, MessageWindowChannel
 
 
 def manage_messages_history(
     existing: Sequence[BaseMessage],
     updates: Union[Sequence[BaseMessage], dict],
 ) -> Sequence[BaseMessage]:
+    """Manages the message history, adding new messages and trimming old ones.
+
+    The history is kept in a MessageWindow (a ring buffer bounded by MAX_MESSAGES) that is
+    updated in place, so appending and evicting never copy the whole history.
     """
-    Manages the message history, adding new messages and trimming old ones.
-    """
+    if not isinstance(existing, MessageWindow):
+        existing = MessageWindow(existing, maxlen=MAX_MESSAGES)
     if isinstance(updates, dict):
         if updates.get("type") == "trim":
             # Trim messages, keeping only the last MAX_MESSAGES
@@ -26,19 +28,45 @@ def manage_messages_history(
             # This is slightly different from your example's "from" and "to"
             # but aligns with keeping the "last N".
             num_to_keep = updates.get("count", MAX_MESSAGES)
-            return existing[-num_to_keep:]
+            # Never split a tool call from its results
+            existing.safe_trim(num_to_keep)
+            return existing
         # Potentially handle other dictionary-based update types here
         # For now, if it's a dict not for trimming, we raise an error or return existing.
         # Or, if other dict updates are expected, add logic for them.
         # For safety, let's assume only 'trim' is a valid dict update for now.
         raise ValueError(f"Unsupported dictionary update type for messages: {updates}")
-    elif isinstance(updates, list): # Langchain typically appends lists of BaseMessage
-        # Add new messages
-        combined = list(existing) + list(updates)
-        # Trim if history exceeds MAX_MESSAGES
-        if len(combined) > MAX_MESSAGES:
-            return combined[-MAX_MESSAGES:]
-        return combined
+    elif isinstance(updates, list):  # Langchain typically appends lists of BaseMessage
+        report = instrumentation.enabled
+        if report:
+            # Evicted messages are gone after extend(), so measure the combined history first
+            messages_before = len(existing) + len(updates)
+            tokens_before = sum(existing.token_counts(token_counter.count_batch)) + sum(
+                token_counter.count_batch(updates)
+            )
+        # Add new messages; the ring buffer evicts anything beyond MAX_MESSAGES
+        existing.extend(updates)
+        # Then trim to the token budget, if one is configured, and snap to a cut that keeps
+        # tool calls and their results together (eviction may have split an exchange)
+        if MAX_TOKENS is not None:
+            # Each message is counted once; its count is cached on the window's record
+            counts = existing.token_counts(token_counter.count_batch)
+            start = keep_last_within_budget(existing, MAX_TOKENS, token_counter, counts)
+            existing.safe_trim(len(existing) - start)
+        else:
+            existing.safe_trim()
+        if report and len(existing) < messages_before:
+            instrumentation.emit(
+                "condense",
+                graph="manual_triming",
+                name="window",
+                messages_before=messages_before,
+                messages_after=len(existing),
+                dropped=messages_before - len(existing),
+                tokens_before=tokens_before,
+                tokens_after=sum(existing.token_counts(token_counter.count_batch)),
+            )
+        return existing
     else:
         # This case should ideally not be reached if types are correct
         raise TypeError(
@@ -49,4 +77,10 @@ def manage_messages_history(
 class AgentState(TypedDict):
     """The state of the agent."""
 
-    messages: Annotated[Sequence[BaseMessage], manage_messages_history]
\ No newline at end of file
+    # The channel keeps the MessageWindow between steps and checkpoints it as a plain list
+    messages: Annotated[
+        Sequence[BaseMessage],
+        MessageWindowChannel(
+            Sequence[BaseMessage], manage_messages_history, maxlen=MAX_MESSAGES
+        ),
+    ]
@@ -1,5 +1,39 @@
-from langchain.chat_models import init_chat_model
+from condenser_core.blob_store import BlobStore
+from condenser_core.models import LazyChatModel, get_rate_limiter
+from condenser_core.settings import (
+    MODEL_REQUESTS_PER_SECOND,
+    TOOL_BLOB_DIR,
+    TOOL_BLOB_MIN_CHARS,
+)
+from condenser_core.token_counter import FastTokenCounter
 from selective_deletition.tools import tools
 
-llm = init_chat_model("google_genai:gemini-2.0-flash")
-llm_with_tools = llm.bind_tools(tools)
\ No newline at end of file
+# Optional token budget for the history. When set, delete_messages_node removes
+# the oldest messages until the rest fits instead of always removing two.
+MAX_TOKENS_FOR_HISTORY = None
+
+# Which messages delete_messages_node keeps within MAX_TOKENS_FOR_HISTORY (ignored while it is None):
+# "recency":   the newest messages (drop the oldest first).
+# "relevance": the current turn plus the earlier messages most similar to the current user
+#              message (condenser_core.relevance; local hashed bag-of-words, no model calls).
+RETENTION_POLICY = "recency"
+RELEVANCE_EMBEDDING_DIM = 1024
+RELEVANCE_RECENCY_WEIGHT = 0.1
+
+# Local token counter for MAX_TOKENS_FOR_HISTORY. Offline by default; pass an
+# exact_counter (e.g. llm.get_num_tokens_from_messages) to calibrate it.
+token_counter = FastTokenCounter()
+
+# Tool execution, streaming, checkpointing and the model request rate are shared by all
+# packages (see condenser_core.settings); large tool outputs go to the blob store when configured there.
+blob_store = (
+    BlobStore(TOOL_BLOB_DIR, min_chars=TOOL_BLOB_MIN_CHARS) if TOOL_BLOB_DIR else None
+)
+agent_tools = tools + [blob_store.read_tool()] if blob_store else tools
+
+# Built on first use and shared with the other packages using the same model (see condenser_core.models)
+MODEL_NAME = "google_genai:gemini-2.0-flash"
+llm = LazyChatModel(
+    MODEL_NAME, rate_limiter=get_rate_limiter(MODEL_NAME, MODEL_REQUESTS_PER_SECOND)
+)
+llm_with_tools = llm.bind_tools(agent_tools)
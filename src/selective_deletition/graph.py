@@ -1,89 +1,275 @@
-from typing import Sequence, TypedDict, Literal
-from langchain_core.messages import BaseMessage, ToolMessage, SystemMessage, AIMessage, HumanMessage, RemoveMessage
-from langgraph.graph import StateGraph, END
-from langchain_core.runnables import RunnableConfig
+import logging
+from typing import Any, Collection, Dict, List, Literal, Optional, Sequence, cast
 
-from selective_deletition.configuration import llm_with_tools
-from selective_deletition.tools import tools
+from langchain_core.messages import AIMessage, BaseMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.graph import END, StateGraph
+
+from condenser_core.checkpoint import get_saver
+from condenser_core.instrumentation import instrumentation
+from condenser_core.prompt import PromptAssembler
+from condenser_core.relevance import RelevanceScorer
+from condenser_core.settings import (
+    CHECKPOINT_DB_PATH,
+    EARLY_TOOL_DISPATCH,
+    HOT_SESSIONS_FLUSH_EVERY,
+    HOT_SESSIONS_MAX,
+    HOT_SESSIONS_MAX_BYTES,
+    STREAM_MODEL_OUTPUT,
+    TOOL_CACHE_ENABLED,
+    TOOL_CACHE_MAXSIZE,
+    TOOL_CACHE_TTL_SECONDS,
+    TOOL_MAX_CONCURRENCY,
+    TOOL_TIMEOUT_SECONDS,
+    TOOL_TIMEOUTS,
+)
+from condenser_core.streaming import ainvoke_model, invoke_model
+from condenser_core.token_counter import keep_last_within_budget
+from condenser_core.tool_cache import ToolResultCache
+from condenser_core.tool_executor import ToolExecutor
+from condenser_core.tool_pairs import ToolPairIndexCache
+from selective_deletition.configuration import (
+    MAX_TOKENS_FOR_HISTORY,
+    RELEVANCE_EMBEDDING_DIM,
+    RELEVANCE_RECENCY_WEIGHT,
+    RETENTION_POLICY,
+    agent_tools,
+    blob_store,
+    llm_with_tools,
+    token_counter,
+)
 from selective_deletition.state import AgentState
 
-import json
+# Node timings and condensation stats are reported to condenser_core.instrumentation
+GRAPH_NAME = "selective_deletition"
+logger = logging.getLogger(__name__)
+
+# tool lookup and concurrent execution
+tool_cache = (
+    ToolResultCache(maxsize=TOOL_CACHE_MAXSIZE, ttl=TOOL_CACHE_TTL_SECONDS)
+    if TOOL_CACHE_ENABLED
+    else None
+)
+tool_executor = ToolExecutor(
+    agent_tools,
+    max_concurrency=TOOL_MAX_CONCURRENCY,
+    timeout=TOOL_TIMEOUT_SECONDS,
+    timeouts=TOOL_TIMEOUTS,
+    cache=tool_cache,
+    blob_store=blob_store,
+)
+
+
+def _model_call_options() -> Dict[str, Any]:
+    # Streaming and early tool dispatch settings for the agent node (see condenser_core.streaming)
+    return {
+        "stream": STREAM_MODEL_OUTPUT,
+        "executor": tool_executor if EARLY_TOOL_DISPATCH else None,
+        "graph": GRAPH_NAME,
+    }
+
+
+# Message vectors are cached per message id across turns and threads
+relevance_scorer = (
+    RelevanceScorer(
+        dim=RELEVANCE_EMBEDDING_DIM, recency_weight=RELEVANCE_RECENCY_WEIGHT
+    )
+    if RETENTION_POLICY == "relevance"
+    else None
+)
+
+# Per-thread tool call/result index, so deletions never orphan a tool message
+pair_indexes = ToolPairIndexCache()
 
-# tool lookup
-tools_by_name = {tool.name: tool for tool in tools}
 
 # Tool node
-def tool_node(state: AgentState) -> dict:
-    print("--- Node: Tools Execution ---")
-    outputs = []
+@instrumentation.node(GRAPH_NAME, "tools")
+def tool_node(state: AgentState) -> Dict[str, Any]:
     # Ensure last message is an AIMessage and has tool_calls
     last_message = state["messages"][-1]
     if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
-        print("Tool node: Last message is not an AIMessage with tool calls. Skipping.")
-        return {} 
-
-    for tool_call in last_message.tool_calls:
-        tool_result = tools_by_name[tool_call["name"]].invoke(tool_call["args"])
-        outputs.append(
-            ToolMessage(
-                content=json.dumps(tool_result),
-                name=tool_call["name"],
-                tool_call_id=tool_call["id"],
-            )
+        logger.debug(
+            "Tool node: last message is not an AIMessage with tool calls; skipping."
         )
+        return {}
+
+    # Independent calls run concurrently; results come back in call order
+    outputs = tool_executor.run(last_message.tool_calls)
     # The custom reducer will handle appending these to the main messages list
     return {"messages": outputs}
 
+
+@instrumentation.node(GRAPH_NAME, "tools")
+async def atool_node(state: AgentState) -> Dict[str, Any]:
+    last_message = state["messages"][-1]
+    if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
+        logger.debug(
+            "Tool node: last message is not an AIMessage with tool calls; skipping."
+        )
+        return {}
+    outputs = await tool_executor.arun(last_message.tool_calls)
+    return {"messages": outputs}
+
+
+# System prompt built once; each call presents it and the history as a view instead of a new list
+prompt_assembler = PromptAssembler(
+    "You are a helpful AI assistant, please respond to the users query to the best of your ability!"
+)
+
+
 # llm_with_tools node
-def call_llm_with_tools(state: AgentState, config: RunnableConfig) -> dict:
-    print(f"--- Node: Agent (LLM Call) ---")
-    system_prompt = SystemMessage(
-        content="You are a helpful AI assistant, please respond to the users query to the best of your ability!"
-    )
+@instrumentation.node(GRAPH_NAME, "agent")
+def call_llm_with_tools(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     # The custom_messages_reducer in AgentState handles the actual list of messages
     # This node just provides new messages to be appended by the reducer.
-    response = llm_with_tools.invoke([system_prompt] + state["messages"], config)
-    print(f"LLM Response: {response.content[:80]}...")
+    response = invoke_model(
+        llm_with_tools,
+        prompt_assembler.assemble(state["messages"]),
+        config,
+        **_model_call_options(),
+    )
     # The custom reducer will handle appending this to the main messages list
     return {"messages": [response]}
 
+
+@instrumentation.node(GRAPH_NAME, "agent")
+async def acall_llm_with_tools(
+    state: AgentState, config: RunnableConfig
+) -> Dict[str, Any]:
+    prompt = prompt_assembler.assemble(state["messages"])
+    response = await ainvoke_model(
+        llm_with_tools, prompt, config, **_model_call_options()
+    )
+    return {"messages": [response]}
+
+
+def _report_deletion(
+    messages: Sequence[BaseMessage],
+    start: int,
+    counts: Optional[List[int]] = None,
+    keep: Optional[Collection[int]] = None,
+) -> None:
+    """Emit a condense event for dropping messages[:start], or everything outside ``keep``.
+
+    Only called when instrumentation is on.
+    """
+    if counts is None:
+        counts = token_counter.count_batch(list(messages))
+    if keep is None:
+        keep = range(start, len(messages))
+    instrumentation.emit(
+        "condense",
+        graph=GRAPH_NAME,
+        name="relevance" if relevance_scorer is not None else "delete",
+        messages_before=len(messages),
+        messages_after=len(keep),
+        dropped=len(messages) - len(keep),
+        tokens_before=sum(counts),
+        tokens_after=sum(counts[i] for i in keep),
+    )
+
+
+def _remove(messages: Sequence[BaseMessage]) -> List[RemoveMessage]:
+    # Messages in the state always have ids: the reducer assigns one to every message it adds
+    return [RemoveMessage(id=cast(str, m.id)) for m in messages]
+
+
+def _delete_irrelevant(
+    scorer: RelevanceScorer, messages: Sequence[BaseMessage], max_tokens: int
+) -> Optional[Dict[str, Any]]:
+    """Keep the current turn and the most relevant earlier messages within MAX_TOKENS_FOR_HISTORY."""
+    counts = token_counter.count_batch(list(messages))
+    if sum(counts) <= max_tokens:
+        return None
+    keep = scorer.select(messages, counts, max_tokens)
+    logger.debug(
+        "History over %s tokens; removing %d least relevant messages.",
+        max_tokens,
+        len(messages) - len(keep),
+    )
+    if instrumentation.enabled:
+        _report_deletion(messages, 0, counts, keep)
+    return {"messages": _remove([m for i, m in enumerate(messages) if i not in keep])}
+
+
 # New node for deleting messages
-def delete_messages_node(state: AgentState) -> dict | None:
-    print("--- Node: Delete Messages Check ---")
+@instrumentation.node(GRAPH_NAME, "delete_messages_step")
+def delete_messages_node(
+    state: AgentState, config: Optional[RunnableConfig] = None
+) -> Optional[Dict[str, Any]]:
     messages = state["messages"]
+    if MAX_TOKENS_FOR_HISTORY is not None and relevance_scorer is not None:
+        return _delete_irrelevant(relevance_scorer, messages, MAX_TOKENS_FOR_HISTORY)
+    # Cuts snap to boundaries that keep each tool call together with its results
+    pairs = pair_indexes.get(config, messages)
+    if MAX_TOKENS_FOR_HISTORY is not None:
+        start = pairs.safe_cut(
+            keep_last_within_budget(messages, MAX_TOKENS_FOR_HISTORY, token_counter)
+        )
+        if start > 0:
+            logger.debug(
+                "History over %s tokens; removing earliest %d messages.",
+                MAX_TOKENS_FOR_HISTORY,
+                start,
+            )
+            if instrumentation.enabled:
+                _report_deletion(messages, start)
+            return {"messages": _remove(messages[:start])}
+        return None
     # Only proceed if there are messages to avoid errors on empty list
     if messages and len(messages) > 2:
-        print(f"Message count ({len(messages)}) > 2. Removing earliest two messages.")
+        start = pairs.safe_cut(2)
+        if start == 0:
+            return None
+        logger.debug(
+            "Message count (%d) > 2; removing earliest %d messages.",
+            len(messages),
+            start,
+        )
+        if instrumentation.enabled:
+            _report_deletion(messages, start)
         # The custom reducer will process these RemoveMessage instructions
-        return {"messages": [RemoveMessage(id=m.id) for m in messages[:2]]}
-    print("Message count <= 2. No messages removed.")
-    return None # Or return {} if all nodes must return a dict
+        return {"messages": _remove(messages[:start])}
+    return None  # Or return {} if all nodes must return a dict
+
+
+async def adelete_messages_node(
+    state: AgentState, config: Optional[RunnableConfig] = None
+) -> Optional[Dict[str, Any]]:
+    # Pure in-memory bookkeeping, nothing to await; exists so ainvoke never leaves the event loop
+    return delete_messages_node(state, config)
+
 
 # Conditional logic
 def should_continue(state: AgentState) -> Literal["tools", "delete_messages_step"]:
-    print(f"--- Condition: Should Continue? ---")
     messages = state["messages"]
     if not messages:
         # This case should ideally not be hit if inputs are handled correctly.
         # If it is, ending might be safest, but here we route to delete_messages for consistency.
-        print("No messages in state. Routing to delete_messages_step (will do nothing). ")
         return "delete_messages_step"
-    
+
     last_message = messages[-1]
-    if isinstance(last_message, AIMessage) and getattr(last_message, "tool_calls", None):
-        print("Decision: AI Message with tool calls. Routing to tools.")
+    if isinstance(last_message, AIMessage) and getattr(
+        last_message, "tool_calls", None
+    ):
         return "tools"
-    
+
     # If no tool calls, proceed to message deletion check
-    print("Decision: No tool calls or not AIMessage. Routing to delete_messages_step.")
     return "delete_messages_step"
 
+
 # Build the graph
 workflow = StateGraph(AgentState)
 
-workflow.add_node("agent", call_llm_with_tools)
-workflow.add_node("tools", tool_node)
-workflow.add_node("delete_messages_step", delete_messages_node)
+# Each node has a native async implementation used by ainvoke/astream
+workflow.add_node(
+    "agent", RunnableLambda(call_llm_with_tools, afunc=acall_llm_with_tools)
+)
+workflow.add_node("tools", RunnableLambda(tool_node, afunc=atool_node))
+workflow.add_node(
+    "delete_messages_step",
+    RunnableLambda(delete_messages_node, afunc=adelete_messages_node),
+)
 
 workflow.set_entry_point("agent")
 
@@ -100,9 +286,22 @@ workflow.add_conditional_edges(
 workflow.add_edge("tools", "agent")
 
 # After delete_messages_step, decide if we should loop or end.
-# For this example, we'll always end after deletion. 
+# For this example, we'll always end after deletion.
 # A more complex loop might re-evaluate or go back to agent based on some condition.
 workflow.add_edge("delete_messages_step", END)
 
-graph = workflow.compile()
-print("Graph compiled with delete_messages_node.")
\ No newline at end of file
+# Compiled at import: the chat models are LazyChatModel placeholders, so compiling builds no model
+# and imports no provider SDK; the checkpointer opens its database on first use. The package
+# re-exports `graph`, as langgraph.json does.
+checkpointer = (
+    get_saver(
+        CHECKPOINT_DB_PATH,
+        HOT_SESSIONS_MAX,
+        HOT_SESSIONS_MAX_BYTES,
+        HOT_SESSIONS_FLUSH_EVERY,
+    )
+    if CHECKPOINT_DB_PATH
+    else None
+)
+graph = workflow.compile(checkpointer=checkpointer)
+logger.debug("Graph compiled with delete_messages_node.")
@@ -0,0 +1,342 @@
+"""Summarization off the critical path: background jobs and speculative summaries, one per thread."""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Sequence, Set, Tuple
+
+from langchain_core.messages import BaseMessage
+
+from condenser_core.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+Update = Optional[Dict[str, Any]]
+
+
+def _evict_stale(
+    pending: "OrderedDict[str, Tuple[Any, ...]]", now: float, max_pending: int
+) -> None:
+    """Drop the entries of pending past their deadline, then the oldest ones beyond max_pending.
+
+    pending is ordered by deadline; each entry is a tuple ending in (future, deadline).
+    """
+    while pending:
+        thread_id, entry = next(iter(pending.items()))
+        if entry[-1] >= now and len(pending) <= max_pending:
+            break
+        del pending[thread_id]
+        entry[-2].cancel()
+        logger.info(
+            "Pending summary for thread %s dropped: not collected in time.", thread_id
+        )
+        instrumentation.emit("summary_expired", graph="summarization")
+
+
+class BackgroundSummarizer:
+    """Runs summarization off the critical path, one pending job per thread.
+
+    schedule() submits the work to a worker pool and returns immediately, so the turn that
+    triggered condensation can return its reply right away. collect() (or acollect()) is called
+    at the start of the thread's next turn: it waits for the job if it is still running and
+    returns the state update, which the caller commits in a single node return.
+
+    Each job remembers the ids of the messages it was computed from. If any of them are gone
+    by the time the result is collected (the history was edited in the meantime), the result
+    is discarded instead of being applied to a history it no longer matches.
+
+    Pending jobs live in this process only: a thread's next turn must be served by the same
+    process (sticky routing by thread_id) to collect its job. A job that is not collected within
+    ttl seconds, or that is the oldest beyond max_pending threads, is dropped and the history is
+    summarized again when due.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        ttl: Optional[float] = 3600.0,
+        max_pending: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="summarizer"
+        )
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self._clock = clock
+        # thread_id -> (snapshot ids, future, deadline), oldest deadline first
+        self._pending: OrderedDict[
+            str, Tuple[Set[Optional[str]], Future[Update], float]
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def schedule(
+        self,
+        thread_id: str,
+        messages: Sequence[BaseMessage],
+        fn: Callable[..., Update],
+        *args: Any,
+    ) -> bool:
+        """Submit fn(*args) for thread_id, computed from a snapshot of messages.
+
+        Returns False if a job for this thread is already pending.
+        """
+        now = self._clock()
+        with self._lock:
+            _evict_stale(self._pending, now, self.max_pending)
+            if thread_id in self._pending:
+                return False
+            snapshot_ids = {m.id for m in messages}
+            deadline = float("inf") if self.ttl is None else now + self.ttl
+            self._pending[thread_id] = (
+                snapshot_ids,
+                self._executor.submit(fn, *args),
+                deadline,
+            )
+            _evict_stale(self._pending, now, self.max_pending)
+            return True
+
+    def has_pending(self, thread_id: str) -> bool:
+        """Return whether a job is pending (or finished but not yet collected) for thread_id."""
+        with self._lock:
+            _evict_stale(self._pending, self._clock(), self.max_pending)
+            return thread_id in self._pending
+
+    def _pop(
+        self, thread_id: str
+    ) -> Optional[Tuple[Set[Optional[str]], "Future[Update]", float]]:
+        with self._lock:
+            _evict_stale(self._pending, self._clock(), self.max_pending)
+            return self._pending.pop(thread_id, None)
+
+    @staticmethod
+    def _validate(
+        snapshot_ids: Set[Optional[str]],
+        future: "Future[Update]",
+        messages: Sequence[BaseMessage],
+    ) -> Update:
+        try:
+            update = future.result()
+        except Exception:
+            # A failed summary (model error, rate limit) must not fail the turn that collects it
+            logger.exception(
+                "Background summary failed; the history will be summarized again when due."
+            )
+            instrumentation.emit("summary_failed", graph="summarization")
+            return None
+        current_ids = {m.id for m in messages}
+        if not snapshot_ids <= current_ids:
+            logger.info(
+                "Background summary discarded: history changed since it was scheduled."
+            )
+            instrumentation.emit("summary_discarded", graph="summarization")
+            return None
+        return update
+
+    def collect(self, thread_id: str, messages: Sequence[BaseMessage]) -> Update:
+        """Wait for and return the pending update for thread_id, or None.
+
+        messages is the thread's current history, used to check the result still applies.
+        """
+        pending = self._pop(thread_id)
+        if pending is None:
+            return None
+        snapshot_ids, future, _ = pending
+        return self._validate(snapshot_ids, future, messages)
+
+    async def acollect(self, thread_id: str, messages: Sequence[BaseMessage]) -> Update:
+        """Async version of collect; waits without blocking the event loop."""
+        pending = self._pop(thread_id)
+        if pending is None:
+            return None
+        snapshot_ids, future, _ = pending
+        # gather retrieves a failure from the wrapper; _validate reports it
+        await asyncio.gather(asyncio.wrap_future(future), return_exceptions=True)
+        return self._validate(snapshot_ids, future, messages)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool."""
+        self._executor.shutdown(wait=wait)
+
+
+def history_version(
+    messages: Sequence[BaseMessage], summary: Optional[str] = ""
+) -> str:
+    """Return a tag identifying a history: its running summary and message ids, in order.
+
+    Message ids are unique per message and histories only change by appending, removing or
+    replacing messages, so a prefix with the same tag is the same history (an in-place edit
+    that keeps the id is the one change it does not see).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update((summary or "").encode())
+    for message in messages:
+        digest.update(b"\0")
+        digest.update((message.id or "").encode())
+    return digest.hexdigest()
+
+
+class SpeculativeSummarizer:
+    """Prepares a thread's next summary while the thread is idle, one speculation per thread.
+
+    speculate() runs after a reply, when the history is near the summarization threshold: it
+    computes the summary update on a worker pool, tagged with the version of the history it was
+    computed from. take() is called when the next turn arrives. The result is used only if the
+    history it was computed from is still there unchanged (new turns may have been appended);
+    otherwise it is discarded. A speculation that has not finished yet is left running and
+    reported as not ready, so the turn never waits for it unless it asks to (wait=True).
+
+    Like BackgroundSummarizer, speculations are kept in this process for ttl seconds and for at
+    most max_pending threads; the thread's next turn must reach the same process to use one.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        ttl: Optional[float] = 3600.0,
+        max_pending: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="speculative-summarizer"
+        )
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self._clock = clock
+        # thread_id -> (history length, history version, future, deadline), oldest deadline first
+        self._pending: OrderedDict[str, Tuple[int, str, Future[Update], float]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def speculate(
+        self,
+        thread_id: str,
+        messages: Sequence[BaseMessage],
+        summary: Optional[str],
+        fn: Callable[..., Update],
+        *args: Any,
+    ) -> bool:
+        """Submit fn(*args) for thread_id, computed from messages and summary.
+
+        Returns False if a speculation for the same history is already pending; one for an older
+        history is replaced.
+        """
+        version = history_version(messages, summary)
+        now = self._clock()
+        with self._lock:
+            _evict_stale(self._pending, now, self.max_pending)
+            pending = self._pending.get(thread_id)
+            if pending is not None:
+                if pending[1] == version:
+                    return False
+                del self._pending[thread_id]
+                pending[2].cancel()
+            deadline = float("inf") if self.ttl is None else now + self.ttl
+            self._pending[thread_id] = (
+                len(messages),
+                version,
+                self._executor.submit(fn, *args),
+                deadline,
+            )
+            _evict_stale(self._pending, now, self.max_pending)
+            return True
+
+    def has_pending(self, thread_id: str) -> bool:
+        """Return whether a speculation is pending (or finished but not yet taken) for thread_id."""
+        with self._lock:
+            _evict_stale(self._pending, self._clock(), self.max_pending)
+            return thread_id in self._pending
+
+    def discard(self, thread_id: str) -> None:
+        """Drop thread_id's speculation, cancelling it if it has not started."""
+        with self._lock:
+            pending = self._pending.pop(thread_id, None)
+        if pending is not None:
+            pending[2].cancel()
+
+    def _match(
+        self,
+        thread_id: str,
+        messages: Sequence[BaseMessage],
+        summary: Optional[str],
+        wait: bool,
+    ) -> "Optional[Future[Update]]":
+        # Return the future to take the result from, or None (no speculation, discarded or not ready)
+        with self._lock:
+            _evict_stale(self._pending, self._clock(), self.max_pending)
+            pending = self._pending.get(thread_id)
+            if pending is None:
+                return None
+            length, version, future, _ = pending
+            if (
+                len(messages) < length
+                or history_version(messages[:length], summary) != version
+            ):
+                del self._pending[thread_id]
+                future.cancel()
+                logger.info(
+                    "Speculative summary discarded: history changed since it was computed."
+                )
+                instrumentation.emit(
+                    "speculative_summary", graph="summarization", name="discarded"
+                )
+                return None
+            if not wait and not future.done():
+                instrumentation.emit(
+                    "speculative_summary", graph="summarization", name="not_ready"
+                )
+                return None
+            del self._pending[thread_id]
+            return future
+
+    def _result(self, future: "Future[Update]") -> Update:
+        try:
+            update = future.result()
+        except Exception:
+            logger.exception(
+                "Speculative summary failed; condensing on the next threshold crossing instead."
+            )
+            return None
+        instrumentation.emit(
+            "speculative_summary", graph="summarization", name="applied"
+        )
+        return update
+
+    def take(
+        self,
+        thread_id: str,
+        messages: Sequence[BaseMessage],
+        summary: Optional[str] = "",
+        wait: bool = False,
+    ) -> Update:
+        """Return the speculative update for thread_id if it still applies to messages and summary.
+
+        Returns None when there is none, when it was discarded, or (without wait) while it is
+        still running.
+        """
+        future = self._match(thread_id, messages, summary, wait)
+        return None if future is None else self._result(future)
+
+    async def atake(
+        self,
+        thread_id: str,
+        messages: Sequence[BaseMessage],
+        summary: Optional[str] = "",
+        wait: bool = False,
+    ) -> Update:
+        """Async version of take; waits without blocking the event loop."""
+        future = self._match(thread_id, messages, summary, wait)
+        if future is None:
+            return None
+        # gather retrieves a failure from the wrapper; _result reports it
+        await asyncio.gather(asyncio.wrap_future(future), return_exceptions=True)
+        return self._result(future)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool."""
+        self._executor.shutdown(wait=wait)
@@ -1,110 +1,670 @@
-from typing import Annotated, Sequence, TypedDict, Literal
-from langchain_core.messages import BaseMessage, ToolMessage, SystemMessage, AIMessage, HumanMessage
-from langgraph.graph import StateGraph, END
-from langchain_core.runnables import RunnableConfig
-#from langgraph.checkpoint.memory import MemorySaver
-
-from summarization.configuration import llm_with_tools, llm
-from summarization.tools import tools
+import logging
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple, cast
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolCall,
+)
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.graph import END, StateGraph
+
+from condenser_core.checkpoint import get_saver
+from condenser_core.instrumentation import instrumentation
+from condenser_core.prompt import PromptAssembler, PromptView
+from condenser_core.settings import (
+    CHECKPOINT_DB_PATH,
+    EARLY_TOOL_DISPATCH,
+    HOT_SESSIONS_FLUSH_EVERY,
+    HOT_SESSIONS_MAX,
+    HOT_SESSIONS_MAX_BYTES,
+    STREAM_MODEL_OUTPUT,
+    TOOL_CACHE_ENABLED,
+    TOOL_CACHE_MAXSIZE,
+    TOOL_CACHE_TTL_SECONDS,
+    TOOL_MAX_CONCURRENCY,
+    TOOL_TIMEOUT_SECONDS,
+    TOOL_TIMEOUTS,
+)
+from condenser_core.streaming import ainvoke_model, invoke_model
+from condenser_core.token_counter import keep_last_within_budget
+from condenser_core.tool_cache import ToolResultCache
+from condenser_core.tool_executor import ToolExecutor
+from condenser_core.tool_pairs import ToolPairIndex, ToolPairIndexCache
+from summarization.background import BackgroundSummarizer, SpeculativeSummarizer
+from summarization.configuration import (
+    agent_tools,
+    blob_store,
+    llm,
+    llm_with_tools,
+    token_counter,
+)
+from summarization.state import (
+    AgentState,  # Ensure AgentState is imported from state.py
+)
+from summarization.summarizer import (
+    HierarchicalSummarizer,
+    asummarize_messages,
+    aupdate_summary,
+    get_summarizer,
+    summarize_messages,
+    update_summary,
+)
 from summarization.utils import messages_to_str
-from summarization.summarizer import summarize_messages
-from summarization.state import AgentState # Ensure AgentState is imported from state.py
 
-import json
+# Node timings, summarizer latency and condensation stats are reported to condenser_core.instrumentation
+GRAPH_NAME = "summarization"
+logger = logging.getLogger(__name__)
+
+# (messages to summarize, recent messages kept verbatim, transcript of the former)
+SummaryPlan = Tuple[Sequence[BaseMessage], Sequence[BaseMessage], str]
+
 
 # === Parameters for summarization logic ===
-MAX_MESSAGES_BEFORE_SUMMARY = 4      # When to summarize
-NUM_RECENT_FOR_CONTEXT = 2           # Recent messages to keep in detail
-SUMMARY_MSG_PREFIX = "Summary of previous conversation: " # For identifying summary messages
+# Token watermarks (hysteresis): condense when the history (summary + messages) goes over the high
+# watermark and bring it down to the low watermark, keeping recent messages verbatim up to
+# RECENT_TOKENS_BUDGET. Set SUMMARY_HIGH_WATERMARK_TOKENS to None to use the message-count trigger.
+SUMMARY_HIGH_WATERMARK_TOKENS = 1000
+SUMMARY_LOW_WATERMARK_TOKENS = 500
+RECENT_TOKENS_BUDGET = 300
+# The recent budget shrinks as the summary grows, but never below RECENT_TOKENS_FLOOR, so a long summary
+# cannot make every turn summarize everything. A rolling summary longer than SUMMARY_MAX_TOKENS is
+# condensed again (one more summarizer call) so that summary plus floor stay under the low watermark.
+RECENT_TOKENS_FLOOR = 150
+SUMMARY_MAX_TOKENS = 350
+MAX_MESSAGES_BEFORE_SUMMARY = 4  # When to summarize (message-count trigger)
+NUM_RECENT_FOR_CONTEXT = 2  # Recent messages to keep in detail (message-count trigger)
+SUMMARY_MSG_PREFIX = (
+    "Summary of previous conversation: "  # For identifying summary messages
+)
+# "rolling": keep the running summary in state["summary"] and fold in only the messages added since
+#            the last summary (summarizer input stays bounded).
+# "full":    re-summarize the whole prefix, including the previous summary message.
+SUMMARY_MODE = "rolling"
+# "stuff": one prompt holds the whole transcript.
+# "map_reduce": split long transcripts into MAP_REDUCE_CHUNK_TOKENS chunks, summarize them with at most
+#               MAP_REDUCE_MAX_CONCURRENCY calls in flight, then reduce the partial summaries.
+SUMMARIZER_STRATEGY = "stuff"
+MAP_REDUCE_CHUNK_TOKENS = 2000
+MAP_REDUCE_MAX_CONCURRENCY = 4
+# When True, the turn that triggers summarization returns its reply right away and the summary is
+# computed by a worker pool; it is committed at the start of the thread's next turn.
+# Requires a thread_id in the config (i.e. a checkpointer); without one summarization runs inline.
+# Pending summaries are held in this process, so with several server processes a thread's turns must
+# be routed to the same process (sticky by thread_id); elsewhere the summary is just computed again.
+SUMMARIZE_IN_BACKGROUND = False
+BACKGROUND_SUMMARY_WORKERS = 4
+# A background or speculative summary not used within this many seconds is dropped, and at most
+# PENDING_SUMMARIES_MAX threads hold one (the oldest is dropped first), so idle threads free their memory.
+PENDING_SUMMARY_TTL_SECONDS = 3600.0
+PENDING_SUMMARIES_MAX = 10_000
+# When True, a reply that leaves the history at SPECULATIVE_SUMMARY_RATIO or more of the summarization
+# threshold (the high watermark, or MAX_MESSAGES_BEFORE_SUMMARY) starts computing the next summary while
+# the thread is idle. The next turn applies it before calling the model if the history it was computed
+# from is unchanged, and discards it otherwise. Requires a thread_id in the config (i.e. a checkpointer).
+SPECULATIVE_SUMMARY = False
+SPECULATIVE_SUMMARY_RATIO = 0.8
+SPECULATIVE_SUMMARY_WORKERS = 2
+
+# === Tool lookup and concurrent execution ===
+tool_cache = (
+    ToolResultCache(maxsize=TOOL_CACHE_MAXSIZE, ttl=TOOL_CACHE_TTL_SECONDS)
+    if TOOL_CACHE_ENABLED
+    else None
+)
+tool_executor = ToolExecutor(
+    agent_tools,
+    max_concurrency=TOOL_MAX_CONCURRENCY,
+    timeout=TOOL_TIMEOUT_SECONDS,
+    timeouts=TOOL_TIMEOUTS,
+    cache=tool_cache,
+    blob_store=blob_store,
+)
 
-# === State Definition (inc. summary) ===
-class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], ...]  # reduce with add_messages
 
-# Set up the message reducer for LangGraph
-from langgraph.graph.message import add_messages
-AgentState.__annotations__["messages"] = Annotated[Sequence[BaseMessage], add_messages]
+def _model_call_options() -> Dict[str, Any]:
+    # Streaming and early tool dispatch settings for the agent node (see condenser_core.streaming)
+    return {
+        "stream": STREAM_MODEL_OUTPUT,
+        "executor": tool_executor if EARLY_TOOL_DISPATCH else None,
+        "graph": GRAPH_NAME,
+    }
+
+
+background_summarizer = BackgroundSummarizer(
+    max_workers=BACKGROUND_SUMMARY_WORKERS,
+    ttl=PENDING_SUMMARY_TTL_SECONDS,
+    max_pending=PENDING_SUMMARIES_MAX,
+)
+speculative_summarizer = SpeculativeSummarizer(
+    max_workers=SPECULATIVE_SUMMARY_WORKERS,
+    ttl=PENDING_SUMMARY_TTL_SECONDS,
+    max_pending=PENDING_SUMMARIES_MAX,
+)
+
+# Per-thread tool call/result index, so the summary split never orphans a tool message
+pair_indexes = ToolPairIndexCache()
+
+# System prompt built once; summary messages are built once per summary text
+prompt_assembler = PromptAssembler(
+    "You are a helpful AI assistant, please respond to the user's query to the best of your ability!",
+    summary_prefix=SUMMARY_MSG_PREFIX,
+)
 
-# === Tool lookup helper ===
-tools_by_name = {tool.name: tool for tool in tools}
 
 # === Node: Summarize Conversation (Renamed from summarize_messages_node) ===
-def summarize_conversation_node(state: AgentState) -> dict:
-    print("--- Node: Summarize Conversation ---")
+@instrumentation.node(GRAPH_NAME, "summarize_conversation")
+def summarize_conversation_node(
+    state: AgentState, config: Optional[RunnableConfig] = None
+) -> Dict[str, Any]:
     messages = state["messages"]
-    messages_to_summarize = messages[:-NUM_RECENT_FOR_CONTEXT]
-    recent_messages = messages[-NUM_RECENT_FOR_CONTEXT:]
-    history_text = messages_to_str(messages_to_summarize)
-    print(f"Summarizing {len(messages_to_summarize)} messages. Keeping {len(recent_messages)} recent messages.")
-    new_summary_text = summarize_messages(history_text, model=llm)
-    summary_message = SystemMessage(content=f"{SUMMARY_MSG_PREFIX}{new_summary_text}")
-    print(f"New summary created: {summary_message.content[:100]}...")
-    updated_messages = [summary_message] + recent_messages
-    return {"messages": updated_messages}
+    thread_id = _thread_id(config)
+    if SPECULATIVE_SUMMARY and thread_id is not None:
+        # A speculation that still applies is at least partly done; finishing it beats starting over
+        update = speculative_summarizer.take(
+            thread_id, messages, state.get("summary", ""), wait=True
+        )
+        if update is not None:
+            return update
+    return build_summary_update(
+        messages, state.get("summary", ""), pair_indexes.get(config, messages)
+    )
+
+
+@instrumentation.node(GRAPH_NAME, "summarize_conversation")
+async def asummarize_conversation_node(
+    state: AgentState, config: Optional[RunnableConfig] = None
+) -> Dict[str, Any]:
+    messages = state["messages"]
+    thread_id = _thread_id(config)
+    if SPECULATIVE_SUMMARY and thread_id is not None:
+        update = await speculative_summarizer.atake(
+            thread_id, messages, state.get("summary", ""), wait=True
+        )
+        if update is not None:
+            return update
+    return await abuild_summary_update(
+        messages, state.get("summary", ""), pair_indexes.get(config, messages)
+    )
+
+
+def _thread_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def summary_tokens(summary: Optional[str]) -> int:
+    """Estimated tokens the running summary adds to the prompt."""
+    if not summary:
+        return 0
+    return token_counter.approximate(prompt_assembler.summary_message(summary))
+
+
+def history_tokens(messages: Sequence[BaseMessage], summary: str = "") -> int:
+    """Estimated tokens of the condensable history: the running summary plus the messages."""
+    return summary_tokens(summary) + sum(token_counter.count_batch(messages))
+
+
+def needs_summary(messages: Sequence[BaseMessage], summary: str = "") -> bool:
+    """Whether the history is over the summarization threshold (the test route_from_conversation_node applies)."""
+    if SUMMARY_HIGH_WATERMARK_TOKENS is not None:
+        return history_tokens(messages, summary) > SUMMARY_HIGH_WATERMARK_TOKENS
+    return len(messages) > MAX_MESSAGES_BEFORE_SUMMARY
+
+
+def split_for_summary(
+    messages: Sequence[BaseMessage],
+    summary: str = "",
+    pairs: Optional[ToolPairIndex] = None,
+) -> int:
+    """Index of the first message kept verbatim; everything before it gets summarized.
+
+    The split never separates a tool call from its results; `pairs` is the thread's
+    ToolPairIndex for `messages` (built on the spot when not given).
+    """
+    if SUMMARY_HIGH_WATERMARK_TOKENS is None:
+        split = max(len(messages) - NUM_RECENT_FOR_CONTEXT, 0)
+    else:
+        # Keep recent messages up to the recent budget, leaving room for the summary under the low watermark
+        budget = min(
+            RECENT_TOKENS_BUDGET, SUMMARY_LOW_WATERMARK_TOKENS - summary_tokens(summary)
+        )
+        split = keep_last_within_budget(
+            messages,
+            max(budget, min(RECENT_TOKENS_FLOOR, RECENT_TOKENS_BUDGET)),
+            token_counter,
+        )
+    if pairs is None:
+        pairs = ToolPairIndex(messages)
+    return pairs.safe_cut(split)
+
+
+def hierarchical_summarizer() -> HierarchicalSummarizer:
+    """Map-reduce summarizer over the cached Summarizer for the configured model."""
+    return HierarchicalSummarizer(
+        get_summarizer(llm),
+        token_counter,
+        chunk_tokens=MAP_REDUCE_CHUNK_TOKENS,
+        max_concurrency=MAP_REDUCE_MAX_CONCURRENCY,
+    )
+
+
+def _plan_summary(
+    messages: Sequence[BaseMessage],
+    summary: str = "",
+    pairs: Optional[ToolPairIndex] = None,
+) -> Optional[SummaryPlan]:
+    """Split the history into (messages_to_summarize, recent_messages, transcript), or None if nothing to do."""
+    split = split_for_summary(messages, summary, pairs)
+    if split == 0:
+        logger.debug("Nothing old enough to summarize.")
+        return None
+    messages_to_summarize = messages[:split]
+    recent_messages = messages[split:]
+    logger.debug(
+        "Summarizing %d messages; keeping %d recent messages.",
+        len(messages_to_summarize),
+        len(recent_messages),
+    )
+    return (
+        messages_to_summarize,
+        recent_messages,
+        messages_to_str(messages_to_summarize),
+    )
+
+
+def _report_condense(plan: SummaryPlan, summary: str, update: Dict[str, Any]) -> None:
+    """Emit a condense event for a summary update (only called when instrumentation is on)."""
+    messages_to_summarize, recent_messages, _ = plan
+    if SUMMARY_MODE == "rolling":
+        messages_after = list(recent_messages)
+        tokens_after = history_tokens(messages_after, update["summary"])
+    else:
+        messages_after = [update["messages"][0]] + list(recent_messages)
+        tokens_after = history_tokens(messages_after)
+    instrumentation.emit(
+        "condense",
+        graph=GRAPH_NAME,
+        name="summarize",
+        messages_before=len(messages_to_summarize) + len(recent_messages),
+        messages_after=len(messages_after),
+        dropped=len(messages_to_summarize),
+        tokens_before=history_tokens(
+            list(messages_to_summarize) + list(recent_messages), summary
+        ),
+        tokens_after=tokens_after,
+    )
+
+
+def _remove(messages: Sequence[BaseMessage]) -> List[RemoveMessage]:
+    # Messages in the state always have ids: add_messages assigns one to every message it adds
+    return [RemoveMessage(id=cast(str, m.id)) for m in messages]
+
+
+def _apply_summary(
+    plan: SummaryPlan, new_summary_text: str, summary: str = ""
+) -> Dict[str, Any]:
+    """Turn a new summary into the state update for the configured SUMMARY_MODE."""
+    messages_to_summarize, recent_messages, _ = plan
+    if SUMMARY_MODE == "rolling":
+        # Fold only the new messages into the running summary and drop them from the history
+        update: Dict[str, Any] = {
+            "summary": new_summary_text,
+            "messages": _remove(messages_to_summarize),
+        }
+    else:
+        # The summary message takes the id (so add_messages keeps the place) of the first summarized
+        # message, which is the previous summary after the first condensation; the rest is removed
+        first, *rest = messages_to_summarize
+        summary_message = SystemMessage(
+            content=f"{SUMMARY_MSG_PREFIX}{new_summary_text}", id=first.id
+        )
+        update = {"messages": [summary_message, *_remove(rest)]}
+    if instrumentation.enabled:
+        _report_condense(plan, summary, update)
+    return update
+
+
+def build_summary_update(
+    messages: Sequence[BaseMessage],
+    summary: str = "",
+    pairs: Optional[ToolPairIndex] = None,
+) -> Dict[str, Any]:
+    """Compute the state update that condenses `messages` (pure; safe to run in a worker)."""
+    plan = _plan_summary(messages, summary, pairs)
+    if plan is None:
+        return {}
+    history_text = plan[2]
+    with instrumentation.timed(
+        "summarize", graph=GRAPH_NAME, name=SUMMARIZER_STRATEGY, messages=len(plan[0])
+    ):
+        if SUMMARY_MODE == "rolling":
+            if SUMMARIZER_STRATEGY == "map_reduce":
+                new_summary_text = hierarchical_summarizer().update(
+                    summary, history_text
+                )
+            else:
+                new_summary_text = update_summary(summary, history_text, model=llm)
+            if summary_tokens(new_summary_text) > SUMMARY_MAX_TOKENS:
+                new_summary_text = summarize_messages(new_summary_text, model=llm)
+        elif SUMMARIZER_STRATEGY == "map_reduce":
+            new_summary_text = hierarchical_summarizer().summarize(history_text)
+        else:
+            new_summary_text = summarize_messages(history_text, model=llm)
+    return _apply_summary(plan, new_summary_text, summary)
+
+
+async def abuild_summary_update(
+    messages: Sequence[BaseMessage],
+    summary: str = "",
+    pairs: Optional[ToolPairIndex] = None,
+) -> Dict[str, Any]:
+    """Async version of build_summary_update."""
+    plan = _plan_summary(messages, summary, pairs)
+    if plan is None:
+        return {}
+    history_text = plan[2]
+    with instrumentation.timed(
+        "summarize", graph=GRAPH_NAME, name=SUMMARIZER_STRATEGY, messages=len(plan[0])
+    ):
+        if SUMMARY_MODE == "rolling":
+            if SUMMARIZER_STRATEGY == "map_reduce":
+                new_summary_text = await hierarchical_summarizer().aupdate(
+                    summary, history_text
+                )
+            else:
+                new_summary_text = await aupdate_summary(
+                    summary, history_text, model=llm
+                )
+            if summary_tokens(new_summary_text) > SUMMARY_MAX_TOKENS:
+                new_summary_text = await asummarize_messages(
+                    new_summary_text, model=llm
+                )
+        elif SUMMARIZER_STRATEGY == "map_reduce":
+            new_summary_text = await hierarchical_summarizer().asummarize(history_text)
+        else:
+            new_summary_text = await asummarize_messages(history_text, model=llm)
+    return _apply_summary(plan, new_summary_text, summary)
+
+
+# === Node: Schedule Summary (background mode) ===
+def _schedule_summary(state: AgentState, thread_id: str) -> Dict[str, Any]:
+    messages = list(state["messages"])
+    if background_summarizer.schedule(
+        thread_id, messages, build_summary_update, messages, state.get("summary", "")
+    ):
+        logger.debug("Summary scheduled in background for thread %s.", thread_id)
+    else:
+        logger.debug("Summary already pending for thread %s.", thread_id)
+    return {}
+
+
+@instrumentation.node(GRAPH_NAME, "summarize_conversation")
+def schedule_summary_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    thread_id = _thread_id(config)
+    if thread_id is None:
+        logger.debug("No thread_id in config; summarizing inline.")
+        messages = state["messages"]
+        return build_summary_update(
+            messages, state.get("summary", ""), pair_indexes.get(config, messages)
+        )
+    return _schedule_summary(state, thread_id)
+
+
+# === Node: Apply Pending Summary (background mode, runs first on every turn) ===
+@instrumentation.node(GRAPH_NAME, "apply_pending_summary")
+def apply_pending_summary_node(
+    state: AgentState, config: RunnableConfig
+) -> Dict[str, Any]:
+    thread_id = _thread_id(config)
+    if thread_id is None:
+        return {}
+    update = background_summarizer.collect(thread_id, state.get("messages", []))
+    if update is None:
+        return {}
+    logger.debug("Applying pending summary for thread %s.", thread_id)
+    return update
+
+
+@instrumentation.node(GRAPH_NAME, "summarize_conversation")
+async def aschedule_summary_node(
+    state: AgentState, config: RunnableConfig
+) -> Dict[str, Any]:
+    thread_id = _thread_id(config)
+    if thread_id is None:
+        logger.debug("No thread_id in config; summarizing inline.")
+        messages = state["messages"]
+        return await abuild_summary_update(
+            messages, state.get("summary", ""), pair_indexes.get(config, messages)
+        )
+    # Scheduling only submits to the worker pool, so it does not block the event loop
+    return _schedule_summary(state, thread_id)
+
+
+@instrumentation.node(GRAPH_NAME, "apply_pending_summary")
+async def aapply_pending_summary_node(
+    state: AgentState, config: RunnableConfig
+) -> Dict[str, Any]:
+    thread_id = _thread_id(config)
+    if thread_id is None:
+        return {}
+    update = await background_summarizer.acollect(thread_id, state.get("messages", []))
+    if update is None:
+        return {}
+    logger.debug("Applying pending summary for thread %s.", thread_id)
+    return update
+
+
+# === Node: Speculate Summary (speculative mode, after a reply that ends the turn) ===
+def _speculate_summary(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    thread_id = _thread_id(config)
+    if thread_id is None:
+        return {}
+    messages = list(state["messages"])
+    summary = state.get("summary", "")
+    # The worker builds its own tool pair index; the thread's cached one keeps serving its turns
+    if speculative_summarizer.speculate(
+        thread_id, messages, summary, build_summary_update, messages, summary
+    ):
+        logger.debug("Speculative summary started for thread %s.", thread_id)
+    return {}
+
+
+@instrumentation.node(GRAPH_NAME, "speculate_summary")
+def speculate_summary_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    return _speculate_summary(state, config)
+
+
+@instrumentation.node(GRAPH_NAME, "speculate_summary")
+async def aspeculate_summary_node(
+    state: AgentState, config: RunnableConfig
+) -> Dict[str, Any]:
+    # Speculating only submits to the worker pool, so it does not block the event loop
+    return _speculate_summary(state, config)
+
+
+# === Node: Apply Speculative Summary (speculative mode, runs first on every turn) ===
+def _apply_speculative_summary(
+    state: AgentState, config: RunnableConfig
+) -> Dict[str, Any]:
+    thread_id = _thread_id(config)
+    if thread_id is None or not speculative_summarizer.has_pending(thread_id):
+        return {}
+    messages = state.get("messages", [])
+    summary = state.get("summary", "")
+    # Summarizing below the threshold would condense more often than configured; keep it for later
+    if not needs_summary(messages, summary):
+        return {}
+    update = speculative_summarizer.take(thread_id, messages, summary)
+    if update is None:
+        return {}
+    logger.debug("Applying speculative summary for thread %s.", thread_id)
+    return update
+
+
+@instrumentation.node(GRAPH_NAME, "apply_speculative_summary")
+def apply_speculative_summary_node(
+    state: AgentState, config: RunnableConfig
+) -> Dict[str, Any]:
+    return _apply_speculative_summary(state, config)
+
+
+@instrumentation.node(GRAPH_NAME, "apply_speculative_summary")
+async def aapply_speculative_summary_node(
+    state: AgentState, config: RunnableConfig
+) -> Dict[str, Any]:
+    # Never waits: an unfinished speculation stays pending for a later turn
+    return _apply_speculative_summary(state, config)
+
 
 # === Node: Conversation (Main LLM Agent Call - Renamed from agent_node) ===
-def conversation_node(state: AgentState, config: RunnableConfig) -> dict:
-    print("--- Node: Conversation (LLM Call) ---")
-    messages_for_llm = [
-        SystemMessage(content="You are a helpful AI assistant, please respond to the user's query to the best of your ability!")
-    ] + state["messages"]
-    print(f"Calling LLM with {len(messages_for_llm)} messages. First state message: {state['messages'][0].content[:60] if state['messages'] else '[No messages yet]'}...")
-    response = llm_with_tools.invoke(messages_for_llm, config)
-    print(f"LLM Response: {response.content[:80]}...")
+def _messages_for_llm(state: AgentState) -> PromptView:
+    # System prompt, running summary and history as one view; nothing is copied per call
+    return prompt_assembler.assemble(state["messages"], state.get("summary"))
+
+
+@instrumentation.node(GRAPH_NAME, "conversation")
+def conversation_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    response = invoke_model(
+        llm_with_tools, _messages_for_llm(state), config, **_model_call_options()
+    )
     return {"messages": [response]}
 
+
+@instrumentation.node(GRAPH_NAME, "conversation")
+async def aconversation_node(
+    state: AgentState, config: RunnableConfig
+) -> Dict[str, Any]:
+    response = await ainvoke_model(
+        llm_with_tools, _messages_for_llm(state), config, **_model_call_options()
+    )
+    return {"messages": [response]}
+
+
 # === Node: Tools Execution (Renamed from tool_node) ===
-def tools_node(state: AgentState) -> dict:
-    print("--- Node: Tools Execution ---")
-    outputs = []
+def _valid_tool_calls(state: AgentState) -> List[ToolCall]:
     last_message = state["messages"][-1]
     if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
-        print("Tools Node: No tool calls in last AI message. Should not happen if routed here.")
-        return {}
-    print(f"Tools Node: Processing {len(last_message.tool_calls)} tool call(s).")
+        logger.warning(
+            "Tools node: no tool calls in last AI message; should not happen if routed here."
+        )
+        return []
+    tool_calls = []
     for tool_call in last_message.tool_calls:
-        tool_name = tool_call.get("name")
-        tool_args = tool_call.get("args")
-        tool_call_id = tool_call.get("id")
-        if not all([tool_name, tool_call_id]):
-            print(f"Tools Node: Invalid tool call structure: {tool_call}, skipping.")
+        if not all([tool_call.get("name"), tool_call.get("id")]):
+            logger.warning(
+                "Tools node: invalid tool call structure %r, skipping.", tool_call
+            )
             continue
-        print(f"Tools Node: Invoking tool '{tool_name}' with args: {tool_args}")
-        try:
-            tool_result = tools_by_name[tool_name].invoke(tool_args)
-            outputs.append(ToolMessage(content=json.dumps(tool_result), name=tool_name, tool_call_id=tool_call_id))
-            print(f"Tools Node: Tool '{tool_name}' success.")
-        except Exception as e:
-            print(f"Tools Node: Tool '{tool_name}' error: {e}")
-            outputs.append(ToolMessage(content=json.dumps({"error": str(e)}), name=tool_name, tool_call_id=tool_call_id))
+        tool_calls.append(tool_call)
+    return tool_calls
+
+
+@instrumentation.node(GRAPH_NAME, "tools")
+def tools_node(state: AgentState) -> Dict[str, Any]:
+    tool_calls = _valid_tool_calls(state)
+    if not tool_calls:
+        return {}
+    # Independent calls run concurrently; errors and timeouts come back as error ToolMessages
+    outputs = tool_executor.run(tool_calls)
     return {"messages": outputs}
 
+
+@instrumentation.node(GRAPH_NAME, "tools")
+async def atools_node(state: AgentState) -> Dict[str, Any]:
+    tool_calls = _valid_tool_calls(state)
+    if not tool_calls:
+        return {}
+    outputs = await tool_executor.arun(tool_calls)
+    return {"messages": outputs}
+
+
 # === Conditional Edge: Route after Conversation Node ===
-def route_from_conversation_node(state: AgentState) -> Literal["tools", "summarize_conversation", END]:
-    print("--- Condition: Route from Conversation Node ---")
+def _end_of_turn(fill: float) -> Literal["speculate_summary", "__end__"]:
+    """Route for a reply that ends the turn; fill is the history's fraction of the summarization threshold."""
+    if SPECULATIVE_SUMMARY and fill >= SPECULATIVE_SUMMARY_RATIO:
+        return "speculate_summary"
+    return "__end__"
+
+
+def route_from_conversation_node(
+    state: AgentState,
+) -> Literal["tools", "summarize_conversation", "speculate_summary", "__end__"]:
     last_message = state["messages"][-1]
-    if isinstance(last_message, AIMessage) and getattr(last_message, "tool_calls", None):
-        print("Decision: Agent requested tool calls. Routing to Tools node.")
+    if isinstance(last_message, AIMessage) and getattr(
+        last_message, "tool_calls", None
+    ):
         return "tools"
-    
-    # If no tools, check for summarization based on message count
+
+    # If no tools, check the high watermark, if configured
+    if SUMMARY_HIGH_WATERMARK_TOKENS is not None:
+        tokens = history_tokens(state["messages"], state.get("summary", ""))
+        if tokens > SUMMARY_HIGH_WATERMARK_TOKENS:
+            logger.debug(
+                "History tokens (%d) > high watermark (%d); routing to summarize.",
+                tokens,
+                SUMMARY_HIGH_WATERMARK_TOKENS,
+            )
+            return "summarize_conversation"
+        return _end_of_turn(tokens / SUMMARY_HIGH_WATERMARK_TOKENS)
+
+    # Otherwise check for summarization based on message count
     if len(state["messages"]) > MAX_MESSAGES_BEFORE_SUMMARY:
-        print(f"Decision: No tools. Message count ({len(state['messages'])}) > MAX_MESSAGES ({MAX_MESSAGES_BEFORE_SUMMARY}). Routing to Summarize.")
+        logger.debug(
+            "Message count (%d) > MAX_MESSAGES (%d); routing to summarize.",
+            len(state["messages"]),
+            MAX_MESSAGES_BEFORE_SUMMARY,
+        )
         return "summarize_conversation"
-    
-    print(f"Decision: No tools. Message count ({len(state['messages'])}) <= MAX_MESSAGES ({MAX_MESSAGES_BEFORE_SUMMARY}). Routing to END.")
-    return END
+
+    return _end_of_turn(len(state["messages"]) / MAX_MESSAGES_BEFORE_SUMMARY)
+
 
 # === Build the LangGraph workflow ===
 workflow = StateGraph(AgentState)
 
-# Add nodes
-workflow.add_node("conversation", conversation_node)
-workflow.add_node("tools", tools_node)
-workflow.add_node("summarize_conversation", summarize_conversation_node)
-
+# Add nodes (each with a native async implementation used by ainvoke/astream)
+workflow.add_node(
+    "conversation", RunnableLambda(conversation_node, afunc=aconversation_node)
+)
+workflow.add_node("tools", RunnableLambda(tools_node, afunc=atools_node))
+# Nodes that run at the start of every turn, before the model call
+entry_nodes: List[str] = []
+if SPECULATIVE_SUMMARY:
+    workflow.add_node(
+        "speculate_summary",
+        RunnableLambda(speculate_summary_node, afunc=aspeculate_summary_node),
+    )
+    workflow.add_node(
+        "apply_speculative_summary",
+        RunnableLambda(
+            apply_speculative_summary_node, afunc=aapply_speculative_summary_node
+        ),
+    )
+    workflow.add_edge("speculate_summary", END)
+    # Apply a finished speculative summary that still matches the history
+    entry_nodes.append("apply_speculative_summary")
+if SUMMARIZE_IN_BACKGROUND:
+    workflow.add_node(
+        "summarize_conversation",
+        RunnableLambda(schedule_summary_node, afunc=aschedule_summary_node),
+    )
+    workflow.add_node(
+        "apply_pending_summary",
+        RunnableLambda(apply_pending_summary_node, afunc=aapply_pending_summary_node),
+    )
+    # Commit any finished background summary before the new turn reaches the model
+    entry_nodes.append("apply_pending_summary")
+else:
+    workflow.add_node(
+        "summarize_conversation",
+        RunnableLambda(summarize_conversation_node, afunc=asummarize_conversation_node),
+    )
 # Set entry point
-workflow.set_entry_point("conversation")
+workflow.set_entry_point((entry_nodes + ["conversation"])[0])
+for node, next_node in zip(entry_nodes, entry_nodes[1:] + ["conversation"]):
+    workflow.add_edge(node, next_node)
 
 # Define edges
 workflow.add_conditional_edges(
@@ -112,29 +672,40 @@ workflow.add_conditional_edges(
     route_from_conversation_node,
     {
         "tools": "tools",
-        "summarize_conversation": "summarize_conversation", # Route directly to summarize_conversation
-        END: END  # Route directly to END
-    }
+        "summarize_conversation": "summarize_conversation",  # Route directly to summarize_conversation
+        **({"speculate_summary": "speculate_summary"} if SPECULATIVE_SUMMARY else {}),
+        END: END,  # Route directly to END
+    },
 )
 
-workflow.add_edge("tools", "conversation") # Loop back to conversation after tools
+workflow.add_edge("tools", "conversation")  # Loop back to conversation after tools
 
 workflow.add_edge("summarize_conversation", END)
 
-# Add checkpointer
-#memory = MemorySaver()
-graph = workflow.compile()
-
-print("Graph compiled with simplified structure and checkpointer.")
+# Compiled at import: the chat models are LazyChatModel placeholders, so compiling builds no model
+# and imports no provider SDK; the checkpointer opens its database on first use. The package
+# re-exports `graph`, as langgraph.json does.
+checkpointer = (
+    get_saver(
+        CHECKPOINT_DB_PATH,
+        HOT_SESSIONS_MAX,
+        HOT_SESSIONS_MAX_BYTES,
+        HOT_SESSIONS_FLUSH_EVERY,
+    )
+    if CHECKPOINT_DB_PATH
+    else None
+)
+graph = workflow.compile(checkpointer=checkpointer)
+logger.debug("Graph compiled with simplified structure and checkpointer.")
 
 # Example of how to run (for user reference, not executed by assistant):
 # async def main_run():
 #     config = {"configurable": {"thread_id": "user_123"}} # thread_id is important for checkpointer
-#     inputs = [ 
+#     inputs = [
 #         {"messages": [HumanMessage(content="Hi there!")]},
-#         {"messages": [HumanMessage(content="What is the weather like in San Francisco?")]}, 
+#         {"messages": [HumanMessage(content="What is the weather like in San Francisco?")]},
 #         {"messages": [HumanMessage(content="Thanks!")]},
-#         {"messages": [HumanMessage(content="Tell me another fact about weather.")]}, 
+#         {"messages": [HumanMessage(content="Tell me another fact about weather.")]},
 #         {"messages": [HumanMessage(content="Okay, one more: how about New York weather?")]},
 #         {"messages": [HumanMessage(content="Great, that is all for now.")]},
 #     ]
@@ -146,7 +717,7 @@ print("Graph compiled with simplified structure and checkpointer.")
 #         # The input to invoke should be the new message(s) for this turn.
 #         # However, our AgentState is defined as `messages: Annotated[Sequence[BaseMessage], add_messages]`
 #         # So, the graph expects the full current list or just new additions which add_messages handles.
-#         # For simplicity in this example, let's pass only the new message for this turn as input, 
+#         # For simplicity in this example, let's pass only the new message for this turn as input,
 #         # assuming `add_messages` handles accumulation based on checkpointed state.
 #         result = graph.invoke(turn_input, config=config)
 #         print(f"Turn {i+1} complete. Final state messages: {len(result['messages'])}")
@@ -154,4 +725,4 @@ print("Graph compiled with simplified structure and checkpointer.")
 #             print(f"  Msg {msg_idx} ID: {msg.id} ({type(msg).__name__}) {msg.content[:70]}...")
 # if __name__ == "__main__":
 #     import asyncio
-#     asyncio.run(main_run())
\ No newline at end of file
+#     asyncio.run(main_run())
@@ -3,3 +3,30 @@
 SYSTEM_PROMPT = """You are a helpful AI assistant.
 
 System time: {system_time}"""
+
+ROLLING_SUMMARY_PROMPT = """Progressively summarize the conversation, adding onto the previous summary and returning a new summary.
+
+Previous summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:"""
+
+SUMMARY_PROMPT = """Write a concise summary of the following:
+
+
+"{text}"
+
+
+CONCISE SUMMARY:"""
+
+COMBINE_SUMMARIES_PROMPT = """The following are summaries of consecutive parts of one conversation, in order:
+
+
+"{text}"
+
+
+Combine them into a single concise summary of the whole conversation.
+CONCISE SUMMARY:"""
@@ -1,8 +1,12 @@
 from typing import Annotated, Sequence, TypedDict
+
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 
-class AgentState(TypedDict):
+
+class AgentState(TypedDict, total=False):
     """The state of the agent."""
+
     messages: Annotated[Sequence[BaseMessage], add_messages]
-    
\ No newline at end of file
+    # Running summary of the messages already folded out of `messages` (rolling mode).
+    summary: str
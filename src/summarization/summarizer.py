@@ -1,13 +1,285 @@
-from langchain.chains.summarize import load_summarize_chain
-from langchain.schema import Document
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable
+
+from condenser_core.token_counter import FastTokenCounter
 from summarization.configuration import llm  # USE YOUR GEMINI MODEL
+from summarization.prompts import (
+    COMBINE_SUMMARIES_PROMPT,
+    ROLLING_SUMMARY_PROMPT,
+    SUMMARY_PROMPT,
+)
+
 
-def summarize_messages(messages_text, model=None):
+class Summarizer:
+    """Pre-built summarization chains for one model (sync and async).
+
+    The prompt | model | parser pipelines are built once and reused for every call.
+    By default the prompt is sent to the model directly; use_legacy_chain=True keeps
+    LangChain's "stuff" summarize chain instead (also built once).
     """
-    Summarize a string conversation history using Gemini (via LangChain's summarization chain).
+
+    def __init__(
+        self, model: Runnable[Any, Any], use_legacy_chain: bool = False
+    ) -> None:
+        self.model = model
+        self.use_legacy_chain = use_legacy_chain
+        self._summarize_chain: Runnable[Dict[str, Any], str] = (
+            PromptTemplate.from_template(SUMMARY_PROMPT) | model | StrOutputParser()
+        )
+        self._rolling_chain: Runnable[Dict[str, Any], str] = (
+            PromptTemplate.from_template(ROLLING_SUMMARY_PROMPT)
+            | model
+            | StrOutputParser()
+        )
+        self._combine_chain: Runnable[Dict[str, Any], str] = (
+            PromptTemplate.from_template(COMBINE_SUMMARIES_PROMPT)
+            | model
+            | StrOutputParser()
+        )
+        self._legacy_chain: Optional[Any] = None
+        if use_legacy_chain:
+            from langchain.chains.summarize import load_summarize_chain
+
+            self._legacy_chain = load_summarize_chain(model, chain_type="stuff")  # type: ignore[arg-type]
+
+    def summarize(self, messages_text: str) -> str:
+        """Summarize a conversation transcript."""
+        if self._legacy_chain is not None:
+            from langchain_core.documents import Document
+
+            result = self._legacy_chain.invoke(
+                {"input_documents": [Document(page_content=messages_text)]}
+            )
+            return str(result["output_text"]).strip()
+        return self._summarize_chain.invoke({"text": messages_text}).strip()
+
+    async def asummarize(self, messages_text: str) -> str:
+        """Async version of summarize."""
+        if self._legacy_chain is not None:
+            from langchain_core.documents import Document
+
+            result = await self._legacy_chain.ainvoke(
+                {"input_documents": [Document(page_content=messages_text)]}
+            )
+            return str(result["output_text"]).strip()
+        return (await self._summarize_chain.ainvoke({"text": messages_text})).strip()
+
+    def summarize_batch(
+        self, texts: List[str], max_concurrency: Optional[int] = None
+    ) -> List[str]:
+        """Summarize several transcripts, with at most max_concurrency calls in flight."""
+        results = self._summarize_chain.batch(
+            [{"text": t} for t in texts], config={"max_concurrency": max_concurrency}
+        )
+        return [r.strip() for r in results]
+
+    async def asummarize_batch(
+        self, texts: List[str], max_concurrency: Optional[int] = None
+    ) -> List[str]:
+        """Async version of summarize_batch."""
+        results = await self._summarize_chain.abatch(
+            [{"text": t} for t in texts], config={"max_concurrency": max_concurrency}
+        )
+        return [r.strip() for r in results]
+
+    def combine_batch(
+        self, texts: List[str], max_concurrency: Optional[int] = None
+    ) -> List[str]:
+        """Combine groups of partial summaries (one group per text) into one summary each."""
+        results = self._combine_chain.batch(
+            [{"text": t} for t in texts], config={"max_concurrency": max_concurrency}
+        )
+        return [r.strip() for r in results]
+
+    async def acombine_batch(
+        self, texts: List[str], max_concurrency: Optional[int] = None
+    ) -> List[str]:
+        """Async version of combine_batch."""
+        results = await self._combine_chain.abatch(
+            [{"text": t} for t in texts], config={"max_concurrency": max_concurrency}
+        )
+        return [r.strip() for r in results]
+
+    def update(self, previous_summary: str, new_messages_text: str) -> str:
+        """Fold new conversation lines into an existing summary."""
+        if not previous_summary:
+            return self.summarize(new_messages_text)
+        return self._rolling_chain.invoke(
+            {"summary": previous_summary, "new_lines": new_messages_text}
+        ).strip()
+
+    async def aupdate(self, previous_summary: str, new_messages_text: str) -> str:
+        """Async version of update."""
+        if not previous_summary:
+            return await self.asummarize(new_messages_text)
+        result = await self._rolling_chain.ainvoke(
+            {"summary": previous_summary, "new_lines": new_messages_text}
+        )
+        return result.strip()
+
+
+class HierarchicalSummarizer:
+    """Map-reduce summarization for transcripts too long for one prompt.
+
+    The transcript is split on line boundaries into chunks of at most chunk_tokens, the chunks
+    are summarized concurrently (at most max_concurrency model calls in flight), and the partial
+    summaries are combined. If the combined partials are still over chunk_tokens the reduce step
+    is applied again to groups of partials, so every prompt stays bounded.
+    """
+
+    def __init__(
+        self,
+        summarizer: Summarizer,
+        token_counter: FastTokenCounter,
+        chunk_tokens: int = 2000,
+        max_concurrency: int = 4,
+    ) -> None:
+        self.summarizer = summarizer
+        self.token_counter = token_counter
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
+
+    def split(self, text: str) -> List[str]:
+        """Split text into chunks of at most chunk_tokens, on line boundaries where possible."""
+        max_chars = max(int(self.chunk_tokens * self.token_counter.chars_per_token), 1)
+        chunks: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        for line in text.split("\n"):
+            # Lines longer than a whole chunk are cut into chunk-sized pieces
+            pieces = [
+                line[i : i + max_chars] for i in range(0, len(line), max_chars)
+            ] or [""]
+            for piece in pieces:
+                piece_tokens = self.token_counter.approximate_text(piece) + 1
+                if current and current_tokens + piece_tokens > self.chunk_tokens:
+                    chunks.append("\n".join(current))
+                    current, current_tokens = [], 0
+                current.append(piece)
+                current_tokens += piece_tokens
+        if current:
+            chunks.append("\n".join(current))
+        return chunks
+
+    def summarize(self, messages_text: str) -> str:
+        """Summarize a transcript of any length."""
+        chunks = self.split(messages_text)
+        if len(chunks) == 1:
+            return self.summarizer.summarize(messages_text)
+        partials = self.summarizer.summarize_batch(chunks, self.max_concurrency)
+        while True:
+            groups = self._group(partials)
+            if len(groups) == 1:
+                return self.summarizer.combine_batch(groups)[0]
+            partials = self.summarizer.combine_batch(groups, self.max_concurrency)
+
+    async def asummarize(self, messages_text: str) -> str:
+        """Async version of summarize."""
+        chunks = self.split(messages_text)
+        if len(chunks) == 1:
+            return await self.summarizer.asummarize(messages_text)
+        partials = await self.summarizer.asummarize_batch(chunks, self.max_concurrency)
+        while True:
+            groups = self._group(partials)
+            if len(groups) == 1:
+                return (await self.summarizer.acombine_batch(groups))[0]
+            partials = await self.summarizer.acombine_batch(
+                groups, self.max_concurrency
+            )
+
+    def _group(self, partials: List[str]) -> List[str]:
+        """Group partial summaries into chunk-sized reduce inputs."""
+        groups = self.split("\n\n".join(partials))
+        if len(groups) >= len(partials):
+            # The partials are not shrinking; combine everything at once rather than loop forever
+            return ["\n\n".join(partials)]
+        return groups
+
+    def update(self, previous_summary: str, new_messages_text: str) -> str:
+        """Map-reduce the new lines, then fold the result into the previous summary."""
+        if len(self.split(new_messages_text)) == 1:
+            return self.summarizer.update(previous_summary, new_messages_text)
+        new_summary = self.summarize(new_messages_text)
+        return (
+            self.summarizer.update(previous_summary, new_summary)
+            if previous_summary
+            else new_summary
+        )
+
+    async def aupdate(self, previous_summary: str, new_messages_text: str) -> str:
+        """Async version of update."""
+        if len(self.split(new_messages_text)) == 1:
+            return await self.summarizer.aupdate(previous_summary, new_messages_text)
+        new_summary = await self.asummarize(new_messages_text)
+        return (
+            await self.summarizer.aupdate(previous_summary, new_summary)
+            if previous_summary
+            else new_summary
+        )
+
+
+# One Summarizer per model instance, shared across calls and threads. Chat models are
+# unhashable and each Summarizer holds its model, so this is a small LRU keyed by id()
+# (checked against the model) rather than a weak mapping.
+SUMMARIZER_CACHE_SIZE = 32
+_summarizers: "OrderedDict[int, Summarizer]" = OrderedDict()
+_summarizers_lock = threading.Lock()
+
+
+def get_summarizer(model: Optional[Runnable[Any, Any]] = None) -> Summarizer:
+    """Return the cached Summarizer for a model (defaults to the configured Gemini model).
+
+    Only the SUMMARIZER_CACHE_SIZE most recently used models keep their Summarizer.
     """
     if model is None:
         model = llm  # Use your Gemini instance
-    docs = [Document(page_content=messages_text)]
-    summarize_chain = load_summarize_chain(model, chain_type="stuff")
-    return summarize_chain.run(docs).strip()
\ No newline at end of file
+    key = id(model)
+    with _summarizers_lock:
+        summarizer = _summarizers.get(key)
+        if summarizer is None or summarizer.model is not model:
+            summarizer = _summarizers[key] = Summarizer(model)
+            while len(_summarizers) > SUMMARIZER_CACHE_SIZE:
+                _summarizers.popitem(last=False)
+        _summarizers.move_to_end(key)
+    return summarizer
+
+
+def summarize_messages(
+    messages_text: str, model: Optional[Runnable[Any, Any]] = None
+) -> str:
+    """Summarize a string conversation history using Gemini."""
+    return get_summarizer(model).summarize(messages_text)
+
+
+async def asummarize_messages(
+    messages_text: str, model: Optional[Runnable[Any, Any]] = None
+) -> str:
+    """Async version of summarize_messages."""
+    return await get_summarizer(model).asummarize(messages_text)
+
+
+def update_summary(
+    previous_summary: str,
+    new_messages_text: str,
+    model: Optional[Runnable[Any, Any]] = None,
+) -> str:
+    """Fold new conversation lines into an existing summary (rolling summarization).
+
+    Only the previous summary and the new lines are sent to the model, so the input
+    stays bounded however long the conversation runs.
+    """
+    return get_summarizer(model).update(previous_summary, new_messages_text)
+
+
+async def aupdate_summary(
+    previous_summary: str,
+    new_messages_text: str,
+    model: Optional[Runnable[Any, Any]] = None,
+) -> str:
+    """Async version of update_summary."""
+    return await get_summarizer(model).aupdate(previous_summary, new_messages_text)
@@ -1,9 +1,12 @@
 import json
-from langchain_core.messages import ToolMessage, SystemMessage
+from typing import List, Sequence
+
+from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
-from summarization.tools import tools
-from summarization.state import AgentState
+
 from summarization.configuration import llm
+from summarization.state import AgentState
+from summarization.tools import tools
 
 tools_by_name = {tool.name: tool for tool in tools}
 
@@ -47,14 +50,13 @@ def should_continue(state: AgentState):
     # Otherwise if there is, we continue
     else:
         return "continue"
-    
-def messages_to_str(messages):
-    """
-    Convert a list of LangChain BaseMessage (or similar) objects into transcript-like string.
-    """
-    lines = []
+
+
+def messages_to_str(messages: Sequence[BaseMessage]) -> str:
+    """Convert a list of LangChain BaseMessage (or similar) objects into transcript-like string."""
+    lines: List[str] = []
     for m in messages:
         role = getattr(m, "role", "user")
         content = getattr(m, "content", str(m))
         lines.append(f"{role.capitalize()}: {content}")
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, List, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+from condenser_core.batch import BatchRunner
+from condenser_core.instrumentation import EventRecorder, instrumentation
+from condenser_core.models import get_rate_limiter
+
+
+def _echo(delay: float) -> RunnableLambda[Any, Tuple[str, Any]]:
+    def run(graph_input: Any, config: RunnableConfig) -> Tuple[str, Any]:
+        if graph_input == "boom":
+            raise ValueError("boom")
+        time.sleep(delay)
+        return (config["configurable"]["thread_id"], graph_input)
+
+    async def arun(graph_input: Any, config: RunnableConfig) -> Tuple[str, Any]:
+        if graph_input == "boom":
+            raise ValueError("boom")
+        await asyncio.sleep(delay)
+        return (config["configurable"]["thread_id"], graph_input)
+
+    return RunnableLambda(run, afunc=arun)
+
+
+def test_sync_batch_overlaps_items_and_isolates_failures() -> None:
+    runner = BatchRunner(_echo(0.1), max_concurrency=8)
+    items = [(f"t{i}", "boom" if i == 3 else i) for i in range(16)]
+    started = time.monotonic()
+    results = runner.run(iter(items))
+    assert time.monotonic() - started < 0.6
+    assert len(results) == 16
+    [failure] = [r for r in results if not r.ok]
+    assert failure.thread_id == "t3" and isinstance(failure.error, ValueError)
+    assert {r.output for r in results if r.ok} == {
+        (f"t{i}", i) for i in range(16) if i != 3
+    }
+    assert runner.stats["items"] == 16 and runner.stats["failed"] == 1
+
+
+def test_async_batch_bounds_concurrency_and_reports_throughput() -> None:
+    in_flight: List[int] = []
+    peak: List[int] = []
+
+    async def tracked(graph_input: int, config: RunnableConfig) -> int:
+        in_flight.append(graph_input)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(graph_input)
+        return graph_input
+
+    async def items() -> AsyncIterator[Tuple[str, int]]:
+        for i in range(20):
+            yield f"t{i}", i
+
+    recorder = EventRecorder()
+    instrumentation.add_listener(recorder)
+    try:
+        runner = BatchRunner(
+            RunnableLambda(lambda x: x, afunc=tracked), max_concurrency=4, name="replay"
+        )
+        results = asyncio.run(runner.arun(items()))
+    finally:
+        instrumentation.remove_listener(recorder)
+        instrumentation.reset()
+    assert sorted(r.output for r in results) == list(range(20))
+    assert max(peak) == 4
+    assert len(recorder.of_type("batch_item")) == 20
+    [summary] = recorder.of_type("batch")
+    assert summary["name"] == "replay" and summary["items_per_second"] > 0
+
+
+def test_rate_limiter_is_shared_per_model() -> None:
+    assert get_rate_limiter("fake:model", None) is None
+    assert get_rate_limiter("fake:model", 5) is get_rate_limiter("fake:model", 5)
+    assert get_rate_limiter("fake:model", 5) is not get_rate_limiter("fake:other", 5)
+
+
+def test_turns_of_one_thread_run_in_order() -> None:
+    in_flight: Set[str] = set()
+    order: List[Tuple[str, int]] = []
+
+    def turn(graph_input: int, config: RunnableConfig) -> int:
+        thread_id = config["configurable"]["thread_id"]
+        assert thread_id not in in_flight
+        in_flight.add(thread_id)
+        time.sleep(0.05 if graph_input == 0 else 0.01)
+        order.append((thread_id, graph_input))
+        in_flight.discard(thread_id)
+        return graph_input
+
+    async def aturn(graph_input: int, config: RunnableConfig) -> int:
+        thread_id = config["configurable"]["thread_id"]
+        assert thread_id not in in_flight
+        in_flight.add(thread_id)
+        await asyncio.sleep(0.05 if graph_input == 0 else 0.01)
+        order.append((thread_id, graph_input))
+        in_flight.discard(thread_id)
+        return graph_input
+
+    runner = BatchRunner(RunnableLambda(turn, afunc=aturn), max_concurrency=4)
+    items = [("a", 0), ("a", 1), ("b", 0)]
+    assert all(r.ok for r in runner.run(items))
+    assert [turn for thread_id, turn in order if thread_id == "a"] == [0, 1]
+
+    order.clear()
+    assert all(r.ok for r in asyncio.run(runner.arun(items)))
+    assert [turn for thread_id, turn in order if thread_id == "a"] == [0, 1]
@@ -0,0 +1,50 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from condenser_core.fakes import FakeChatModel
+
+_HARNESS = Path(__file__).resolve().parents[2] / "benchmarks" / "condensers.py"
+spec = importlib.util.spec_from_file_location("condenser_benchmarks", _HARNESS)
+assert spec is not None and spec.loader is not None
+condensers = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(condensers)
+
+
+def test_scripted_turns_are_deterministic() -> None:
+    assert condensers.scripted_turns(12, seed=3) == condensers.scripted_turns(
+        12, seed=3
+    )
+    weather = [t for t in condensers.scripted_turns(10) if "weather" in t.lower()]
+    assert len(weather) == 2
+
+
+def test_fake_model_calls_bound_tool_and_shares_stats() -> None:
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    model = FakeChatModel()
+    bound = model.bind_tools([type("T", (), {"name": "get_weather"})()])
+    reply = bound.invoke([HumanMessage("what's the weather?")])
+    assert isinstance(reply, AIMessage) and reply.tool_calls[0]["name"] == "get_weather"
+    model.invoke([HumanMessage("summarize")])
+    assert model.stats["agent_calls"] == 1
+    assert model.stats["summary_calls"] == 1
+
+
+@pytest.mark.parametrize("strategy", condensers.STRATEGIES)
+def test_run_strategy_reports_metrics(strategy: str) -> None:
+    result = condensers.run_strategy(strategy, turns=10)
+    assert result["turns"] == 10
+    assert result["agent_calls"] >= 10
+    assert result["agent_prompt_tokens"] > 0
+    assert result["p50_ms"] <= result["p95_ms"] <= result["max_ms"]
+    assert result["final_messages"] > 0
+    assert strategy in condensers.format_table([result])
+
+
+def test_run_strategy_restores_the_graph_module() -> None:
+    module = importlib.import_module("summarization.graph")
+    llm_with_tools, llm = module.llm_with_tools, module.llm
+    condensers.run_strategy("summarization", turns=2)
+    assert module.llm_with_tools is llm_with_tools and module.llm is llm
@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+from typing import List
+
+from langchain_core.messages.tool import tool_call
+from langchain_core.tools import tool
+
+from condenser_core.blob_store import READ_TOOL_NAME, BlobStore
+from condenser_core.tool_executor import ToolExecutor
+
+
+@tool
+def big_report(key: str) -> str:
+    """Return a large report."""
+    return f"{key}: " + "été " * 1000
+
+
+def test_small_outputs_stay_inline(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path, min_chars=100)
+    assert store.offload("short") == "short"
+    assert not any(tmp_path.iterdir())
+
+
+def test_blobs_are_content_addressed_and_paged(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path, min_chars=10, preview_chars=5)
+    text = "€uro " * 50
+    ref = json.loads(store.offload(text))
+    assert ref["preview"] == text[:5]
+    assert store.put(text) == ref["blob"]
+    assert len(list(tmp_path.rglob("*"))) == 2  # one fan-out directory, one blob
+
+    pages: List[str] = []
+    offset = 0
+    while offset != -1:
+        page, offset = store.read(ref["blob"], offset, 7)
+        pages.append(page)
+    assert "".join(pages) == text
+    assert store.get(ref["blob"]) == text
+
+
+def test_executor_offloads_large_results_and_read_tool_restores_them(
+    tmp_path: Path,
+) -> None:
+    store = BlobStore(tmp_path, min_chars=500, page_bytes=100_000)
+    executor = ToolExecutor([big_report, store.read_tool()], blob_store=store)
+    call = tool_call(name="big_report", args={"key": "q"}, id="c1")
+    [message] = executor.run([call])
+    ref = json.loads(str(message.content))
+    assert len(message.content) < 500
+
+    read = tool_call(name=READ_TOOL_NAME, args={"blob": ref["blob"]}, id="c2")
+    [restored] = executor.run([read])
+    page = json.loads(json.loads(str(restored.content)))
+    assert page["next_offset"] == -1
+    assert json.loads(page["content"]) == big_report.invoke({"key": "q"})
+
+
+def test_unknown_blob_is_a_tool_error(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path)
+    executor = ToolExecutor([store.read_tool()], blob_store=store)
+    call = tool_call(name=READ_TOOL_NAME, args={"blob": "../../etc/passwd"}, id="c")
+    [message] = executor.run([call])
+    assert "error" in json.loads(str(message.content))
@@ -0,0 +1,168 @@
+import importlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.graph.state import CompiledStateGraph
+
+from condenser_core.checkpoint import DeltaSqliteSaver
+from condenser_core.fakes import FakeChatModel
+
+
+def _rows(saver: DeltaSqliteSaver, thread_id: str) -> List[Any]:
+    return saver.conn.execute(
+        "SELECT version, base_version, depth, removed, added_type, added FROM message_deltas "
+        "WHERE thread_id=? AND channel='messages' ORDER BY version",
+        (thread_id,),
+    ).fetchall()
+
+
+def _echo_graph(
+    saver: DeltaSqliteSaver, drop_oldest: int = 0
+) -> CompiledStateGraph[Any]:
+    def reply(state: MessagesState) -> Dict[str, Any]:
+        update: List[BaseMessage] = [AIMessage(f"reply {len(state['messages'])}")]
+        if drop_oldest and len(state["messages"]) > drop_oldest:
+            update += [
+                RemoveMessage(id=m.id) for m in state["messages"][:drop_oldest] if m.id
+            ]
+        return {"messages": update}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("reply", reply)
+    builder.add_edge(START, "reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=saver)
+
+
+def test_database_is_opened_on_first_use(tmp_path: Path) -> None:
+    path = tmp_path / "threads.sqlite"
+    saver = DeltaSqliteSaver(str(path))
+    _echo_graph(saver)
+    assert not path.exists()
+    _echo_graph(saver).invoke(
+        {"messages": [HumanMessage("hi")]}, {"configurable": {"thread_id": "t1"}}
+    )
+    assert path.exists()
+
+
+def test_messages_are_stored_as_deltas_and_resume_from_disk(tmp_path: Path) -> None:
+    path = str(tmp_path / "threads.sqlite")
+    config: RunnableConfig = {"configurable": {"thread_id": "t1"}}
+    graph = _echo_graph(DeltaSqliteSaver(path))
+    for i in range(20):
+        graph.invoke({"messages": [HumanMessage(f"message {i}")]}, config)
+    expected = [m.id for m in graph.get_state(config).values["messages"]]
+
+    saver = DeltaSqliteSaver(path)
+    rows = _rows(saver, "t1")
+    # Only the first version is a snapshot; each later one holds just the new messages
+    assert rows[0][1] is None and all(row[1] is not None for row in rows[1:])
+    assert len(saver.serde.loads_typed((rows[-1][4], rows[-1][5]))) == 1
+
+    resumed = _echo_graph(saver)
+    assert [m.id for m in resumed.get_state(config).values["messages"]] == expected
+    resumed.invoke({"messages": [HumanMessage("after restart")]}, config)
+    assert len(resumed.get_state(config).values["messages"]) == len(expected) + 2
+
+
+def test_removals_are_recorded_as_ids() -> None:
+    saver = DeltaSqliteSaver()
+    config: RunnableConfig = {"configurable": {"thread_id": "t"}}
+    graph = _echo_graph(saver, drop_oldest=2)
+    for i in range(5):
+        graph.invoke({"messages": [HumanMessage(f"message {i}")]}, config)
+
+    removals = [json.loads(row[3]) for row in _rows(saver, "t") if row[3] != "[]"]
+    assert removals and all(len(ids) == 2 for ids in removals)
+    messages = graph.get_state(config).values["messages"]
+    assert [m.content for m in messages][-1] == "reply 3"
+
+
+def test_snapshot_bounds_delta_chains_and_compaction_keeps_state() -> None:
+    saver = DeltaSqliteSaver(snapshot_every=4, compact_every=None)
+    config: RunnableConfig = {"configurable": {"thread_id": "t"}}
+    graph = _echo_graph(saver)
+    for i in range(10):
+        graph.invoke({"messages": [HumanMessage(f"message {i}")]}, config)
+    assert max(row[2] for row in _rows(saver, "t")) == 3
+    expected = [m.id for m in graph.get_state(config).values["messages"]]
+
+    saver.compact("t", keep_last=1)
+    assert saver.conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0] == 1
+    assert len(_rows(saver, "t")) == 1
+    saver._latest.clear()
+    assert [m.id for m in graph.get_state(config).values["messages"]] == expected
+    assert len(list(saver.list(config))) == 1
+
+
+def test_duplicate_idless_messages_are_snapshotted_and_survive_reopening(
+    tmp_path: Path,
+) -> None:
+    from langgraph.checkpoint.base import empty_checkpoint
+
+    path = str(tmp_path / "threads.sqlite")
+    saver = DeltaSqliteSaver(path)
+    config: RunnableConfig = {"configurable": {"thread_id": "t", "checkpoint_ns": ""}}
+    # A custom reducer that never assigns ids: equal messages share a content-hash key
+    turns = [
+        [HumanMessage("ok"), AIMessage("sure"), HumanMessage("ok"), AIMessage("sure")],
+        [HumanMessage("ok"), AIMessage("sure")],
+    ]
+    for version, messages in enumerate(turns, start=1):
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"messages": messages}
+        checkpoint["channel_versions"] = {"messages": str(version)}
+        config = saver.put(config, checkpoint, {}, {"messages": str(version)})
+
+    reopened = DeltaSqliteSaver(path)
+    restored_tuple = reopened.get_tuple({"configurable": {"thread_id": "t"}})
+    assert restored_tuple is not None
+    restored = restored_tuple.checkpoint["channel_values"]["messages"]
+    assert [m.content for m in restored] == ["ok", "sure"]
+
+
+def test_delete_thread() -> None:
+    saver = DeltaSqliteSaver()
+    config: RunnableConfig = {"configurable": {"thread_id": "t"}}
+    _echo_graph(saver).invoke({"messages": [HumanMessage("hi")]}, config)
+    saver.delete_thread("t")
+    assert saver.get_tuple(config) is None
+
+
+@pytest.mark.parametrize("strategy", ["manual_triming", "selective_deletition"])
+def test_condenser_graphs_checkpoint_with_deltas(
+    monkeypatch: pytest.MonkeyPatch, strategy: str
+) -> None:
+    module = importlib.import_module(f"{strategy}.graph")
+    model = FakeChatModel()
+    monkeypatch.setattr(
+        module,
+        "llm_with_tools",
+        model.bind_tools(module.tool_executor.tools_by_name.values()),
+    )
+    saver = DeltaSqliteSaver()
+    graph = module.workflow.compile(checkpointer=saver)
+    config: RunnableConfig = {"configurable": {"thread_id": strategy}}
+    for i in range(8):
+        graph.invoke(
+            {
+                "messages": [
+                    HumanMessage(
+                        f"what's the weather {i}?" if i % 3 == 2 else f"hi {i}"
+                    )
+                ]
+            },
+            config,
+        )
+
+    rows = _rows(saver, strategy)
+    assert sum(1 for row in rows if row[1] is None) == 1
+    assert any(row[3] != "[]" for row in rows)
+    saver._latest.clear()
+    state = graph.get_state(config).values
+    assert state["messages"] and isinstance(state["messages"][-1], AIMessage)
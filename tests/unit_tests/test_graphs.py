@@ -0,0 +1,73 @@
+import asyncio
+import importlib
+from typing import Any, Dict, Tuple
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.graph.state import CompiledStateGraph
+
+from condenser_core.fakes import FakeChatModel
+
+PACKAGES = [
+    "manual_triming",
+    "selective_deletition",
+    "summarization",
+    "Tokenaware_truncation",
+]
+
+
+def _compile(
+    package: str, monkeypatch: pytest.MonkeyPatch
+) -> Tuple[CompiledStateGraph[Any], FakeChatModel]:
+    module = importlib.import_module(f"{package}.graph")
+    model = FakeChatModel()
+    monkeypatch.setattr(
+        module,
+        "llm_with_tools",
+        model.bind_tools(module.tool_executor.tools_by_name.values()),
+    )
+    if hasattr(module, "llm"):
+        monkeypatch.setattr(module, "llm", model)
+    return module.workflow.compile(), model
+
+
+@pytest.mark.parametrize("package", PACKAGES)
+def test_ainvoke_round_trips_a_tool_call(
+    package: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    graph, model = _compile(package, monkeypatch)
+    result = asyncio.run(
+        graph.ainvoke({"messages": [HumanMessage("What is the weather in sf?")]})
+    )
+
+    reply = result["messages"][-1]
+    assert isinstance(reply, AIMessage) and not reply.tool_calls
+    assert model.stats["agent_calls"] == 2
+    # The second agent call answered from the tool result
+    [tool_result] = [
+        m for m in model.stats["last_prompt"] if isinstance(m, ToolMessage)
+    ]
+    assert "San Francisco" in tool_result.content
+
+
+@pytest.mark.parametrize("package", PACKAGES)
+def test_ainvoke_condenses_a_long_conversation(
+    package: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    graph, model = _compile(package, monkeypatch)
+
+    async def run(turns: int) -> Dict[str, Any]:
+        state: Dict[str, Any] = {"messages": []}
+        for i in range(turns):
+            turn = HumanMessage(f"turn {i} " + "word " * 30)
+            state = await graph.ainvoke(
+                {**state, "messages": list(state["messages"]) + [turn]}
+            )
+        return state
+
+    state = asyncio.run(run(30))
+    # 30 turns are 60 messages; every strategy sends the model far fewer
+    assert len(model.stats["last_prompt"]) < 30
+    assert state["messages"][-1].content
+    if package == "summarization":
+        assert state["summary"] and model.stats["summary_calls"] > 0
@@ -0,0 +1,115 @@
+import asyncio
+import importlib
+import inspect
+from typing import Any, Dict, Iterator
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+
+from condenser_core.fakes import FakeChatModel
+from condenser_core.instrumentation import (
+    EventRecorder,
+    Instrumentation,
+    instrumentation,
+)
+
+
+def test_disabled_instrumentation_records_nothing() -> None:
+    instr = Instrumentation()
+    instr.emit("node", graph="g", name="agent", duration_ms=1.0)
+    with instr.timed("tool", name="t") as extra:
+        extra["cached"] = True
+    assert instr.counters() == {}
+
+
+def test_events_reach_listeners_and_counters() -> None:
+    instr = Instrumentation()
+    recorder = EventRecorder()
+    instr.add_listener(recorder)
+    instr.emit(
+        "condense", graph="g", name="trim", dropped=2, tokens_before=10, tokens_after=4
+    )
+    instr.emit(
+        "condense", graph="g", name="trim", dropped=1, tokens_before=6, tokens_after=5
+    )
+    with instr.timed("tool", name="lookup") as extra:
+        extra["cached"] = False
+
+    assert [e["event"] for e in recorder.events] == ["condense", "condense", "tool"]
+    assert recorder.of_type("tool")[0]["cached"] is False
+    counters = instr.counters()
+    assert counters["condense:g/trim"] == {
+        "count": 2,
+        "dropped": 3,
+        "tokens_before": 16,
+        "tokens_after": 9,
+    }
+    assert counters["tool:lookup"]["count"] == 1
+
+    instr.remove_listener(recorder)
+    assert not instr.enabled
+
+
+def test_node_decorator_keeps_signature_and_times_sync_and_async() -> None:
+    instr = Instrumentation()
+    recorder = EventRecorder()
+    instr.add_listener(recorder)
+
+    @instr.node("g", "agent")
+    def node(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, int]:
+        return {"n": 1}
+
+    @instr.node("g", "agent")
+    async def anode(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, int]:
+        return {"n": 2}
+
+    assert "config" in inspect.signature(node).parameters
+    assert inspect.iscoroutinefunction(anode)
+    assert node({}, {}) == {"n": 1}
+    assert asyncio.run(anode({}, {})) == {"n": 2}
+    assert [(e["name"], e["graph"]) for e in recorder.of_type("node")] == [
+        ("agent", "g")
+    ] * 2
+    assert all(e["duration_ms"] >= 0 for e in recorder.events)
+
+
+@pytest.fixture
+def recorder() -> Iterator[EventRecorder]:
+    recorder = EventRecorder()
+    instrumentation.add_listener(recorder)
+    yield recorder
+    instrumentation.remove_listener(recorder)
+    instrumentation.reset()
+
+
+def test_tokenaware_graph_reports_nodes_tools_and_trimming(
+    monkeypatch: pytest.MonkeyPatch, recorder: EventRecorder
+) -> None:
+    graph_module = importlib.import_module("Tokenaware_truncation.graph")
+    model = FakeChatModel(reply_chars=400)
+    monkeypatch.setattr(
+        graph_module,
+        "llm_with_tools",
+        model.bind_tools(graph_module.tool_executor.tools_by_name.values()),
+    )
+    graph = graph_module.workflow.compile()
+
+    state: Dict[str, Any] = {"messages": []}
+    for text in [
+        "hello",
+        "what's the weather?",
+        "tell me more",
+        "and more",
+        "and more again",
+    ]:
+        state = graph.invoke(
+            {**state, "messages": list(state["messages"]) + [HumanMessage(text)]}
+        )
+
+    nodes = {e["name"] for e in recorder.of_type("node")}
+    assert nodes == {"agent", "tools"}
+    assert recorder.of_type("tool")[0]["name"] == "get_weather"
+    condense = recorder.of_type("condense")
+    assert condense and all(e["tokens_after"] <= e["tokens_before"] for e in condense)
+    assert any(e["dropped"] > 0 for e in condense)
@@ -0,0 +1,78 @@
+from typing import Any, Dict, List, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, StateGraph
+
+from manual_triming.configuration import MAX_MESSAGES
+from manual_triming.history import MessageWindow
+from manual_triming.state import AgentState, manage_messages_history
+
+
+def test_window_evicts_oldest_in_place() -> None:
+    window = MessageWindow(maxlen=3)
+    window.extend([HumanMessage(str(i)) for i in range(5)])
+    assert [m.content for m in window] == ["2", "3", "4"]
+    assert [m.content for m in window[1:]] == ["3", "4"]
+    assert window[-1].content == "4"
+    assert [m.content for m in [AIMessage("sys")] + window] == ["sys", "2", "3", "4"]
+
+
+def test_reducer_appends_and_handles_trim_command() -> None:
+    history = manage_messages_history(
+        [], [HumanMessage(str(i)) for i in range(MAX_MESSAGES + 2)]
+    )
+    assert isinstance(history, MessageWindow)
+    assert len(history) == MAX_MESSAGES
+
+    same = manage_messages_history(history, {"type": "trim", "count": 1})
+    assert same is history
+    assert [m.content for m in history] == [str(MAX_MESSAGES + 1)]
+
+
+def test_checkpoint_stores_plain_message_list() -> None:
+    def reply(state: AgentState) -> Dict[str, Any]:
+        return {"messages": [AIMessage(f"reply to {len(state['messages'])}")]}
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("reply", reply)
+    workflow.set_entry_point("reply")
+    workflow.add_edge("reply", END)
+    saver = MemorySaver()
+    graph = workflow.compile(checkpointer=saver)
+    config: RunnableConfig = {"configurable": {"thread_id": "t"}}
+
+    for i in range(MAX_MESSAGES):
+        graph.invoke({"messages": [HumanMessage(f"q{i}")]}, config)
+
+    checkpoint = saver.get_tuple(config)
+    assert checkpoint is not None
+    stored = checkpoint.checkpoint["channel_values"]["messages"]
+    assert type(stored) is list
+    assert len(stored) == MAX_MESSAGES
+    assert stored[-1].content == f"reply to {MAX_MESSAGES}"
+
+
+def test_window_counts_each_message_once() -> None:
+    batches: List[int] = []
+
+    def count_batch(messages: Sequence[BaseMessage]) -> List[int]:
+        batches.append(len(messages))
+        return [len(m.content) for m in messages]
+
+    window = MessageWindow([HumanMessage("a"), AIMessage("bb")], maxlen=3)
+    assert window.token_counts(count_batch) == [1, 2]
+    window.extend([HumanMessage("ccc"), AIMessage("dddd")])
+    assert window.token_counts(count_batch) == [2, 3, 4]
+    assert window.token_counts(count_batch) == [2, 3, 4]
+    assert batches == [2, 2]
+
+
+def test_window_reads_return_the_stored_messages() -> None:
+    messages = [HumanMessage("a", id="1"), AIMessage("b", id="2")]
+    window = MessageWindow(messages, maxlen=3)
+    assert window[-1] is window[-1] is messages[-1]
+    assert all(a is b for a, b in zip(window.copy(), messages))
+    prefix: List[Any] = ["x"]
+    assert all(a is b for a, b in zip(prefix + window, prefix + messages))
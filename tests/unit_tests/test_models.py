@@ -0,0 +1,136 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.tools import tool
+
+from condenser_core.fakes import FakeChatModel
+from condenser_core.models import (
+    LazyChatModel,
+    clear_models,
+    get_chat_model,
+    get_rate_limiter,
+)
+
+SRC = Path(__file__).resolve().parents[2] / "src"
+# Extra seconds allowed for importing the four graph modules on top of langgraph/langchain-core
+IMPORT_BUDGET_SECONDS = 0.75
+
+Built = List[Tuple[str, Dict[str, Any]]]
+
+
+@tool
+def lookup(key: str) -> str:
+    """Look up a key."""
+    return key
+
+
+@pytest.fixture
+def built(monkeypatch: pytest.MonkeyPatch) -> Iterator[Built]:
+    import langchain.chat_models
+
+    built: Built = []
+
+    def fake_init_chat_model(model: str, **kwargs: Any) -> FakeChatModel:
+        built.append((model, kwargs))
+        return FakeChatModel(tool_keyword="lookup", tool_args={"key": "k"})
+
+    monkeypatch.setattr(langchain.chat_models, "init_chat_model", fake_init_chat_model)
+    clear_models()
+    yield built
+    clear_models()
+
+
+def test_lazy_model_is_built_on_first_use_and_shared(built: Built) -> None:
+    llm = LazyChatModel("fake:model")
+    llm_with_tools = llm.bind_tools([lookup])
+    other_package_llm = LazyChatModel("fake:model")
+    assert built == []
+
+    assert llm.invoke([HumanMessage("hi")]).content
+    assert other_package_llm.invoke([HumanMessage("hi")]).content
+    reply = llm_with_tools.invoke([HumanMessage("lookup please")])
+    assert isinstance(reply, AIMessage) and reply.tool_calls[0]["name"] == "lookup"
+    assert built == [("fake:model", {})]
+    assert get_chat_model("fake:model") is llm.resolved is other_package_llm.resolved
+
+    LazyChatModel("fake:model", temperature=0.5).invoke([HumanMessage("hi")])
+    assert len(built) == 2
+
+
+def test_lazy_model_composes_without_building(built: Built) -> None:
+    chain = ChatPromptTemplate.from_messages([("human", "{text}")]) | LazyChatModel(
+        "fake:model"
+    )
+    assert built == []
+    assert chain.invoke({"text": "hello"}).content
+    assert len(built) == 1
+
+
+def test_clear_models_rebuilds(built: Built) -> None:
+    llm = LazyChatModel("fake:model")
+    first = llm.resolved
+    clear_models()
+    assert llm.resolved is not first
+    assert len(built) == 2
+
+
+def test_clear_models_drops_rate_limiters() -> None:
+    limiter = get_rate_limiter("fake:model", 5)
+    assert get_rate_limiter("fake:model", 5) is limiter
+    clear_models()
+    assert get_rate_limiter("fake:model", 5) is not limiter
+
+
+def test_graph_modules_import_within_budget_without_building_models() -> None:
+    code = """
+import sys, time
+import langchain_core.messages, langchain_core.runnables, langchain_core.tools, langgraph.graph
+started = time.perf_counter()
+import manual_triming.graph, selective_deletition.graph, summarization.graph, Tokenaware_truncation.graph
+elapsed = time.perf_counter() - started
+from condenser_core import models
+print(elapsed, "langchain_google_genai" in sys.modules, len(models._models))
+"""
+    env = {k: v for k, v in os.environ.items() if k != "GOOGLE_API_KEY"}
+    env["PYTHONPATH"] = str(SRC)
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    elapsed, provider_imported, models_built = (
+        float(out[0]),
+        out[1] == "True",
+        int(out[2]),
+    )
+    assert not provider_imported
+    assert models_built == 0
+    assert elapsed < IMPORT_BUDGET_SECONDS, (
+        f"graph modules took {elapsed:.2f}s to import"
+    )
+
+
+@pytest.mark.parametrize(
+    "package",
+    [
+        "manual_triming",
+        "selective_deletition",
+        "summarization",
+        "Tokenaware_truncation",
+    ],
+)
+def test_package_graph_is_compiled_after_importing_the_submodule(package: str) -> None:
+    import importlib
+
+    module = importlib.import_module(f"{package}.graph")
+    graph = getattr(importlib.import_module(package), "graph")
+    assert type(graph).__name__ == "CompiledStateGraph"
+    assert graph is module.graph
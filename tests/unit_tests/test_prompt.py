@@ -0,0 +1,41 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from condenser_core.fakes import FakeChatModel
+from condenser_core.prompt import PromptAssembler, PromptView
+from manual_triming.history import MessageWindow
+
+
+def test_view_indexes_across_parts_without_copying() -> None:
+    history = [HumanMessage("a"), AIMessage("b")]
+    view = PromptView((SystemMessage("sys"),), (), history)
+
+    assert len(view) == 3
+    assert [m.content for m in view] == ["sys", "a", "b"]
+    assert view[0].content == "sys" and view[-1] is history[-1]
+    assert [m.content for m in view[1:]] == ["a", "b"]
+    assert [m.content for m in reversed(view)] == ["b", "a", "sys"]
+    assert view._parts[-1] is history  # referenced, not copied
+
+
+def test_assembler_reuses_system_and_summary_messages() -> None:
+    assembler = PromptAssembler(
+        "be brief", summary_prefix="Summary: ", summary_cache_size=1
+    )
+    history = [HumanMessage("hi")]
+
+    first = assembler.assemble(history, summary="earlier")
+    second = assembler.assemble(history, summary="earlier")
+    assert first[0] is second[0] is assembler.system_message
+    assert first[1] is second[1] and first[1].content == "Summary: earlier"
+    assert [m.content for m in assembler.assemble(history, include_system=False)] == [
+        "hi"
+    ]
+    assembler.summary_message("later")
+    assert assembler.summary_message("earlier") is not first[1]  # evicted
+
+
+def test_model_accepts_a_view_over_a_message_window() -> None:
+    model = FakeChatModel()
+    window = MessageWindow([HumanMessage("hello")], maxlen=4)
+    reply = model.invoke(PromptAssembler("be brief").assemble(window))
+    assert isinstance(reply, AIMessage)
@@ -0,0 +1,68 @@
+from typing import List, Sequence
+
+import numpy as np
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from condenser_core.relevance import HashedEmbedder, RelevanceScorer, retention_units
+
+
+def test_embeddings_are_normalized_and_deterministic() -> None:
+    embedder = HashedEmbedder(dim=64)
+    matrix = embedder.embed(["Weather in Paris", "weather in paris", ""])
+    assert np.allclose(np.linalg.norm(matrix[:2], axis=1), 1.0)
+    assert np.allclose(matrix[0], matrix[1])
+    assert not matrix[2].any()
+
+
+def test_tool_calls_and_results_form_one_unit() -> None:
+    messages = [
+        HumanMessage("weather?", id="1"),
+        AIMessage(
+            "", id="2", tool_calls=[{"name": "get_weather", "args": {}, "id": "c1"}]
+        ),
+        ToolMessage("sunny", tool_call_id="c1", id="3"),
+        AIMessage("It is sunny.", id="4"),
+    ]
+    assert retention_units(messages) == [[0], [1, 2], [3]]
+
+
+def test_select_keeps_relevant_messages_and_current_turn() -> None:
+    messages = [
+        HumanMessage("My cat is called Miso", id="1"),
+        AIMessage("Nice name for a cat", id="2"),
+        HumanMessage("Plan a trip to Lisbon in spring", id="3"),
+        AIMessage("Lisbon in spring is lovely", id="4"),
+        HumanMessage("What is my cat called?", id="5"),
+    ]
+    counts = [10] * len(messages)
+    keep = RelevanceScorer(dim=256).select(messages, counts, max_tokens=30)
+    assert len(keep) == 3
+    assert {0, 4} <= keep
+    assert 2 not in keep
+
+
+def test_vectors_are_cached_per_message_id(monkeypatch: pytest.MonkeyPatch) -> None:
+    scorer = RelevanceScorer(dim=32, maxsize=2)
+    calls: List[int] = []
+    embed = scorer.embedder.embed
+
+    def counting_embed(texts: Sequence[str]) -> np.ndarray:
+        calls.append(len(texts))
+        return embed(texts)
+
+    monkeypatch.setattr(scorer.embedder, "embed", counting_embed)
+
+    messages = [HumanMessage("a", id="1"), AIMessage("b", id="2")]
+    scorer.vectors(messages)
+    scorer.vectors(messages + [HumanMessage("c", id="3")])
+    assert calls == [2, 1]
+    assert len(scorer._vectors) == 2
+
+
+def test_message_replaced_under_the_same_id_is_embedded_again() -> None:
+    scorer = RelevanceScorer(dim=32)
+    before = scorer.vectors([AIMessage("the weather in paris", id="1")])
+    after = scorer.vectors([AIMessage("stock prices today", id="1")])
+    assert not (before == after).all()
+    assert (scorer.vectors([AIMessage("stock prices today", id="1")]) == after).all()
@@ -0,0 +1,142 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Dict
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.types import StateSnapshot
+
+from condenser_core.checkpoint import DeltaSqliteSaver
+from condenser_core.session_cache import HotSessionSaver
+
+
+def _echo_graph(saver: BaseCheckpointSaver[Any]) -> CompiledStateGraph[Any]:
+    def reply(state: MessagesState) -> Dict[str, Any]:
+        return {"messages": [AIMessage(f"reply {len(state['messages'])}")]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("reply", reply)
+    builder.add_edge(START, "reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=saver)
+
+
+def _config(thread_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_hot_threads_are_served_from_memory(tmp_path: Path) -> None:
+    backing = DeltaSqliteSaver(str(tmp_path / "threads.sqlite"))
+    saver = HotSessionSaver(backing, max_sessions=4)
+    graph = _echo_graph(saver)
+    for i in range(5):
+        graph.invoke({"messages": [HumanMessage(f"message {i}")]}, _config("t"))
+
+    assert saver.misses == 1  # only the first turn looked in the file
+    assert backing.get_tuple(_config("t")) is None  # write-back: nothing spilled yet
+    assert len(graph.get_state(_config("t")).values["messages"]) == 10
+
+
+def test_flush_every_bounds_what_a_crash_loses(tmp_path: Path) -> None:
+    path = str(tmp_path / "threads.sqlite")
+    saver = HotSessionSaver(DeltaSqliteSaver(path), max_sessions=4, flush_every=1)
+    graph = _echo_graph(saver)
+    for i in range(3):
+        graph.invoke({"messages": [HumanMessage(f"message {i}")]}, _config("t"))
+
+    # Without a flush, a new process (as after a crash) still sees every turn
+    resumed = _echo_graph(DeltaSqliteSaver(path))
+    assert len(resumed.get_state(_config("t")).values["messages"]) == 6
+    assert saver.misses == 1
+
+
+def test_least_recently_used_threads_spill_and_reload(tmp_path: Path) -> None:
+    path = str(tmp_path / "threads.sqlite")
+    saver = HotSessionSaver(DeltaSqliteSaver(path), max_sessions=2)
+    graph = _echo_graph(saver)
+    for turn in range(3):
+        for thread_id in ("a", "b", "c"):
+            graph.invoke(
+                {"messages": [HumanMessage(f"{thread_id} {turn}")]}, _config(thread_id)
+            )
+
+    assert saver.spills > 0
+    for thread_id in ("a", "b", "c"):
+        contents = [
+            m.content for m in graph.get_state(_config(thread_id)).values["messages"]
+        ]
+        assert contents[::2] == [f"{thread_id} {turn}" for turn in range(3)]
+
+    # After a flush every thread resumes from the file alone
+    saver.flush()
+    resumed = _echo_graph(DeltaSqliteSaver(path))
+    for thread_id in ("a", "b", "c"):
+        assert len(resumed.get_state(_config(thread_id)).values["messages"]) == 6
+    # Spilled checkpoints are chained to checkpoints that exist on disk
+    history = list(resumed.get_state_history(_config("a")))
+    assert history and all(
+        s.parent_config is None or resumed.get_state(s.parent_config) for s in history
+    )
+
+
+def test_memory_cap_evicts_large_sessions(tmp_path: Path) -> None:
+    saver = HotSessionSaver(
+        DeltaSqliteSaver(str(tmp_path / "threads.sqlite")),
+        max_sessions=100,
+        max_bytes=5000,
+    )
+    graph = _echo_graph(saver)
+    for thread_id in ("a", "b", "c"):
+        graph.invoke({"messages": [HumanMessage("x" * 3000)]}, _config(thread_id))
+
+    assert len(saver._sessions) == 1 and saver.spills == 2
+    assert graph.get_state(_config("a")).values["messages"][0].content == "x" * 3000
+
+
+def test_cached_checkpoint_is_not_shared_with_callers(tmp_path: Path) -> None:
+    saver = HotSessionSaver(DeltaSqliteSaver(str(tmp_path / "threads.sqlite")))
+    graph = _echo_graph(saver)
+    graph.invoke({"messages": [HumanMessage("hi")]}, _config("t"))
+
+    cached = saver.get_tuple(_config("t"))
+    assert cached is not None
+    cached.checkpoint["channel_values"]["messages"].clear()
+    reloaded = saver.get_tuple(_config("t"))
+    assert (
+        reloaded is not None
+        and len(reloaded.checkpoint["channel_values"]["messages"]) == 2
+    )
+
+
+def test_delete_thread_drops_memory_and_disk(tmp_path: Path) -> None:
+    backing = DeltaSqliteSaver(str(tmp_path / "threads.sqlite"))
+    saver = HotSessionSaver(backing)
+    graph = _echo_graph(saver)
+    graph.invoke({"messages": [HumanMessage("hi")]}, _config("t"))
+    saver.flush()
+
+    saver.delete_thread("t")
+    assert saver.get_tuple(_config("t")) is None
+    assert backing.get_tuple(_config("t")) is None
+
+
+def test_async_graph_uses_the_cache(tmp_path: Path) -> None:
+    saver = HotSessionSaver(
+        DeltaSqliteSaver(str(tmp_path / "threads.sqlite")), max_sessions=1
+    )
+    graph = _echo_graph(saver)
+
+    async def run() -> StateSnapshot:
+        for turn in range(2):
+            for thread_id in ("a", "b"):
+                await graph.ainvoke(
+                    {"messages": [HumanMessage(f"{thread_id} {turn}")]},
+                    _config(thread_id),
+                )
+        return await graph.aget_state(_config("a"))
+
+    state = asyncio.run(run())
+    assert [m.content for m in state.values["messages"]][::2] == ["a 0", "a 1"]
@@ -0,0 +1,147 @@
+import asyncio
+import importlib
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, cast
+
+import pytest
+from langchain_core.messages import AIMessageChunk, BaseMessage, HumanMessage, ToolCall
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.tools import tool
+
+from condenser_core.fakes import FakeChatModel
+from condenser_core.streaming import (
+    ToolCallAssembler,
+    ainvoke_model,
+    invoke_model,
+    stream_model,
+)
+from condenser_core.tool_executor import ToolExecutor
+
+
+@tool
+def slow_weather(location: str) -> str:
+    """Look up the weather slowly."""
+    time.sleep(0.1)
+    return f"sunny in {location}"
+
+
+def test_tool_call_is_dispatched_once_its_arguments_are_complete() -> None:
+    dispatched: List[ToolCall] = []
+    assembler = ToolCallAssembler(dispatched.append)
+    assembler.add(
+        AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": "slow_weather", "args": '{"location": ', "id": "a", "index": 0}
+            ],
+        )
+    )
+    assert dispatched == []
+    assembler.add(
+        AIMessageChunk(
+            content="",
+            tool_call_chunks=[{"name": None, "args": '"sf"}', "id": None, "index": 0}],
+        )
+    )
+    assert [c["args"] for c in dispatched] == [{"location": "sf"}]
+    assembler.add(
+        AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": "slow_weather", "args": "", "id": "b", "index": 1}
+            ],
+        )
+    )
+    message = assembler.finish()
+    assert [c["id"] for c in message.tool_calls] == ["a", "b"]
+    assert [c["id"] for c in dispatched] == ["a", "b"]
+
+
+def test_prefetched_tool_overlaps_generation_and_run_collects_it() -> None:
+    model = FakeChatModel(tool_keyword="weather", stream_delay=0.05).bind_tools(
+        [slow_weather]
+    )
+    executor = ToolExecutor([slow_weather])
+    reply = stream_model(
+        model, [HumanMessage("weather?")], on_tool_call=executor.prefetch
+    )
+    # Dispatched before the stream returned; the worker may not have picked it up yet
+    assert list(executor._prefetched) == [reply.tool_calls[0]["id"]]
+    [result] = executor.run(reply.tool_calls)
+    assert "sunny in sf" in result.content
+    assert executor._prefetched == {}
+
+
+class _FailingStream:
+    """Streams one complete tool call, then fails."""
+
+    def stream(
+        self, messages: List[BaseMessage], config: Optional[RunnableConfig] = None
+    ) -> Iterator[AIMessageChunk]:
+        yield AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {
+                    "name": "slow_weather",
+                    "args": '{"location": "oslo"}',
+                    "id": "a",
+                    "index": 0,
+                }
+            ],
+        )
+        raise RuntimeError("connection reset")
+
+    async def astream(
+        self, messages: List[BaseMessage], config: Optional[RunnableConfig] = None
+    ) -> AsyncIterator[AIMessageChunk]:
+        for chunk in self.stream(messages, config):
+            yield chunk
+
+
+def test_failed_stream_discards_its_prefetched_calls() -> None:
+    executor = ToolExecutor([slow_weather])
+    with pytest.raises(RuntimeError):
+        invoke_model(
+            cast(Runnable[Any, Any], _FailingStream()),
+            [HumanMessage("weather?")],
+            stream=True,
+            executor=executor,
+        )
+    assert executor._prefetched == {}
+
+    async def run() -> None:
+        with pytest.raises(RuntimeError):
+            await ainvoke_model(
+                cast(Runnable[Any, Any], _FailingStream()),
+                [HumanMessage("weather?")],
+                stream=True,
+                executor=executor,
+            )
+
+    asyncio.run(run())
+    assert executor._prefetched == {}
+
+
+def test_streaming_agent_node_emits_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    module = importlib.import_module("selective_deletition.graph")
+    model = FakeChatModel(reply_chars=64, stream_chunk_chars=8)
+    monkeypatch.setattr(module, "STREAM_MODEL_OUTPUT", True)
+    monkeypatch.setattr(
+        module,
+        "llm_with_tools",
+        model.bind_tools(module.tool_executor.tools_by_name.values()),
+    )
+    graph = module.workflow.compile()
+
+    chunks = [
+        m
+        for m, _ in graph.stream(
+            {"messages": [HumanMessage("hi")]}, stream_mode="messages"
+        )
+    ]
+    assert len([c for c in chunks if isinstance(c, AIMessageChunk)]) == 8
+
+    result = asyncio.run(
+        graph.ainvoke({"messages": [HumanMessage("What is the weather in sf?")]})
+    )
+    assert result["messages"][-1].content.startswith("Tool answer")
@@ -0,0 +1,358 @@
+import importlib
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple, cast
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage
+from langgraph.graph.message import Messages, add_messages
+
+summarization_graph = importlib.import_module("summarization.graph")
+
+
+def _merge(
+    left: Sequence[BaseMessage], right: Sequence[BaseMessage]
+) -> List[BaseMessage]:
+    return cast(
+        List[BaseMessage], add_messages(cast(Messages, left), cast(Messages, right))
+    )
+
+
+def test_rolling_summary_folds_only_new_messages(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: List[Tuple[str, str]] = []
+
+    def fake_update_summary(
+        previous_summary: str, new_messages_text: str, model: Optional[object] = None
+    ) -> str:
+        calls.append((previous_summary, new_messages_text))
+        return f"{previous_summary}+{new_messages_text.count(chr(10)) + 1}"
+
+    monkeypatch.setattr(summarization_graph, "SUMMARY_MODE", "rolling")
+    monkeypatch.setattr(summarization_graph, "SUMMARY_HIGH_WATERMARK_TOKENS", None)
+    monkeypatch.setattr(summarization_graph, "update_summary", fake_update_summary)
+    messages = [
+        HumanMessage("q1", id="1"),
+        AIMessage("a1", id="2"),
+        HumanMessage("q2", id="3"),
+        AIMessage("a2", id="4"),
+        HumanMessage("q3", id="5"),
+    ]
+
+    update = summarization_graph.summarize_conversation_node(
+        {"messages": messages, "summary": "old"}
+    )
+
+    assert update["summary"] == "old+3"
+    assert calls == [("old", calls[0][1])]
+    assert all(isinstance(m, RemoveMessage) for m in update["messages"])
+    assert [m.id for m in update["messages"]] == ["1", "2", "3"]
+
+
+def test_full_summary_replaces_the_summarized_prefix(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(summarization_graph, "SUMMARY_MODE", "full")
+    monkeypatch.setattr(summarization_graph, "SUMMARY_HIGH_WATERMARK_TOKENS", None)
+    monkeypatch.setattr(summarization_graph, "NUM_RECENT_FOR_CONTEXT", 2)
+    monkeypatch.setattr(
+        summarization_graph, "summarize_messages", lambda text, model=None: "short"
+    )
+    history: List[BaseMessage] = [
+        HumanMessage(f"q{i}", id=f"h{i}")
+        if i % 2 == 0
+        else AIMessage(f"a{i}", id=f"a{i}")
+        for i in range(6)
+    ]
+
+    update = summarization_graph.summarize_conversation_node({"messages": history})
+    merged = _merge(history, update["messages"])
+
+    assert [m.content for m in merged] == [
+        "Summary of previous conversation: short",
+        "q4",
+        "a5",
+    ]
+    # The next summary takes the previous one's place again
+    merged = _merge(merged, [HumanMessage("q6", id="h6"), AIMessage("a7", id="a7")])
+    update = summarization_graph.summarize_conversation_node({"messages": merged})
+    assert [m.content for m in _merge(merged, update["messages"])][1:] == ["q6", "a7"]
+
+
+def test_summarizer_is_cached_per_model() -> None:
+    from langchain_core.language_models import FakeListChatModel
+
+    from summarization.summarizer import get_summarizer, summarize_messages
+
+    model = FakeListChatModel(responses=[" first summary ", "second summary"])
+    assert get_summarizer(model) is get_summarizer(model)
+    assert get_summarizer(model) is not get_summarizer(
+        FakeListChatModel(responses=["x"])
+    )
+    assert summarize_messages("User: hi", model=model) == "first summary"
+    assert (
+        get_summarizer(model).update("first summary", "User: bye") == "second summary"
+    )
+
+
+def test_summarizer_cache_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    from langchain_core.language_models import FakeListChatModel
+
+    from summarization import summarizer
+
+    monkeypatch.setattr(summarizer, "_summarizers", OrderedDict())
+    monkeypatch.setattr(summarizer, "SUMMARIZER_CACHE_SIZE", 2)
+    models = [FakeListChatModel(responses=["x"]) for _ in range(3)]
+    first = summarizer.get_summarizer(models[0])
+    for model in models[1:]:
+        summarizer.get_summarizer(model)
+    assert len(summarizer._summarizers) == 2
+    assert summarizer.get_summarizer(models[0]) is not first  # evicted and rebuilt
+    assert summarizer.get_summarizer(models[2]) is summarizer.get_summarizer(models[2])
+
+
+def test_background_summary_is_applied_on_next_turn(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from summarization.background import BackgroundSummarizer
+
+    monkeypatch.setattr(
+        summarization_graph,
+        "background_summarizer",
+        BackgroundSummarizer(max_workers=1),
+    )
+    monkeypatch.setattr(
+        summarization_graph,
+        "build_summary_update",
+        lambda messages, summary="": {
+            "summary": "s",
+            "messages": [RemoveMessage(id=messages[0].id)],
+        },
+    )
+    config = {"configurable": {"thread_id": "t1"}}
+    history = [HumanMessage("q1", id="1"), AIMessage("a1", id="2")]
+
+    assert (
+        summarization_graph.schedule_summary_node({"messages": history}, config) == {}
+    )
+    update = summarization_graph.apply_pending_summary_node(
+        {"messages": history + [HumanMessage("q2", id="3")]}, config
+    )
+    assert update["summary"] == "s"
+    assert (
+        summarization_graph.apply_pending_summary_node({"messages": history}, config)
+        == {}
+    )
+
+
+def test_background_summary_discarded_when_history_changed() -> None:
+    from summarization.background import BackgroundSummarizer
+
+    background = BackgroundSummarizer(max_workers=1)
+    history = [HumanMessage("q1", id="1"), AIMessage("a1", id="2")]
+    assert background.schedule("t", history, lambda: {"summary": "s"})
+    assert not background.schedule("t", history, lambda: {"summary": "other"})
+
+    assert background.collect("t", history[1:]) is None
+    assert not background.has_pending("t")
+
+
+def test_failed_background_summary_does_not_fail_the_next_turn() -> None:
+    import asyncio
+
+    from summarization.background import BackgroundSummarizer
+
+    def fail() -> None:
+        raise RuntimeError("rate limited")
+
+    background = BackgroundSummarizer(max_workers=1)
+    history = [HumanMessage("q1", id="1")]
+    assert background.schedule("t", history, fail)
+    assert background.collect("t", history) is None
+    assert background.schedule("t", history, fail)
+    assert asyncio.run(background.acollect("t", history)) is None
+    assert not background.has_pending("t")
+
+
+def test_token_watermarks(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(summarization_graph, "SUMMARY_HIGH_WATERMARK_TOKENS", 100)
+    monkeypatch.setattr(summarization_graph, "SUMMARY_LOW_WATERMARK_TOKENS", 50)
+    monkeypatch.setattr(summarization_graph, "RECENT_TOKENS_BUDGET", 30)
+    monkeypatch.setattr(summarization_graph, "RECENT_TOKENS_FLOOR", 13)
+    # 13 estimated tokens per message
+    messages: List[BaseMessage] = [HumanMessage("x" * 40, id=str(i)) for i in range(7)]
+
+    assert (
+        summarization_graph.route_from_conversation_node({"messages": messages})
+        == "__end__"
+    )
+    messages.append(AIMessage("y" * 40, id="7"))
+    assert (
+        summarization_graph.route_from_conversation_node({"messages": messages})
+        == "summarize_conversation"
+    )
+
+    assert summarization_graph.split_for_summary(messages) == 6
+    # A large running summary leaves less room for verbatim messages under the low watermark
+    assert summarization_graph.split_for_summary(messages, summary="s" * 100) == 7
+    # A summary over the low watermark still leaves the floor for the newest messages
+    assert summarization_graph.split_for_summary(messages, summary="s" * 1000) == 7
+
+
+def test_rolling_summary_over_the_cap_is_condensed_again(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(summarization_graph, "SUMMARY_MODE", "rolling")
+    monkeypatch.setattr(summarization_graph, "SUMMARY_HIGH_WATERMARK_TOKENS", None)
+    monkeypatch.setattr(summarization_graph, "SUMMARY_MAX_TOKENS", 20)
+    monkeypatch.setattr(
+        summarization_graph,
+        "update_summary",
+        lambda summary, text, model=None: "long " * 50,
+    )
+    monkeypatch.setattr(
+        summarization_graph,
+        "summarize_messages",
+        lambda text, model=None: f"short of {len(text)}",
+    )
+    messages = [HumanMessage(f"q{i}", id=str(i)) for i in range(5)]
+
+    update = summarization_graph.build_summary_update(messages, "old")
+    assert update["summary"] == "short of 250"
+
+
+def test_hierarchical_summarizer_map_reduces_long_transcripts() -> None:
+    from langchain_core.language_models import FakeListChatModel
+
+    from condenser_core.token_counter import FastTokenCounter
+    from summarization.summarizer import HierarchicalSummarizer, Summarizer
+
+    model = FakeListChatModel(responses=["part"] * 4 + ["whole"])
+    summarizer = HierarchicalSummarizer(
+        Summarizer(model), FastTokenCounter(), chunk_tokens=30, max_concurrency=2
+    )
+    transcript = "\n".join(f"User: {'x' * 80}" for _ in range(4))
+
+    assert len(summarizer.split(transcript)) == 4
+    assert summarizer.summarize(transcript) == "whole"
+    assert model.i == 0  # all five responses consumed: four map calls, one reduce
+
+
+def test_speculative_summary_applies_only_to_an_unchanged_history(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from summarization.background import SpeculativeSummarizer
+
+    monkeypatch.setattr(
+        summarization_graph,
+        "speculative_summarizer",
+        SpeculativeSummarizer(max_workers=1),
+    )
+    monkeypatch.setattr(
+        summarization_graph,
+        "build_summary_update",
+        lambda messages, summary="": {
+            "summary": f"{summary}+",
+            "messages": [RemoveMessage(id=messages[0].id)],
+        },
+    )
+    monkeypatch.setattr(summarization_graph, "SUMMARY_HIGH_WATERMARK_TOKENS", None)
+    monkeypatch.setattr(summarization_graph, "MAX_MESSAGES_BEFORE_SUMMARY", 2)
+    config = {"configurable": {"thread_id": "t1"}}
+    history = [HumanMessage("q1", id="1"), AIMessage("a1", id="2")]
+
+    assert (
+        summarization_graph.speculate_summary_node(
+            {"messages": history, "summary": "s"}, config
+        )
+        == {}
+    )
+    summarization_graph.speculative_summarizer._pending["t1"][
+        2
+    ].result()  # idle time passes
+
+    # Still below the threshold: the speculation is kept for a later turn
+    assert (
+        summarization_graph.apply_speculative_summary_node(
+            {"messages": history, "summary": "s"}, config
+        )
+        == {}
+    )
+    assert summarization_graph.speculative_summarizer.has_pending("t1")
+
+    # The next turn appended a message: the speculation still applies
+    next_turn = {"messages": history + [HumanMessage("q2", id="3")], "summary": "s"}
+    update = summarization_graph.apply_speculative_summary_node(next_turn, config)
+    assert update["summary"] == "s+"
+    assert summarization_graph.apply_speculative_summary_node(next_turn, config) == {}
+
+    # The history was edited since: the speculation is discarded
+    summarization_graph.speculate_summary_node(
+        {"messages": history, "summary": "s"}, config
+    )
+    edited = {
+        "messages": [history[1], HumanMessage("q2", id="3"), AIMessage("a2", id="4")],
+        "summary": "s",
+    }
+    assert summarization_graph.apply_speculative_summary_node(edited, config) == {}
+    assert not summarization_graph.speculative_summarizer.has_pending("t1")
+
+
+def test_unfinished_speculation_does_not_block_the_turn() -> None:
+    import threading
+
+    from summarization.background import SpeculativeSummarizer
+
+    release = threading.Event()
+    speculative = SpeculativeSummarizer(max_workers=1)
+    history = [HumanMessage("q1", id="1")]
+    assert speculative.speculate(
+        "t", history, "", lambda: {"summary": "s"} if release.wait() else None
+    )
+    assert not speculative.speculate("t", history, "", lambda: {"summary": "again"})
+
+    assert speculative.take("t", history) is None
+    assert speculative.has_pending("t")
+    release.set()
+    assert speculative.take("t", history, wait=True) == {"summary": "s"}
+
+
+def test_uncollected_summaries_expire_and_are_bounded() -> None:
+    from summarization.background import BackgroundSummarizer, SpeculativeSummarizer
+
+    now = [0.0]
+    background = BackgroundSummarizer(
+        max_workers=1, ttl=10, max_pending=2, clock=lambda: now[0]
+    )
+    history = [HumanMessage("q1", id="1")]
+    for thread_id in ("a", "b", "c"):
+        assert background.schedule(thread_id, history, lambda: {"summary": "s"})
+    # The oldest thread was dropped to stay within max_pending
+    assert not background.has_pending("a") and background.has_pending("b")
+    now[0] = 11
+    assert background.collect("c", history) is None
+    assert not background.has_pending("b")
+
+    speculative = SpeculativeSummarizer(max_workers=1, ttl=10, clock=lambda: now[0])
+    assert speculative.speculate("t", history, "", lambda: {"summary": "s"})
+    now[0] = 22
+    assert speculative.take("t", history, wait=True) is None
+    assert not speculative.has_pending("t")
+
+
+def test_route_speculates_near_the_threshold(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(summarization_graph, "SPECULATIVE_SUMMARY", True)
+    monkeypatch.setattr(summarization_graph, "SPECULATIVE_SUMMARY_RATIO", 0.5)
+    monkeypatch.setattr(summarization_graph, "SUMMARY_HIGH_WATERMARK_TOKENS", 100)
+    # 13 estimated tokens per message
+    messages: List[BaseMessage] = [HumanMessage("x" * 40, id=str(i)) for i in range(3)]
+
+    assert (
+        summarization_graph.route_from_conversation_node({"messages": messages})
+        == "__end__"
+    )
+    messages.append(AIMessage("y" * 40, id="3"))
+    assert (
+        summarization_graph.route_from_conversation_node({"messages": messages})
+        == "speculate_summary"
+    )
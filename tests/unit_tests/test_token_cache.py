@@ -0,0 +1,79 @@
+import importlib
+from typing import Callable, List, Optional, Sequence
+
+import pytest
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+
+from Tokenaware_truncation import token_cache as token_cache_module
+from Tokenaware_truncation.token_cache import TokenCountCache
+
+
+def _counting_counter(calls: List[int]) -> Callable[[Sequence[BaseMessage]], List[int]]:
+    def counter(messages: Sequence[BaseMessage]) -> List[int]:
+        calls.append(len(messages))
+        return [len(m.content) for m in messages]
+
+    return counter
+
+
+def test_messages_are_counted_and_hashed_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: List[int] = []
+    digests: List[Optional[str]] = []
+    digest = token_cache_module.message_digest
+
+    def recording_digest(message: BaseMessage) -> str:
+        digests.append(message.id)
+        return digest(message)
+
+    monkeypatch.setattr(token_cache_module, "message_digest", recording_digest)
+    cache = TokenCountCache(_counting_counter(calls))
+    history = [HumanMessage("hello", id="1"), AIMessage("hi there", id="2")]
+
+    assert list(cache.counts(history)) == [5, 8]
+    history.append(HumanMessage("weather?", id="3"))
+    assert list(cache.counts(history)) == [5, 8, 8]
+    assert calls == [1, 1, 1] and digests == ["1", "2", "3"]
+
+
+def test_changed_messages_are_recounted_and_restored_copies_are_not() -> None:
+    calls: List[int] = []
+    cache = TokenCountCache(_counting_counter(calls))
+    cache.count(AIMessage("bb", id="2"))
+
+    # A checkpoint restore hands back an equal message as a new object
+    assert cache.count(AIMessage("bb", id="2")) == 2
+    assert cache.misses == 1
+    # add_messages replaced the message under the same id
+    assert cache.count(AIMessage("cccc", id="2")) == 4
+    assert cache.misses == 2
+
+
+def test_sliding_window_counts_only_the_kept_suffix(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    graph = importlib.import_module("Tokenaware_truncation.graph")
+    monkeypatch.setattr(graph, "MAX_TOKENS_FOR_HISTORY", 12)
+    calls: List[int] = []
+    cache = TokenCountCache(_counting_counter(calls))
+    history: List[BaseMessage] = [SystemMessage("sys")]
+    for i in range(100):
+        history += [
+            HumanMessage(f"q{i:03}", id=f"h{i}"),
+            AIMessage(f"a{i:03}", id=f"a{i}"),
+        ]
+    history += [
+        HumanMessage("last", id="h"),
+        AIMessage("", id="c"),
+        ToolMessage("ok", tool_call_id="x", id="t"),
+    ]
+
+    window = graph._sliding_window(history, cache.counts(history))
+    # sys (3) + a099 (4, dropped: not a human start) + last (4) + "" + ok (2) fit in 12
+    assert [m.content for m in window] == ["sys", "last", "", "ok"]
+    assert len(calls) < 10
@@ -0,0 +1,53 @@
+from typing import Callable, List, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, trim_messages
+
+from condenser_core.token_counter import FastTokenCounter, keep_last_within_budget
+
+
+def _exact(calls: List[int]) -> Callable[[Sequence[BaseMessage]], int]:
+    def counter(messages: Sequence[BaseMessage]) -> int:
+        calls.append(len(messages))
+        # One token per two characters plus the per-message overhead.
+        return sum(3 + len(m.content) // 2 for m in messages)
+
+    return counter
+
+
+def test_count_batch_is_offline_and_per_message() -> None:
+    counter = FastTokenCounter()
+    messages = [HumanMessage("a" * 40), AIMessage("b" * 8)]
+    assert counter.count_batch(messages) == [13, 5]
+    assert counter(messages) == 18
+
+
+def test_exact_count_calibrates_ratio() -> None:
+    counter = FastTokenCounter(exact_counter=_exact([]))
+    assert counter.calibrate([HumanMessage("x" * 100)]) == 2.0
+    assert counter.count_batch([HumanMessage("y" * 20)]) == [13]
+
+
+def test_exact_counter_only_used_near_budget() -> None:
+    calls: List[int] = []
+    counter = FastTokenCounter(exact_counter=_exact(calls))
+    budget = counter.for_budget(100)
+
+    budget([HumanMessage("short")])
+    assert calls == []
+    budget([HumanMessage("z" * 390)])
+    assert calls == [1]
+
+
+def test_keep_last_within_budget() -> None:
+    counter = FastTokenCounter()
+    messages = [HumanMessage("a" * 40, id=str(i)) for i in range(5)]
+    assert keep_last_within_budget(messages, 30, counter) == 3
+    assert keep_last_within_budget(messages, 1000, counter) == 0
+
+
+def test_usable_as_trim_messages_counter() -> None:
+    messages = [HumanMessage("a" * 40), AIMessage("b" * 40), HumanMessage("c" * 40)]
+    trimmed = trim_messages(
+        messages, max_tokens=30, strategy="last", token_counter=FastTokenCounter()
+    )
+    assert [m.content[0] for m in trimmed] == ["b", "c"]
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import time
+from typing import Any, List
+
+from langchain_core.messages import BaseMessage, ToolCall
+from langchain_core.messages.tool import tool_call
+from langchain_core.tools import tool
+
+from condenser_core.tool_executor import ToolExecutor
+
+
+@tool
+def slow_lookup(key: str) -> str:
+    """Look up a key slowly."""
+    time.sleep(0.2)
+    return f"value for {key}"
+
+
+@tool
+def hang(key: str) -> str:
+    """Never answer in time."""
+    time.sleep(1)
+    return key
+
+
+@tool
+async def async_lookup(key: str) -> str:
+    """Look up a key asynchronously."""
+    await asyncio.sleep(0.2)
+    return f"async value for {key}"
+
+
+def _calls(*names: str) -> List[ToolCall]:
+    return [
+        tool_call(name=n, args={"key": str(i)}, id=f"call-{i}")
+        for i, n in enumerate(names)
+    ]
+
+
+def _payload(message: BaseMessage) -> Any:
+    return json.loads(str(message.content))
+
+
+def test_sync_calls_run_concurrently_in_order() -> None:
+    executor = ToolExecutor([slow_lookup], max_concurrency=4)
+    started = time.monotonic()
+    outputs = executor.run(_calls("slow_lookup", "slow_lookup", "slow_lookup"))
+    assert time.monotonic() - started < 0.5
+    assert [m.tool_call_id for m in outputs] == ["call-0", "call-1", "call-2"]
+    assert _payload(outputs[2]) == "value for 2"
+
+
+def test_timeouts_and_unknown_tools_become_error_messages() -> None:
+    executor = ToolExecutor([slow_lookup, hang], timeouts={"hang": 0.05})
+    outputs = executor.run(_calls("hang", "missing", "slow_lookup"))
+    assert "Timed out" in _payload(outputs[0])["error"]
+    assert "Unknown tool" in _payload(outputs[1])["error"]
+    assert _payload(outputs[2]) == "value for 2"
+
+
+def test_timeout_counts_from_when_the_call_starts() -> None:
+    # One worker: the second call waits 0.2s for the first, then runs 0.2s within its own 0.3s
+    executor = ToolExecutor([slow_lookup], max_concurrency=1, timeout=0.3)
+    outputs = executor.run(_calls("slow_lookup", "slow_lookup"))
+    assert [_payload(m) for m in outputs] == ["value for 0", "value for 1"]
+
+
+def test_async_run_mixes_sync_and_async_tools() -> None:
+    executor = ToolExecutor([slow_lookup, async_lookup], max_concurrency=4)
+    started = time.monotonic()
+    outputs = asyncio.run(executor.arun(_calls("async_lookup", "slow_lookup")))
+    assert time.monotonic() - started < 0.35
+    assert [_payload(m) for m in outputs] == ["async value for 0", "value for 1"]
+
+
+def test_cache_hits_skip_the_tool_and_expire() -> None:
+    from condenser_core.tool_cache import ToolResultCache
+
+    calls: List[str] = []
+
+    @tool
+    def counted(key: str) -> str:
+        """Count invocations."""
+        calls.append(key)
+        return key.upper()
+
+    now = [0.0]
+    cache = ToolResultCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    executor = ToolExecutor([counted], cache=cache)
+    call = tool_call(name="counted", args={"key": "sf"}, id="1")
+
+    executor.run([call])
+    executor.run([{**call, "id": "2"}])
+    asyncio.run(executor.arun([{**call, "id": "3"}]))
+    assert calls == ["sf"]
+    assert cache.stats() == {"hits": 2, "misses": 1, "evictions": 0, "size": 1}
+
+    now[0] = 11.0
+    executor.run([call])
+    assert calls == ["sf", "sf"]
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    from condenser_core.tool_cache import ToolResultCache
+
+    cache = ToolResultCache(maxsize=2, ttl=None)
+    cache.set("t", {"a": 1, "b": 2}, "first")
+    cache.set("t", {"a": 2}, "second")
+    assert cache.lookup("t", {"b": 2, "a": 1}) == (True, "first")
+    cache.set("t", {"a": 3}, "third")
+    assert cache.lookup("t", {"a": 2}) == (False, None)
+    assert cache.evictions == 1
@@ -0,0 +1,94 @@
+from typing import List
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from condenser_core.tool_pairs import ToolPairIndex, ToolPairIndexCache
+from manual_triming.history import MessageWindow
+
+
+def _exchange(n: int) -> List[BaseMessage]:
+    """Human question, AI tool call, tool result, AI answer."""
+    return [
+        HumanMessage(f"q{n}", id=f"h{n}"),
+        AIMessage(
+            "",
+            id=f"c{n}",
+            tool_calls=[{"name": "get_weather", "args": {}, "id": f"call{n}"}],
+        ),
+        ToolMessage("sunny", tool_call_id=f"call{n}", id=f"t{n}"),
+        AIMessage(f"a{n}", id=f"a{n}"),
+    ]
+
+
+def test_cuts_snap_to_pair_safe_boundaries() -> None:
+    index = ToolPairIndex(_exchange(0) + _exchange(1))
+    assert [index.is_safe(i) for i in range(8)] == [
+        True,
+        True,
+        False,
+        True,
+        True,
+        True,
+        False,
+        True,
+    ]
+    assert index.next_safe(2) == 3
+    assert index.prev_safe(2) == 1
+    assert index.positions("call1") == (5, 6)
+
+
+def test_open_call_at_the_end_is_kept_whole() -> None:
+    call = AIMessage(
+        "",
+        id="c",
+        tool_calls=[
+            {"name": "get_weather", "args": {}, "id": "x"},
+            {"name": "get_weather", "args": {}, "id": "y"},
+        ],
+    )
+    index = ToolPairIndex(
+        [
+            HumanMessage("q", id="h"),
+            call,
+            ToolMessage("sunny", tool_call_id="x", id="t"),
+        ]
+    )
+    assert index.next_safe(2) == 3
+    assert index.safe_cut(2) == 1
+    assert index.positions("y") == (1, None)
+
+
+def test_sync_applies_front_removals_and_appends_incrementally() -> None:
+    history = _exchange(0) + _exchange(1)
+    cache = ToolPairIndexCache()
+    config = {"configurable": {"thread_id": "t"}}
+    index = cache.get(config, history)
+
+    history = history[3:] + _exchange(2)
+    assert cache.get(config, history) is index
+    assert len(index) == len(history)
+    assert index.positions("call0") is None
+    assert index.positions("call2") == (6, 7)
+    assert index.next_safe(3) == 4
+
+    # A removal in the middle is detected and rebuilds the index
+    history = history[:2] + history[3:]
+    assert index.sync(history).positions("call2") == (5, 6)
+
+
+def test_calls_without_a_thread_id_get_their_own_index() -> None:
+    cache = ToolPairIndexCache()
+    first = cache.get(None, _exchange(0))
+    second = cache.get({"configurable": {}}, _exchange(1))
+    assert first is not second
+    assert first.positions("call0") == (1, 2) and second.positions("call0") is None
+
+
+def test_message_window_trim_keeps_tool_results_with_their_call() -> None:
+    window = MessageWindow(_exchange(0), maxlen=3)
+    assert [m.id for m in window] == ["c0", "t0", "a0"]
+    window.safe_trim(2)
+    assert [m.id for m in window] == ["a0"]
+    window.extend(_exchange(1)[:3])
+    window.safe_trim()
+    assert [m.id for m in window] == ["h1", "c1", "t1"]
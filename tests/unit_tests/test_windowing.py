@@ -0,0 +1,81 @@
+import importlib
+from typing import Any, Dict, List, Tuple
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from condenser_core.fakes import FakeChatModel
+from Tokenaware_truncation.windowing import block_window_start, find_window_start
+
+
+def _history(turns: int) -> List[BaseMessage]:
+    messages: List[BaseMessage] = []
+    for i in range(turns):
+        messages.append(HumanMessage(f"q{i}", id=f"h{i}"))
+        messages.append(AIMessage(f"a{i}", id=f"a{i}"))
+    return messages
+
+
+def test_window_start_is_stable_below_high_watermark() -> None:
+    messages = _history(4)
+    counts = [10] * len(messages)
+    assert (
+        block_window_start(messages, counts, 2, high_watermark=60, low_watermark=30)
+        == 2
+    )
+
+
+def test_window_jumps_to_human_message_within_low_watermark() -> None:
+    messages = _history(5)
+    counts = [10] * len(messages)
+    start = block_window_start(messages, counts, 0, high_watermark=60, low_watermark=30)
+    assert start == 8
+    assert isinstance(messages[start], HumanMessage)
+
+
+def test_oversized_last_turn_starts_at_last_human_message() -> None:
+    messages = _history(3)
+    counts = [10, 10, 10, 10, 10, 500]
+    assert (
+        block_window_start(messages, counts, 0, high_watermark=100, low_watermark=50)
+        == 4
+    )
+
+
+def test_find_window_start_falls_back_to_zero() -> None:
+    messages = _history(2)
+    assert find_window_start(messages, "h1") == 2
+    assert find_window_start(messages, "gone") == 0
+    assert find_window_start(messages, None) == 0
+
+
+def test_block_mode_reuses_prompt_prefix(monkeypatch: pytest.MonkeyPatch) -> None:
+    tokenaware = importlib.import_module("Tokenaware_truncation.graph")
+
+    def run(mode: str) -> Tuple[Dict[str, int], Dict[str, Any]]:
+        model = FakeChatModel()
+        monkeypatch.setattr(tokenaware, "TRUNCATION_MODE", mode)
+        monkeypatch.setattr(
+            tokenaware,
+            "llm_with_tools",
+            model.bind_tools(tokenaware.tool_executor.tools_by_name.values()),
+        )
+        app = tokenaware.workflow.compile()
+        state: Dict[str, Any] = {"messages": []}
+        for i in range(40):
+            text = (
+                f"Turn {i}: tell me about context windows "
+                + "and token budgets " * (i % 7)
+            )
+            state["messages"] = state["messages"] + [HumanMessage(text)]
+            state = app.invoke(state)
+        return model.stats, state
+
+    sliding, _ = run("sliding")
+    block, state = run("block")
+    assert block["cached_prompt_tokens"] > 2 * sliding.get("cached_prompt_tokens", 0)
+    assert (
+        block["agent_prompt_tokens"]
+        <= block["agent_calls"] * tokenaware.MAX_TOKENS_FOR_HISTORY
+    )
+    assert state["window_start"] in {m.id for m in state["messages"]}